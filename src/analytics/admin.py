@@ -0,0 +1,23 @@
+"""Admin view config."""
+
+from django.contrib import admin
+
+from analytics.models import CourseDailyStats, ModuleDailyStats
+
+
+@admin.register(CourseDailyStats)
+class CourseDailyStatsAdmin(admin.ModelAdmin):
+    """Admin of the daily course stats."""
+
+    list_display = ["course", "day", "enrollments", "views"]
+    list_filter = ["day"]
+    raw_id_fields = ["course"]
+
+
+@admin.register(ModuleDailyStats)
+class ModuleDailyStatsAdmin(admin.ModelAdmin):
+    """Admin of the daily module stats."""
+
+    list_display = ["module", "course", "day", "views"]
+    list_filter = ["day"]
+    raw_id_fields = ["module", "course"]
@@ -0,0 +1,15 @@
+"""URL configuration of the analytics API."""
+
+from django.urls import path
+
+from analytics.api import views
+
+app_name = "analytics"
+
+urlpatterns = [
+    path(
+        "courses/<int:pk>/",
+        views.CourseAnalyticsView.as_view(),
+        name="course_analytics",
+    ),
+]
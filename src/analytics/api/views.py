@@ -0,0 +1,37 @@
+"""Analytics API views."""
+
+from django.shortcuts import get_object_or_404
+from rest_framework.authentication import (
+    BasicAuthentication,
+    SessionAuthentication,
+)
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from analytics.reports import course_report
+from courses.models import Course
+
+
+class CourseAnalyticsView(APIView):
+    """The statistics of a course, for its owner only."""
+
+    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        """Return the report of the last ``?days=`` days, 30 by default.
+
+        Args:
+            request (Request): The request object.
+            pk (int): The ID of the course.
+
+        Returns:
+            Response: See ``analytics.reports.course_report()``.
+        """
+        course = get_object_or_404(Course, pk=pk, owner=request.user)
+        try:
+            days = int(request.query_params.get("days", 30))
+        except ValueError:
+            days = 30
+        return Response(course_report(course, days))
@@ -0,0 +1,27 @@
+"""App config module."""
+
+from django.apps import AppConfig
+
+
+class AnalyticsConfig(AppConfig):
+    """Configuration for the analytics app.
+
+    Attributes:
+        name (str): The name of the app.
+    """
+
+    name = "analytics"
+
+    def ready(self):
+        """Record enrollments as they happen."""
+        # pylint: disable=import-outside-toplevel
+        from django.db.models.signals import m2m_changed
+
+        from analytics import events
+        from courses.models import Course
+
+        m2m_changed.connect(
+            events.enrollments_changed,
+            sender=Course.students.through,
+            dispatch_uid="analytics.enrollments_changed",
+        )
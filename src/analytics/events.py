@@ -0,0 +1,85 @@
+"""Recording of enrollment and view events.
+
+Recording is a single ``INSERT``; nothing is counted at this point. The
+first event after ``settings.ANALYTICS_ROLLUP_INTERVAL`` seconds of quiet
+schedules ``analytics.rollups.rollup()`` in the background, which folds the
+new events into the daily stats the dashboards read.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+
+from analytics.models import Event
+from courses.models import Module
+from courses.tasks import enqueue
+
+SCHEDULED_KEY = "analytics:rollup:scheduled"
+
+
+def schedule_rollup():
+    """Run a rollup in the background, unless one ran recently."""
+    # pylint: disable-next=import-outside-toplevel
+    from analytics.rollups import rollup
+
+    if cache.add(SCHEDULED_KEY, True, settings.ANALYTICS_ROLLUP_INTERVAL):
+        enqueue(rollup)
+
+
+def record_view(course, module, user=None):
+    """Record that ``user`` viewed ``module`` of ``course``.
+
+    Args:
+        course (Course): The course.
+        module (Module): The module shown.
+        user (User, optional): The viewer.
+    """
+    Event.objects.create(
+        kind=Event.VIEW,
+        course_id=course.pk,
+        module_id=module.pk,
+        user_id=getattr(user, "pk", None),
+    )
+    schedule_rollup()
+
+
+def record_enrollments(pairs):
+    """Record enrollments in bulk.
+
+    Args:
+        pairs (Iterable[tuple]): ``(course id, user id)`` pairs.
+    """
+    events = [
+        Event(kind=Event.ENROLLMENT, course_id=course_id, user_id=user_id)
+        for course_id, user_id in pairs
+    ]
+    if events:
+        Event.objects.bulk_create(events)
+        schedule_rollup()
+
+
+def enrollments_changed(sender, instance, action, reverse, pk_set, **kwargs):  # pylint: disable=unused-argument
+    """Record the students added to a course, from either side."""
+    if action != "post_add" or not pk_set:
+        return
+    if reverse:
+        # user.courses_joined.add(...): pk_set holds courses
+        record_enrollments((pk, instance.pk) for pk in pk_set)
+    else:
+        record_enrollments((instance.pk, pk) for pk in pk_set)
+
+
+def unviewed_modules(course, user):
+    """Return the modules of ``course`` that ``user`` never viewed.
+
+    Args:
+        course (Course): The course.
+        user (User): The student.
+
+    Returns:
+        QuerySet: The modules without a view event of ``user``.
+    """
+    views = Event.objects.filter(
+        kind=Event.VIEW, user=user, module=OuterRef("pk")
+    )
+    return Module.objects.filter(course=course).exclude(Exists(views))
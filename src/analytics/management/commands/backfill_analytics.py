@@ -0,0 +1,81 @@
+"""Record past enrollments and rebuild the analytics rollups."""
+
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+
+from analytics.models import Event
+from analytics.rollups import reset, rollup_batch
+from courses.models import Course
+
+
+class Command(BaseCommand):
+    """Backfill the analytics from the existing data, in chunks.
+
+    Enrollments made before the analytics app existed only left a row in
+    ``Course.students``, without a date; they are recorded as enrollment
+    events dated at the course's creation, the earliest they can have
+    happened. Running the command again records nothing twice.
+
+    The events are then folded into the daily rollups chunk by chunk, from
+    scratch with ``--rebuild``.
+    """
+
+    help = "Record past enrollments and fold all events into the rollups."
+
+    def add_arguments(self, parser):
+        """Register the command options."""
+        parser.add_argument("--chunk-size", type=int, default=5000)
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Drop the rollups and fold every event again.",
+        )
+
+    def handle(self, *args, **options):
+        """Backfill the enrollments, then fold the events."""
+        chunk_size = options["chunk_size"]
+        count = self.backfill_enrollments(chunk_size)
+        self.stdout.write(f"Recorded {count} past enrollments.")
+        if options["rebuild"]:
+            reset()
+        total = 0
+        while folded := rollup_batch(chunk_size):
+            total += folded
+            self.stdout.write(f"Folded {total} events.")
+        self.stdout.write(f"Folded {total} events into the daily rollups.")
+
+    def backfill_enrollments(self, chunk_size):
+        """Record the enrollments that have no enrollment event.
+
+        Args:
+            chunk_size (int): The number of enrollments read per query.
+
+        Returns:
+            int: The number of recorded enrollments.
+        """
+        through = Course.students.through
+        recorded = Event.objects.filter(
+            kind=Event.ENROLLMENT,
+            course=OuterRef("course_id"),
+            user=OuterRef("user_id"),
+        )
+        pending = (
+            through.objects.filter(~Exists(recorded))
+            .order_by("pk")
+            .values_list("pk", "course_id", "user_id", "course__created")
+        )
+        count = 0
+        last = 0
+        while rows := list(pending.filter(pk__gt=last)[:chunk_size]):
+            last = rows[-1][0]
+            Event.objects.bulk_create(
+                Event(
+                    kind=Event.ENROLLMENT,
+                    course_id=course_id,
+                    user_id=user_id,
+                    created=created,
+                )
+                for _, course_id, user_id, created in rows
+            )
+            count += len(rows)
+        return count
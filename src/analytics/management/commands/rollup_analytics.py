@@ -0,0 +1,24 @@
+"""Fold the recorded analytics events into the daily rollups."""
+
+from django.core.management.base import BaseCommand
+
+from analytics.rollups import rollup
+
+
+class Command(BaseCommand):
+    """Run a rollup now.
+
+    Rollups are also scheduled in-process after new events; run this
+    periodically so that the last events of a quiet period are counted too.
+    """
+
+    help = "Fold new analytics events into the daily rollups."
+
+    def add_arguments(self, parser):
+        """Register the command options."""
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        """Fold the settled events and report how many."""
+        count = rollup(options["batch_size"])
+        self.stdout.write(f"Folded {count} events into the daily rollups.")
@@ -0,0 +1,122 @@
+"""Analytics model module."""
+
+from django.contrib.auth.models import User
+from django.db import models
+from django.utils import timezone
+
+from courses.models import Course, Module
+
+
+class Event(models.Model):
+    """An enrollment in a course or a view of one of its modules.
+
+    Events are append-only; ``analytics.rollups`` folds them into the daily
+    stats, which is what reports read.
+    """
+
+    ENROLLMENT = "enrollment"
+    VIEW = "view"
+    KIND_CHOICES = [
+        (ENROLLMENT, "Enrollment"),
+        (VIEW, "View"),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    course = models.ForeignKey(
+        Course, related_name="events", on_delete=models.CASCADE
+    )
+    module = models.ForeignKey(
+        Module,
+        related_name="events",
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+    )
+    user = models.ForeignKey(
+        User,
+        related_name="events",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+    )
+    created = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        """Model options."""
+
+        indexes = [
+            models.Index(fields=["created"], name="event_created_idx"),
+        ]
+
+    def __str__(self):
+        """Return the kind, course and time of the event."""
+        return f"{self.kind} of {self.course_id} at {self.created}"
+
+
+class CourseDailyStats(models.Model):
+    """The enrollments in a course and the views of its modules in a day."""
+
+    course = models.ForeignKey(
+        Course, related_name="daily_stats", on_delete=models.CASCADE
+    )
+    day = models.DateField()
+    enrollments = models.PositiveIntegerField(default=0)
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        """Model options."""
+
+        ordering = ["day"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["course", "day"], name="course_daily_stats_unique"
+            ),
+        ]
+
+    def __str__(self):
+        """Return the course and the day."""
+        return f"{self.course_id} on {self.day}"
+
+
+class ModuleDailyStats(models.Model):
+    """The views of a module in a day."""
+
+    module = models.ForeignKey(
+        Module, related_name="daily_stats", on_delete=models.CASCADE
+    )
+    # denormalized, so a course's modules are read with one range scan
+    course = models.ForeignKey(
+        Course, related_name="module_daily_stats", on_delete=models.CASCADE
+    )
+    day = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        """Model options."""
+
+        ordering = ["day"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["module", "day"], name="module_daily_stats_unique"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["course", "day"], name="module_stats_course_day_idx"
+            ),
+        ]
+
+    def __str__(self):
+        """Return the module and the day."""
+        return f"{self.module_id} on {self.day}"
+
+
+class RollupCursor(models.Model):
+    """The last event folded into the daily stats."""
+
+    name = models.CharField(max_length=50, unique=True)
+    position = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        """Return the name and the position."""
+        return f"{self.name} at {self.position}"
@@ -0,0 +1,73 @@
+"""Instructor reports, read from the daily rollups only.
+
+Every query here is a range scan over at most one row per day (per module
+for the module table), so a report costs O(days) whatever the number of
+events behind it.
+"""
+
+import datetime
+
+from django.db.models import Sum
+from django.utils import timezone
+
+from analytics.models import CourseDailyStats, ModuleDailyStats
+
+MAX_DAYS = 365
+
+
+def course_report(course, days=30, today=None):
+    """Summarize the last ``days`` days of ``course``.
+
+    Days without activity are reported with zero counts.
+
+    Args:
+        course (Course): The course.
+        days (int): The length of the period, capped to ``MAX_DAYS``.
+        today (date, optional): The last day of the period.
+
+    Returns:
+        dict: ``start``, ``end``, ``days`` (a row per day), ``modules``
+        (views per module over the period), ``totals`` over the period and
+        ``all_time`` totals.
+    """
+    days = max(1, min(days, MAX_DAYS))
+    end = today or timezone.localdate()
+    start = end - datetime.timedelta(days=days - 1)
+    stats = {
+        row["day"]: row
+        for row in CourseDailyStats.objects.filter(
+            course=course, day__range=(start, end)
+        ).values("day", "enrollments", "views")
+    }
+    rows = []
+    for offset in range(days):
+        day = start + datetime.timedelta(days=offset)
+        rows.append(stats.get(day, {"day": day, "enrollments": 0, "views": 0}))
+    views = dict(
+        ModuleDailyStats.objects.filter(course=course, day__range=(start, end))
+        .values("module_id")
+        .annotate(views=Sum("views"))
+        .values_list("module_id", "views")
+    )
+    all_time = CourseDailyStats.objects.filter(course=course).aggregate(
+        enrollments=Sum("enrollments", default=0),
+        views=Sum("views", default=0),
+    )
+    return {
+        "start": start,
+        "end": end,
+        "days": rows,
+        "modules": [
+            {
+                "id": module.pk,
+                "title": module.title,
+                "views": views.get(module.pk, 0),
+            }
+            for module in course.modules.all()
+        ],
+        "totals": {
+            "enrollments": sum(row["enrollments"] for row in rows),
+            "views": sum(row["views"] for row in rows),
+        },
+        "all_time": all_time,
+    }
@@ -0,0 +1,156 @@
+"""Incremental daily rollups of the analytics events.
+
+``RollupCursor`` remembers the last event folded in. Each batch reads the
+next events after it, counts them per course and day and per module and day
+with two ``GROUP BY`` queries, adds the counts to the existing rows and
+writes the rows back with one upsert per table, then moves the cursor; all of
+it in one transaction, so a batch is folded in exactly once.
+
+Events younger than ``settings.ANALYTICS_ROLLUP_DELAY`` seconds are left for
+the next run: ids are allocated before the commit, so a recent id may still
+have an older, uncommitted neighbour that the cursor would skip.
+"""
+
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from analytics.models import (
+    CourseDailyStats,
+    Event,
+    ModuleDailyStats,
+    RollupCursor,
+)
+
+CURSOR_NAME = "daily"
+
+
+def _pending(position, now):
+    events = Event.objects.filter(pk__gt=position).order_by("pk")
+    horizon = now - datetime.timedelta(seconds=settings.ANALYTICS_ROLLUP_DELAY)
+    unsettled = (
+        events.filter(created__gte=horizon).values_list("pk", flat=True).first()
+    )
+    if unsettled is not None:
+        events = events.filter(pk__lt=unsettled)
+    return events
+
+
+def _merge(model, rows, key_fields, count_fields):
+    """Add the counts of ``rows`` to the stats of ``model``.
+
+    The existing stats are read with one range query and written back,
+    together with the new ones, with one upsert.
+    """
+    if not rows:
+        return
+    owner_field = key_fields[0]
+    days = [row["day"] for row in rows]
+    existing = {
+        tuple(stats[field] for field in key_fields): stats
+        for stats in model.objects.filter(
+            **{f"{owner_field}__in": {row[owner_field] for row in rows}},
+            day__range=(min(days), max(days)),
+        ).values(*key_fields, *count_fields)
+    }
+    merged = []
+    for row in rows:
+        previous = existing.get(tuple(row[field] for field in key_fields), {})
+        merged.append(
+            model(
+                **{
+                    field: value + previous.get(field, 0)
+                    if field in count_fields
+                    else value
+                    for field, value in row.items()
+                }
+            )
+        )
+    model.objects.bulk_create(
+        merged,
+        update_conflicts=True,
+        unique_fields=[field.removesuffix("_id") for field in key_fields],
+        update_fields=count_fields,
+    )
+
+
+@transaction.atomic
+def rollup_batch(batch_size=None, now=None):
+    """Fold the next batch of settled events into the daily stats.
+
+    Args:
+        batch_size (int, optional): The maximum number of events, defaults
+            to ``settings.ANALYTICS_ROLLUP_BATCH_SIZE``.
+        now (datetime, optional): The current time.
+
+    Returns:
+        int: The number of events folded in.
+    """
+    batch_size = batch_size or settings.ANALYTICS_ROLLUP_BATCH_SIZE
+    cursor, _ = RollupCursor.objects.select_for_update().get_or_create(
+        name=CURSOR_NAME
+    )
+    ids = list(
+        _pending(cursor.position, now or timezone.now()).values_list(
+            "pk", flat=True
+        )[:batch_size]
+    )
+    if not ids:
+        return 0
+    events = (
+        Event.objects.filter(pk__gt=cursor.position, pk__lte=ids[-1])
+        .annotate(day=TruncDate("created"))
+        .order_by()
+    )
+    _merge(
+        CourseDailyStats,
+        list(
+            events.values("course_id", "day").annotate(
+                enrollments=Count("pk", filter=Q(kind=Event.ENROLLMENT)),
+                views=Count("pk", filter=Q(kind=Event.VIEW)),
+            )
+        ),
+        ["course_id", "day"],
+        ["enrollments", "views"],
+    )
+    _merge(
+        ModuleDailyStats,
+        list(
+            events.filter(kind=Event.VIEW, module__isnull=False)
+            .values("module_id", "course_id", "day")
+            .annotate(views=Count("pk"))
+        ),
+        ["module_id", "day"],
+        ["views"],
+    )
+    cursor.position = ids[-1]
+    cursor.save(update_fields=["position"])
+    return len(ids)
+
+
+def rollup(batch_size=None, now=None):
+    """Fold every settled event into the daily stats, batch by batch.
+
+    Args:
+        batch_size (int, optional): The maximum number of events per batch.
+        now (datetime, optional): The current time.
+
+    Returns:
+        int: The number of events folded in.
+    """
+    total = 0
+    while folded := rollup_batch(batch_size, now):
+        total += folded
+    return total
+
+
+@transaction.atomic
+def reset():
+    """Drop every daily stat and rewind the cursor to the first event."""
+    CourseDailyStats.objects.all().delete()
+    ModuleDailyStats.objects.all().delete()
+    RollupCursor.objects.filter(name=CURSOR_NAME).delete()
@@ -0,0 +1,89 @@
+"""Unit test case module."""
+
+import datetime
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from analytics.events import record_view
+from analytics.models import CourseDailyStats, Event, ModuleDailyStats
+from analytics.reports import course_report
+from analytics.rollups import rollup
+from courses.models import Course, Module, Subject
+
+
+@override_settings(ANALYTICS_ROLLUP_DELAY=0)
+class RollupTest(TestCase):
+    """Events are folded into the daily stats once, incrementally."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a course with two modules and three students."""
+        owner = User.objects.create(username="owner")
+        subject = Subject.objects.create(title="Music", slug="music")
+        cls.course = Course.objects.create(
+            owner=owner, subject=subject, title="Tabla", slug="tabla"
+        )
+        cls.modules = [
+            Module.objects.create(course=cls.course, title=title)
+            for title in ("Basics", "Rhythms")
+        ]
+        cls.students = [
+            User.objects.create(username=f"student{number}")
+            for number in range(3)
+        ]
+
+    def test_enrollments_are_recorded(self):
+        """Enrollments are recorded from both sides of the relation."""
+        self.course.students.add(*self.students[:2])
+        self.students[2].courses_joined.add(self.course)
+        assert Event.objects.filter(kind=Event.ENROLLMENT).count() == 3
+
+    def test_incremental(self):
+        """Each rollup adds the new events to the existing rows."""
+        self.course.students.add(*self.students)
+        record_view(self.course, self.modules[0], self.students[0])
+        assert rollup() == 4
+        record_view(self.course, self.modules[0], self.students[1])
+        record_view(self.course, self.modules[1], self.students[1])
+        assert rollup() == 2
+        assert rollup() == 0
+        stats = CourseDailyStats.objects.get()
+        assert (stats.enrollments, stats.views) == (3, 3)
+        assert dict(
+            ModuleDailyStats.objects.values_list("module__title", "views")
+        ) == {"Basics": 2, "Rhythms": 1}
+
+    def test_unsettled_events_wait(self):
+        """Events younger than the delay are left for the next rollup."""
+        record_view(self.course, self.modules[0])
+        with override_settings(ANALYTICS_ROLLUP_DELAY=60):
+            assert rollup() == 0
+        assert rollup() == 1
+
+    def test_report(self):
+        """Reports have a row per day, active or not."""
+        today = timezone.localdate()
+        record_view(self.course, self.modules[1])
+        Event.objects.update(
+            created=timezone.now() - datetime.timedelta(days=2)
+        )
+        record_view(self.course, self.modules[1])
+        rollup()
+        report = course_report(self.course, days=7, today=today)
+        assert len(report["days"]) == 7
+        assert [row["views"] for row in report["days"][-3:]] == [1, 0, 1]
+        assert report["totals"] == {"enrollments": 0, "views": 2}
+        assert [module["views"] for module in report["modules"]] == [0, 2]
+
+    def test_backfill(self):
+        """Past enrollments are recorded once, however often it runs."""
+        Course.students.through.objects.bulk_create(
+            Course.students.through(course=self.course, user=student)
+            for student in self.students
+        )
+        for _ in range(2):
+            call_command("backfill_analytics", "--rebuild", chunk_size=2)
+        assert CourseDailyStats.objects.get().enrollments == 3
@@ -0,0 +1,13 @@
+"""URL configuration for the analytics app."""
+
+from django.urls import path
+
+from analytics import views
+
+urlpatterns = [
+    path(
+        "course/<int:pk>/",
+        views.CourseAnalyticsView.as_view(),
+        name="course_analytics",
+    ),
+]
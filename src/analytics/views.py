@@ -0,0 +1,40 @@
+"""View module."""
+
+from django.views.generic.detail import DetailView
+
+from analytics.reports import course_report
+from courses.views import OwnerCourseMixin
+
+
+class CourseAnalyticsView(OwnerCourseMixin, DetailView):
+    """View to show the enrollment and view statistics of an owned course.
+
+    Attributes:
+        template_name (str): The template to render the dashboard.
+        permission_required (str): The permission required to view it.
+
+    Methods:
+        get_context_data(**kwargs): Adds the report of the requested period.
+    """
+
+    template_name = "analytics/course.html"
+    permission_required = "courses.view_course"
+
+    def get_context_data(self, **kwargs):
+        """Adds the report of the requested period.
+
+        The period is the last ``?days=`` days, 30 by default.
+
+        Args:
+            **kwargs: Additional keyword arguments.
+
+        Returns:
+            dict: The context data for the template.
+        """
+        context = super().get_context_data(**kwargs)
+        try:
+            days = int(self.request.GET.get("days", 30))
+        except ValueError:
+            days = 30
+        context["report"] = course_report(self.object, days)
+        return context
@@ -0,0 +1,15 @@
+"""Admin view config."""
+
+from django.contrib import admin
+
+from chat.models import Message
+
+
+@admin.register(Message)
+class MessageAdmin(admin.ModelAdmin):
+    """Admin of the chat messages."""
+
+    list_display = ["course", "user", "sent"]
+    list_filter = ["sent"]
+    raw_id_fields = ["course", "user"]
+    search_fields = ["content"]
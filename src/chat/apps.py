@@ -0,0 +1,13 @@
+"""App config module."""
+
+from django.apps import AppConfig
+
+
+class ChatConfig(AppConfig):
+    """Configuration for the chat app.
+
+    Attributes:
+        name (str): The name of the app.
+    """
+
+    name = "chat"
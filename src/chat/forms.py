@@ -0,0 +1,16 @@
+"""Form module."""
+
+from django import forms
+
+
+class MessageForm(forms.Form):
+    """Form for posting in a chat room.
+
+    Attributes:
+        content (CharField): The text of the message.
+    """
+
+    content = forms.CharField(
+        max_length=2000,
+        widget=forms.TextInput(attrs={"autocomplete": "off"}),
+    )
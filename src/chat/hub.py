@@ -0,0 +1,327 @@
+"""Publish/subscribe of the course chat rooms.
+
+A hub fans the messages posted in a course's room out to the streams
+subscribed to it (``chat.views.ChatStreamView``) and keeps the room's last
+``settings.CHAT_HISTORY_SIZE`` messages for the clients that join or
+reconnect. ``settings.CHAT_BACKEND`` names the hub class; ``LocalHub``, the
+default, keeps everything in the memory of the process, which is right for a
+single ASGI process. A hub relaying through a broker (Redis pub/sub,
+Postgres ``LISTEN``) implements the same four methods of ``Hub``.
+
+Subscriptions are an ``asyncio`` queue of ``settings.CHAT_QUEUE_SIZE``
+messages. A client that does not read fast enough to keep it from filling up
+is dropped: its queue is emptied and its stream ends; the browser
+reconnects and catches up from the history, nothing piles up in memory.
+
+Messages get their id from the time they were sent, in microseconds, and are
+saved by a ``BatchWriter``: one ``INSERT`` for every
+``settings.CHAT_PERSIST_BATCH`` messages, or for what arrived in
+``settings.CHAT_PERSIST_INTERVAL`` seconds. The messages of the last
+interval are lost if the process dies.
+"""
+
+import asyncio
+import atexit
+import datetime
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import connections
+from django.utils.module_loading import import_string
+
+from chat.models import Message
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+_hub = None
+
+
+def message_id(sent):
+    """Return the id of a message sent at ``sent``, in microseconds."""
+    return (sent - EPOCH) // datetime.timedelta(microseconds=1)
+
+
+def as_event(message):
+    """Return the JSON-ready form of a saved ``Message``."""
+    return {
+        "id": message_id(message.sent),
+        "user": message.user.username if message.user else "",
+        "content": message.content,
+        "sent": message.sent.isoformat(),
+    }
+
+
+class Subscription:
+    """A stream's queue of messages of a room.
+
+    Attributes:
+        course_id (int): The room.
+        loop (AbstractEventLoop): The event loop the stream runs on.
+        dropped (bool): The subscriber fell behind and was dropped.
+    """
+
+    def __init__(self, course_id, size):
+        """Create a subscription for the running event loop."""
+        self.course_id = course_id
+        self.loop = asyncio.get_running_loop()
+        self.dropped = False
+        self._queue = asyncio.Queue(size)
+
+    def deliver(self, message):
+        """Queue ``message``, or drop the subscriber if its queue is full.
+
+        Must be called on the subscription's event loop.
+        """
+        if self.dropped:
+            return
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped = True
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(None)
+
+    async def get(self, timeout):
+        """Wait for the next message.
+
+        Args:
+            timeout (float): Seconds to wait.
+
+        Returns:
+            dict: The message, ``None`` once the subscriber was dropped.
+
+        Raises:
+            TimeoutError: No message came in time.
+        """
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+
+def _deliver(subscriptions, message):
+    for subscription in subscriptions:
+        subscription.deliver(message)
+
+
+class BatchWriter:
+    """Save messages in batches, from a background thread."""
+
+    def __init__(self, batch_size, interval):
+        """Create a writer.
+
+        Args:
+            batch_size (int): The number of messages saved at once.
+            interval (float): Seconds a message waits for its batch, at most.
+        """
+        self.batch_size = batch_size
+        self.interval = interval
+        self._pending = []
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def add(self, message):
+        """Schedule the ``INSERT`` of an unsaved ``Message``."""
+        with self._lock:
+            self._pending.append(message)
+            if len(self._pending) >= self.batch_size:
+                delay = 0
+            elif self._timer is None:
+                delay = self.interval
+            else:
+                return
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(delay, self._flush_in_thread)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Save the pending messages now.
+
+        Returns:
+            int: The number of messages saved.
+        """
+        with self._lock:
+            batch, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if batch:
+            try:
+                Message.objects.bulk_create(batch)
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Lost %d chat messages", len(batch))
+                return 0
+        return len(batch)
+
+    def _flush_in_thread(self):
+        try:
+            self.flush()
+        finally:
+            connections.close_all()
+
+
+class Hub(ABC):
+    """The interface of the chat backends.
+
+    Backends missing one of the methods cannot be instantiated.
+    """
+
+    @abstractmethod
+    def subscribe(self, course_id):
+        """Subscribe the running event loop to the room of ``course_id``.
+
+        Returns:
+            Subscription: The subscription, to be passed to
+            ``unsubscribe()`` when the stream ends.
+        """
+
+    @abstractmethod
+    def unsubscribe(self, subscription):
+        """Stop delivering messages to ``subscription``."""
+
+    @abstractmethod
+    def publish(self, course_id, user, content):
+        """Post a message in a room, from any thread.
+
+        Args:
+            course_id (int): The room.
+            user (User): The author.
+            content (str): The text of the message.
+
+        Returns:
+            dict: The message, as streamed.
+        """
+
+    @abstractmethod
+    def recent(self, course_id, after=None):
+        """Return the last messages of a room, oldest first.
+
+        May query the database, do not call it from the event loop.
+
+        Args:
+            course_id (int): The room.
+            after (int, optional): Only the messages after this id.
+
+        Returns:
+            list: The messages, as streamed.
+        """
+
+
+class _Room:
+    def __init__(self):
+        self.subscriptions = set()
+        self.history = deque(maxlen=settings.CHAT_HISTORY_SIZE)
+        self.last_id = 0
+        self.loaded = False
+
+
+class LocalHub(Hub):
+    """A hub keeping the rooms in the memory of the process.
+
+    The history of a room is read from the database when it is first used.
+    """
+
+    def __init__(self):
+        """Create an empty hub."""
+        self._rooms = {}
+        self._lock = threading.Lock()
+        self.writer = BatchWriter(
+            settings.CHAT_PERSIST_BATCH, settings.CHAT_PERSIST_INTERVAL
+        )
+        atexit.register(self.writer.flush)
+
+    def _room(self, course_id, load=True):
+        room = self._rooms.get(course_id)
+        if room is None:
+            with self._lock:
+                room = self._rooms.setdefault(course_id, _Room())
+        if load and not room.loaded:
+            messages = (
+                Message.objects.filter(course_id=course_id)
+                .select_related("user")
+                .order_by("-sent")[: settings.CHAT_HISTORY_SIZE]
+            )
+            history = [as_event(message) for message in messages][::-1]
+            with self._lock:
+                if not room.loaded:
+                    room.history.extendleft(reversed(history))
+                    if history:
+                        room.last_id = max(room.last_id, history[-1]["id"])
+                    room.loaded = True
+        return room
+
+    def subscribe(self, course_id):
+        """Subscribe the running event loop to the room of ``course_id``."""
+        subscription = Subscription(course_id, settings.CHAT_QUEUE_SIZE)
+        # no query on the event loop, recent() loads the history
+        room = self._room(course_id, load=False)
+        with self._lock:
+            room.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Stop delivering messages to ``subscription``."""
+        room = self._rooms.get(subscription.course_id)
+        if room is not None:
+            with self._lock:
+                room.subscriptions.discard(subscription)
+
+    def publish(self, course_id, user, content):
+        """Post a message, deliver it and schedule its ``INSERT``."""
+        room = self._room(course_id)
+        with self._lock:
+            # ids must grow even when two messages share a microsecond
+            room.last_id = max(time.time_ns() // 1000, room.last_id + 1)
+            sent = EPOCH + datetime.timedelta(microseconds=room.last_id)
+            message = {
+                "id": room.last_id,
+                "user": user.username,
+                "content": content,
+                "sent": sent.isoformat(),
+            }
+            room.history.append(message)
+            by_loop = defaultdict(list)
+            for subscription in room.subscriptions:
+                by_loop[subscription.loop].append(subscription)
+        self.writer.add(
+            Message(course_id=course_id, user=user, content=content, sent=sent)
+        )
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        for loop, subscriptions in by_loop.items():
+            # one wake-up per event loop, however many subscribers it runs
+            if loop is running:
+                _deliver(subscriptions, message)
+            elif not loop.is_closed():
+                loop.call_soon_threadsafe(_deliver, subscriptions, message)
+        return message
+
+    def recent(self, course_id, after=None):
+        """Return the last messages of a room, oldest first."""
+        room = self._room(course_id)
+        with self._lock:
+            history = list(room.history)
+        if after is not None:
+            history = [message for message in history if message["id"] > after]
+        return history
+
+    def subscribers(self, course_id):
+        """Return the number of streams subscribed to a room."""
+        room = self._rooms.get(course_id)
+        return len(room.subscriptions) if room is not None else 0
+
+
+def get_hub():
+    """Return the hub of the process, built from ``settings.CHAT_BACKEND``."""
+    global _hub  # pylint: disable=global-statement
+    if _hub is None:
+        _hub = import_string(settings.CHAT_BACKEND)()
+    return _hub
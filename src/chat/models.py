@@ -0,0 +1,42 @@
+"""Chat model module."""
+
+from django.contrib.auth.models import User
+from django.db import models
+from django.utils import timezone
+
+from courses.models import Course
+
+
+class Message(models.Model):
+    """A message posted in the chat room of a course.
+
+    Messages reach the room's subscribers from memory first and are saved
+    in batches afterwards, see ``chat.hub``.
+    """
+
+    course = models.ForeignKey(
+        Course, related_name="chat_messages", on_delete=models.CASCADE
+    )
+    user = models.ForeignKey(
+        User,
+        related_name="chat_messages",
+        null=True,
+        on_delete=models.SET_NULL,
+    )
+    content = models.TextField()
+    # microsecond precision, it doubles as the message id of the streams
+    sent = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        """Model options."""
+
+        ordering = ["sent"]
+        indexes = [
+            models.Index(
+                fields=["course", "-sent"], name="message_course_sent_idx"
+            ),
+        ]
+
+    def __str__(self):
+        """Return the author and time of the message."""
+        return f"{self.user} at {self.sent}"
@@ -0,0 +1,143 @@
+"""Unit test case module."""
+
+import asyncio
+import contextlib
+import json
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from chat.hub import Hub, LocalHub, get_hub
+from chat.models import Message
+from courses.models import Course, Subject
+
+
+async def next_event(events):
+    """Return the next chunk of a streamed response."""
+    async for event in events:
+        return event
+    return None
+
+
+@override_settings(
+    CHAT_QUEUE_SIZE=2, CHAT_PERSIST_BATCH=100, CHAT_PERSIST_INTERVAL=60
+)
+class ChatTest(TestCase):
+    """Course chat rooms are open to owners and students only."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a course with an owner, a student and a stranger."""
+        cls.owner = User.objects.create(username="owner")
+        cls.student = User.objects.create(username="student")
+        cls.stranger = User.objects.create(username="stranger")
+        subject = Subject.objects.create(title="Music", slug="music")
+        cls.course = Course.objects.create(
+            owner=cls.owner, subject=subject, title="Tabla", slug="tabla"
+        )
+        cls.course.students.add(cls.student)
+
+    def setUp(self):
+        """Give every test a hub of its own."""
+        patcher = mock.patch("chat.hub._hub", LocalHub())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.hub = get_hub()
+        # before the test database goes away
+        self.addCleanup(self.hub.writer.flush)
+
+    def url(self, name):
+        """Return the URL of a chat view of the course."""
+        return f"/chat/room/{self.course.pk}/{name}"
+
+    def test_access(self):
+        """Owners and students join, strangers and anonymous users do not."""
+        assert self.client.get(self.url("")).status_code == 302
+        self.client.force_login(self.stranger)
+        assert self.client.get(self.url("")).status_code == 404
+        assert self.client.get(self.url("stream/")).status_code == 404
+        for user in (self.owner, self.student):
+            self.client.force_login(user)
+            assert self.client.get(self.url("")).status_code == 200
+        response = self.client.get(f"/students/coursjes/{self.course.pk}/")
+        assert response.status_code == 200
+
+    def test_post(self):
+        """Messages are delivered from memory and saved in batches."""
+        self.client.force_login(self.student)
+        response = self.client.post(self.url("messages/"), {"content": "Hi"})
+        assert response.status_code == 201
+        message = response.json()
+        assert message["user"] == "student"
+        assert self.hub.recent(self.course.pk) == [message]
+        assert not Message.objects.exists()
+        assert self.hub.writer.flush() == 1
+        # a new process reads the history back, with the same ids
+        assert LocalHub().recent(self.course.pk) == [message]
+        response = self.client.post(self.url("messages/"), {"content": ""})
+        assert response.status_code == 400
+
+    def test_wsgi_stream(self):
+        """Under WSGI the stream sends the new messages and ends."""
+        first = self.hub.publish(self.course.pk, self.owner, "One")
+        self.hub.publish(self.course.pk, self.owner, "Two")
+        self.client.force_login(self.student)
+        response = self.client.get(
+            self.url("stream/"), headers={"Last-Event-ID": str(first["id"])}
+        )
+        assert response["Content-Type"] == "text/event-stream"
+        events = response.content.decode().split("\n\n")
+        assert events[0] == "retry: 2000"
+        assert json.loads(events[1].split("data: ")[1])["content"] == "Two"
+        assert events[2:] == [""]
+
+    async def test_asgi_stream(self):
+        """Under ASGI the stream stays open and gets the new messages."""
+        await sync_to_async(self.hub.publish)(self.course.pk, self.owner, "Hi")
+        await self.async_client.aforce_login(self.student)
+        response = await self.async_client.get(self.url("stream/"))
+        events = response.streaming_content
+        assert await next_event(events) == b"retry: 2000\n\n"
+        assert b'"content": "Hi"' in await next_event(events)
+        assert self.hub.subscribers(self.course.pk) == 1
+        self.hub.publish(self.course.pk, self.owner, "Welcome")
+        assert b'"content": "Welcome"' in await next_event(events)
+        # a disconnected client cancels the task sending the response
+        pending = asyncio.ensure_future(next_event(events))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await pending
+        assert self.hub.subscribers(self.course.pk) == 0
+
+    async def test_slow_subscriber(self):
+        """A subscriber that falls behind is dropped, not buffered."""
+        await sync_to_async(self.hub.recent)(self.course.pk)
+        subscription = self.hub.subscribe(self.course.pk)
+        for number in range(3):
+            self.hub.publish(self.course.pk, self.owner, str(number))
+        assert subscription.dropped
+        assert await subscription.get(1) is None
+        assert len(self.hub.recent(self.course.pk)) == 3
+
+
+class HubInterfaceTest(SimpleTestCase):
+    """Chat backends implement the whole ``Hub`` interface."""
+
+    def test_incomplete_backend(self):
+        """A backend missing a method fails when it is built."""
+
+        class PartialHub(Hub):
+            def subscribe(self, course_id):
+                return None
+
+            def unsubscribe(self, subscription):
+                return None
+
+            def publish(self, course_id, user, content):
+                return {}
+
+        with self.assertRaisesMessage(TypeError, "recent"):
+            PartialHub()
@@ -0,0 +1,25 @@
+"""URL configuration for the chat app."""
+
+from django.urls import path
+
+from chat import views
+
+app_name = "chat"
+
+urlpatterns = [
+    path(
+        "room/<int:course_id>/",
+        views.ChatRoomView.as_view(),
+        name="course_chat_room",
+    ),
+    path(
+        "room/<int:course_id>/stream/",
+        views.ChatStreamView.as_view(),
+        name="course_chat_stream",
+    ),
+    path(
+        "room/<int:course_id>/messages/",
+        views.ChatMessageView.as_view(),
+        name="course_chat_post",
+    ),
+]
@@ -0,0 +1,213 @@
+"""View module.
+
+The room streams its messages as server-sent events. Under ASGI a stream is
+a coroutine waiting on its subscription, so a process holds thousands of
+idle ones without a thread each. WSGI cannot keep a response open without
+tying up a worker: there the stream sends what is new and ends, and the
+browser's ``EventSource`` polls by reconnecting after
+``settings.CHAT_RETRY`` milliseconds.
+"""
+
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
+from django.http import (
+    Http404,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.shortcuts import get_object_or_404
+from django.views import View
+from django.views.generic.detail import DetailView
+
+from chat.forms import MessageForm
+from chat.hub import get_hub
+from courses.models import Course
+
+EVENT_STREAM = "text/event-stream"
+
+
+def get_room_course(user, course_id):
+    """Return the course of a chat room ``user`` may join.
+
+    Its owner and its students may.
+
+    Args:
+        user (User): The user.
+        course_id (int): The course of the room.
+
+    Returns:
+        Course: The course.
+
+    Raises:
+        Http404: The course does not exist or ``user`` may not join it.
+    """
+    course = get_object_or_404(Course.cached, pk=course_id)
+    if user.is_authenticated and (
+        course.owner_id == user.pk
+        or course.students.filter(pk=user.pk).exists()
+    ):
+        return course
+    raise Http404
+
+
+def as_sse(message):
+    """Return ``message`` as a server-sent event."""
+    return f"id: {message['id']}\ndata: {json.dumps(message)}\n\n"
+
+
+def last_event_id(request):
+    """Return the id of the last message the client has, if any.
+
+    ``EventSource`` sends it in the ``Last-Event-ID`` header when it
+    reconnects; the room page passes it as ``?after=`` on the first
+    connection.
+    """
+    value = request.headers.get("Last-Event-ID") or request.GET.get("after")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+async def stream_messages(hub, course_id, after):
+    """Yield the messages of a room as server-sent events until the end.
+
+    Subscribes before reading the history so that nothing posted in between
+    is missed, and skips what the history already had. The request's
+    database connection is closed before the stream starts waiting.
+
+    Args:
+        hub (Hub): The chat hub.
+        course_id (int): The room.
+        after (int): Only the messages after this id.
+
+    Yields:
+        str: Events, and comments that keep the connection alive.
+    """
+    subscription = hub.subscribe(course_id)
+    try:
+        yield f"retry: {settings.CHAT_RETRY}\n\n"
+        last_id = after or 0
+        history = await sync_to_async(hub.recent)(course_id, after)
+        # the stream may stay open for hours, not its database connection
+        await sync_to_async(connections.close_all)()
+        for message in history:
+            last_id = message["id"]
+            yield as_sse(message)
+        while True:
+            try:
+                message = await subscription.get(settings.CHAT_KEEPALIVE)
+            except TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if message is None:
+                # dropped, the browser reconnects from its last message
+                return
+            if message["id"] > last_id:
+                last_id = message["id"]
+                yield as_sse(message)
+    finally:
+        hub.unsubscribe(subscription)
+
+
+class ChatRoomView(LoginRequiredMixin, DetailView):
+    """View to display the chat room of a course.
+
+    Attributes:
+        template_name (str): The template to render the room.
+
+    Methods:
+        get_object(queryset=None): Returns the course if the user may chat.
+        get_context_data(**kwargs): Adds the recent messages and the form.
+    """
+
+    template_name = "chat/room.html"
+
+    def get_object(self, queryset=None):  # pylint: disable=unused-argument
+        """Returns the course if the user may chat in its room.
+
+        Args:
+            queryset (QuerySet, optional): Unused, the lookup is by pk.
+
+        Returns:
+            Course: The course.
+        """
+        return get_room_course(self.request.user, self.kwargs["course_id"])
+
+    def get_context_data(self, **kwargs):
+        """Adds the recent messages and the form.
+
+        Args:
+            **kwargs: Additional keyword arguments.
+
+        Returns:
+            dict: The context data for the template.
+        """
+        context = super().get_context_data(**kwargs)
+        context["chat_messages"] = get_hub().recent(self.object.pk)
+        context["form"] = MessageForm()
+        return context
+
+
+class ChatStreamView(View):
+    """View to stream the messages of a chat room as server-sent events."""
+
+    async def get(self, request, course_id):
+        """Streams the messages after the client's last one.
+
+        Args:
+            request (HttpRequest): The request object.
+            course_id (int): The course of the room.
+
+        Returns:
+            HttpResponse: The event stream.
+        """
+        user = await request.auser()
+        await sync_to_async(get_room_course)(user, course_id)
+        hub = get_hub()
+        after = last_event_id(request)
+        if isinstance(request, ASGIRequest):
+            response = StreamingHttpResponse(
+                stream_messages(hub, course_id, after),
+                content_type=EVENT_STREAM,
+            )
+            # proxies must not wait for the end of the stream
+            response["X-Accel-Buffering"] = "no"
+        else:
+            messages = await sync_to_async(hub.recent)(course_id, after)
+            response = HttpResponse(
+                f"retry: {settings.CHAT_RETRY}\n\n"
+                + "".join(as_sse(message) for message in messages),
+                content_type=EVENT_STREAM,
+            )
+        response["Cache-Control"] = "no-cache"
+        return response
+
+
+class ChatMessageView(LoginRequiredMixin, View):
+    """View to post a message in a chat room."""
+
+    def post(self, request, course_id):
+        """Publishes the message to the room.
+
+        Args:
+            request (HttpRequest): The request object.
+            course_id (int): The course of the room.
+
+        Returns:
+            JsonResponse: The message, or the form errors.
+        """
+        course = get_room_course(request.user, course_id)
+        form = MessageForm(request.POST)
+        if not form.is_valid():
+            return JsonResponse({"errors": form.errors}, status=400)
+        message = get_hub().publish(
+            course.pk, request.user, form.cleaned_data["content"]
+        )
+        return JsonResponse(message, status=201)
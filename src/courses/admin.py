@@ -1,12 +1,12 @@
 from django.contrib import admin
-from .models import Subject, Course, Module
+from .models import Subject, Course, Module, Prerequisite
 
 
 # admin.site.index_template = 'memcache_status/admin_index.html';
 
 @admin.register(Subject)
 class SubjectAdmin(admin.ModelAdmin):
-    list_display = ['title', 'slug']
+    list_display = ['title', 'slug', 'parent', 'course_total']
     prepopulated_fields = {"slug": ('title',)}
 
 
@@ -14,10 +14,16 @@ class ModuleInline(admin.StackedInline):
     model = Module
 
 
+class PrerequisiteInline(admin.TabularInline):
+    model = Prerequisite
+    fk_name = 'course'
+    extra = 1
+
+
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
     list_display = ['title', 'subject', 'created']
     list_filter = ['created', 'subject']
     search_fields = ['title', 'overview']
     prepopulated_fields = {'slug': ('title',)}
-    inlines = [ModuleInline]
+    inlines = [PrerequisiteInline, ModuleInline]
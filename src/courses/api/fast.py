@@ -0,0 +1,193 @@
+"""Read-only fast-path serializers for the list endpoints.
+
+``ModelSerializer`` instantiates a serializer per object and walks its fields
+one by one. These serializers read ``values_list()`` rows instead and turn
+them into dicts through key maps computed once per serializer, producing the
+same JSON as their DRF counterparts (``FastSerializerTest`` compares the two
+byte for byte). Nested relations are fetched with one query per relation,
+grouped by parent.
+
+They understand the ``fields``/``expand`` trees of ``courses.api.selection``.
+"""
+
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from courses.models import Course, CourseRecommendation, Module, Subject
+
+
+class FastSerializer:
+    """Build plain dicts from ``values_list()`` rows.
+
+    Subclasses declare:
+
+    Attributes:
+        model (class): The serialized model.
+        fields (list): The output keys, in the DRF serializer's order.
+        converters (dict): Functions applied to a key's column value.
+        nested (dict): ``key: (FastSerializer subclass, link)`` where ``link``
+            is the child's foreign key to this model.
+        flat (bool): Output the value of the single field instead of a dict,
+            like a DRF related field with ``many=True``. Flat children are
+            plain fields, ``expand`` does not apply to them.
+    """
+
+    model = None
+    fields = []
+    converters = {}
+    nested = {}
+    flat = False
+
+    def __init__(self, fields=None, expand=None):
+        """Precompute the selected keys, columns and nested serializers.
+
+        Args:
+            fields (dict | None): The ``fields`` tree, None keeps all.
+            expand (dict | None): The ``expand`` tree, None expands all.
+        """
+        self.keys = [
+            key
+            for key in self.fields
+            if (fields is None or key in fields)
+            and not (
+                key in self.nested
+                and not self.nested[key][0].flat
+                and expand is not None
+                and key not in expand
+            )
+        ]
+        self.columns = [key for key in self.keys if key not in self.nested]
+        self.children = {
+            key: (
+                self.nested[key][0](
+                    fields and fields.get(key),
+                    None if expand is None else expand.get(key) or {},
+                ),
+                self.nested[key][1],
+            )
+            for key in self.keys
+            if key in self.nested
+        }
+        # row[0] is the primary key, the selected columns follow
+        positions = {
+            column: index for index, column in enumerate(self.columns, 1)
+        }
+        self._getters = [
+            (key, positions.get(key), self.converters.get(key))
+            for key in self.keys
+        ]
+
+    def serialize(self, queryset):
+        """Serialize every row of ``queryset``.
+
+        Args:
+            queryset (QuerySet): A queryset of ``model``.
+
+        Returns:
+            list: One dict per object.
+        """
+        rows = queryset.values_list("pk", *self.columns)
+        return self._build(rows, queryset)
+
+    def grouped(self, link, parents):
+        """Serialize the objects of many parents, grouped by parent.
+
+        Args:
+            link (str): The foreign key to the parent model.
+            parents (QuerySet): The parents.
+
+        Returns:
+            dict: ``{parent pk: [dict, ...]}``.
+        """
+        queryset = self.model.objects.filter(
+            **{f"{link}__in": parents.values("pk")}
+        )
+        rows = list(queryset.values_list(link, "pk", *self.columns))
+        groups = {}
+        for parent, data in zip(
+            (row[0] for row in rows),
+            self._build([row[1:] for row in rows], queryset),
+        ):
+            groups.setdefault(parent, []).append(data)
+        return groups
+
+    def _build(self, rows, queryset):
+        if self.flat:
+            return [row[1] for row in rows]
+        nested = {
+            key: child.grouped(link, queryset)
+            for key, (child, link) in self.children.items()
+        }
+        result = []
+        for row in rows:
+            data = {}
+            for key, position, converter in self._getters:
+                if position is None:
+                    data[key] = nested[key].get(row[0], [])
+                elif converter is None:
+                    data[key] = row[position]
+                else:
+                    data[key] = converter(row[position])
+            result.append(data)
+        return result
+
+
+class FastSubjectSerializer(FastSerializer):
+    """Fast counterpart of ``SubjectSerializer``."""
+
+    model = Subject
+    fields = ["id", "title", "slug", "parent"]
+
+
+class FastModuleSerializer(FastSerializer):
+    """Fast counterpart of ``ModuleSerializer``."""
+
+    model = Module
+    fields = ["order", "title", "description"]
+
+
+class FastRecommendationSerializer(FastSerializer):
+    """Fast counterpart of ``CourseSerializer.recommended``."""
+
+    model = CourseRecommendation
+    fields = ["recommended"]
+    flat = True
+
+
+class FastCourseSerializer(FastSerializer):
+    """Fast counterpart of ``CourseSerializer``."""
+
+    model = Course
+    fields = [
+        "id",
+        "subject",
+        "title",
+        "slug",
+        "overview",
+        "created",
+        "owner",
+        "modules",
+        "recommended",
+    ]
+    converters = {"created": serializers.DateTimeField().to_representation}
+    nested = {
+        "modules": (FastModuleSerializer, "course"),
+        "recommended": (FastRecommendationSerializer, "course"),
+    }
+
+
+class FastListMixin:
+    """Serve unpaginated ``list`` requests through ``fast_serializer_class``.
+
+    Expects ``courses.api.selection.FieldSelectionMixin`` on the view.
+    """
+
+    fast_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        """List the objects with the fast serializer."""
+        if self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.queryset.all())
+        serializer = self.fast_serializer_class(**self.get_selection())
+        return Response(serializer.serialize(queryset))
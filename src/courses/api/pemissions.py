@@ -3,4 +3,9 @@ from rest_framework.permissions import BasePermission
 
 class IsEnrolled(BasePermission):
     def has_object_permission(self, request, view, obj):
-        return obj.students.filter(id=request.user.id).exists()
\ No newline at end of file
+        return obj.students.filter(id=request.user.id).exists()
+
+
+class IsOwner(BasePermission):
+    def has_object_permission(self, request, view, obj):
+        return obj.owner_id == request.user.id
@@ -0,0 +1,166 @@
+"""Field selection and expansion for the API serializers.
+
+Two query parameters shape a response:
+
+* ``fields`` whitelists fields, with dotted paths for nested ones:
+  ``?fields=id,title,modules.title``. A field named without a sub-path keeps
+  all of its own fields.
+* ``expand`` lists the relations (``Meta.expandable_fields``) to nest:
+  ``?expand=modules`` nests modules but not their contents. Without
+  ``expand`` every relation is nested, as before.
+
+The pruned serializer also drives the query: only the selected columns are
+loaded and only the nested relations are prefetched, so a relation that is
+not requested is neither loaded nor serialized.
+"""
+
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework.relations import ManyRelatedField
+from rest_framework.serializers import BaseSerializer
+
+
+def parse_paths(value):
+    """Parse a comma-separated list of dotted paths into a tree.
+
+    Args:
+        value (str | None): The query parameter value.
+
+    Returns:
+        dict | None: ``{name: subtree}`` where a ``None`` subtree means the
+        whole field, or None when the parameter is absent.
+
+    Example:
+        >>> parse_paths("id,modules.title")
+        {'id': None, 'modules': {'title': None}}
+    """
+    if value is None:
+        return None
+    tree = {}
+    for path in filter(None, (part.strip() for part in value.split(","))):
+        node = tree
+        *parents, leaf = path.split(".")
+        for parent in parents:
+            if parent in node and node[parent] is None:
+                break  # the whole field is already selected
+            node = node.setdefault(parent, {})
+        else:
+            node[leaf] = None
+    return tree
+
+
+class SelectableFieldsMixin:
+    """Let a serializer drop fields according to ``fields``/``expand`` trees.
+
+    The trees are passed as the ``fields`` and ``expand`` keyword arguments
+    and are applied to nested ``SelectableFieldsMixin`` serializers too.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        """Create the serializer and prune its fields."""
+        super().__init__(*args, **kwargs)
+        self.prune(fields, expand)
+
+    def prune(self, fields=None, expand=None):
+        """Drop the fields that are not selected or not expanded.
+
+        Args:
+            fields (dict | None): The ``fields`` tree, None keeps all.
+            expand (dict | None): The ``expand`` tree, None expands all.
+        """
+        expandable = getattr(self.Meta, "expandable_fields", ())
+        for name in list(self.fields):
+            unselected = fields is not None and name not in fields
+            collapsed = expand is not None and name in expandable
+            if unselected or (collapsed and name not in expand):
+                del self.fields[name]
+        for name, field in self.fields.items():
+            child = getattr(field, "child", field)
+            if isinstance(child, SelectableFieldsMixin):
+                child.prune(
+                    fields and fields.get(name),
+                    None if expand is None else expand.get(name) or {},
+                )
+
+
+def optimize_queryset(queryset, serializer):
+    """Load only what ``serializer`` renders.
+
+    Args:
+        queryset (QuerySet): The queryset of the serializer's model.
+        serializer (ModelSerializer): A pruned serializer instance.
+
+    Returns:
+        QuerySet: The queryset restricted with ``only()`` and prefetching
+        exactly the nested relations.
+    """
+    only, prefetches = _plan(serializer)
+    return queryset.only(*only).prefetch_related(*prefetches)
+
+
+def _plan(serializer):
+    opts = serializer.Meta.model._meta  # pylint: disable=protected-access
+    only = {opts.pk.name}
+    prefetches = []
+    for field in serializer.fields.values():
+        try:
+            model_field = opts.get_field(field.source)
+        except FieldDoesNotExist:
+            continue
+        child = getattr(field, "child", field)
+        if isinstance(model_field, GenericForeignKey):
+            only.update((model_field.ct_field, model_field.fk_field))
+            prefetches.append(field.source)
+        elif isinstance(child, BaseSerializer) and model_field.one_to_many:
+            child_only, child_prefetches = _plan(child)
+            child_only.add(model_field.field.name)
+            related = model_field.related_model.objects.only(*child_only)
+            prefetches.append(
+                Prefetch(
+                    field.source,
+                    queryset=related.prefetch_related(*child_prefetches),
+                )
+            )
+        elif isinstance(field, ManyRelatedField) and model_field.one_to_many:
+            prefetches.append(field.source)
+        elif model_field.concrete:
+            only.add(model_field.name)
+    return only, prefetches
+
+
+class FieldSelectionMixin:
+    """Apply the ``fields``/``expand`` query parameters to a DRF view.
+
+    The view's serializers are pruned, and ``get_queryset()`` is restricted to
+    what the pruned serializer renders.
+    """
+
+    def get_selection(self):
+        """Return the parsed ``fields`` and ``expand`` trees.
+
+        Returns:
+            dict: The ``fields`` and ``expand`` serializer keyword arguments.
+        """
+        params = self.request.query_params
+        return {
+            "fields": parse_paths(params.get("fields")),
+            "expand": parse_paths(params.get("expand")),
+        }
+
+    def get_serializer(self, *args, **kwargs):
+        """Return a serializer pruned by the query parameters."""
+        kwargs.update(self.get_selection())
+        return super().get_serializer(*args, **kwargs)
+
+    def optimize_queryset(self, queryset):
+        """Restrict ``queryset`` to what the pruned serializer renders.
+
+        Args:
+            queryset (QuerySet): The view's queryset.
+
+        Returns:
+            QuerySet: The optimized queryset.
+        """
+        serializer = self.get_serializer_class()(**self.get_selection())
+        return optimize_queryset(queryset, serializer)
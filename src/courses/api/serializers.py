@@ -1,68 +1,60 @@
 from rest_framework import serializers
 from ..models import Subject, Course, Module, Content
+from ..rendering import ModuleRenderer
+from .selection import SelectableFieldsMixin
 
 
-class SubjectSerializer(serializers.ModelSerializer):
+class SubjectSerializer(SelectableFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Subject
-        fields = ['id', 'title', 'slug']
+        fields = ['id', 'title', 'slug', 'parent']
 
 
-class ModuleSerializer(serializers.ModelSerializer):
+class ModuleSerializer(SelectableFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Module
         fields = ['order', 'title', 'description']
 
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(SelectableFieldsMixin, serializers.ModelSerializer):
     modules = ModuleSerializer(many=True, read_only=True)
+    recommended = serializers.SlugRelatedField(source='recommendations', slug_field='recommended_id', many=True, read_only=True)
 
     class Meta:
         model = Course
-        fields = ['id', 'subject', 'title', 'slug', 'overview', 'created', 'owner', 'modules']
+        fields = ['id', 'subject', 'title', 'slug', 'overview', 'created', 'owner', 'modules', 'recommended']
+        expandable_fields = ['modules']
 
 
 class ItemRelatedField(serializers.RelatedField):
     def to_representation(self, value):
-        return value.render()
+        # one renderer per serialization, shared through the root's context
+        renderer = self.context.setdefault('item_renderer', ModuleRenderer())
+        return renderer.render_item(value)
 
 
-class ContentSerializer(serializers.ModelSerializer):
+class ContentSerializer(SelectableFieldsMixin, serializers.ModelSerializer):
     item = ItemRelatedField(read_only=True)
 
     class Meta:
         model = Content
         fields = ['order', 'item']
+        expandable_fields = ['item']
 
 
-class ModuleWithContentSerializer(serializers.ModelSerializer):
+class ModuleWithContentSerializer(SelectableFieldsMixin, serializers.ModelSerializer):
     contents = ContentSerializer(many=True)
 
     class Meta:
         model = Module
         fields = ['order', 'title', 'description', 'contents']
+        expandable_fields = ['contents']
 
 
-class CourseWithContentSerializer(serializers.ModelSerializer):
+class CourseWithContentSerializer(SelectableFieldsMixin, serializers.ModelSerializer):
     modules = ModuleWithContentSerializer(many=True)
 
     class Meta:
         model = Course
         fields = ['id', 'subject', 'title', 'slug', 'overview', 'created', 'owner', 'modules']
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+        expandable_fields = ['modules']
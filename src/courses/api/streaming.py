@@ -0,0 +1,191 @@
+"""Streaming renditions of the course API payloads.
+
+``CourseWithContentSerializer`` builds the whole nested structure before DRF
+renders it into a single string. The generators here emit the same JSON
+document piece by piece instead: contents are read module by module from
+chunked queryset iterators (items prefetched per chunk) and rendered with one
+shared ``ModuleRenderer``, so memory stays flat whatever the course size and
+the first bytes leave as soon as the course header is known.
+"""
+
+import zlib
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from courses.api.selection import SelectableFieldsMixin
+from courses.api.serializers import (
+    CourseSerializer,
+    CourseWithContentSerializer,
+    ModuleSerializer,
+)
+from courses.models import Course
+from courses.rendering import ModuleRenderer
+
+CHUNK_SIZE = 200
+
+BUFFER_SIZE = 64 * 1024
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+
+class CourseHeaderSerializer(
+    SelectableFieldsMixin, serializers.ModelSerializer
+):
+    """The scalar fields of ``CourseWithContentSerializer``, in its order."""
+
+    class Meta:
+        """Serializer options."""
+
+        model = Course
+        fields = [
+            field
+            for field in CourseWithContentSerializer.Meta.fields
+            if field != "modules"
+        ]
+
+
+def _open(renderer, data):
+    # the JSON object of data, left open for one more member
+    rendered = renderer.render(data)[:-1]
+    return rendered + b"," if data else rendered
+
+
+def iter_course_contents(
+    course, chunk_size=CHUNK_SIZE, fields=None, expand=None
+):
+    """Yield ``CourseWithContentSerializer(course).data`` as JSON pieces.
+
+    Relations left out by ``fields`` or ``expand`` are not queried.
+
+    Args:
+        course (Course): The course to serialize.
+        chunk_size (int): The number of contents fetched per query.
+        fields (dict, optional): The ``fields`` tree of ``parse_paths()``.
+        expand (dict, optional): The ``expand`` tree of ``parse_paths()``.
+
+    Yields:
+        bytes: Consecutive pieces of the JSON document.
+    """
+    renderer = JSONRenderer()
+    item_renderer = ModuleRenderer()
+    selected = CourseWithContentSerializer(fields=fields, expand=expand).fields
+    header = CourseHeaderSerializer(course, fields=fields).data
+    if "modules" not in selected:
+        yield renderer.render(header)
+        return
+    module_fields = fields and fields.get("modules")
+    nested = selected["modules"].child.fields
+    content_fields = (
+        nested["contents"].child.fields if "contents" in nested else None
+    )
+    yield _open(renderer, header) + b'"modules":['
+    for module_index, module in enumerate(course.modules.all()):
+        module_header = ModuleSerializer(module, fields=module_fields).data
+        if content_fields is None:
+            yield (b"," if module_index else b"") + renderer.render(
+                module_header
+            )
+            continue
+        yield (b"," if module_index else b"") + _open(renderer, module_header)
+        yield b'"contents":['
+        contents = module.contents.all()
+        if "item" in content_fields:
+            contents = contents.prefetch_related("item")
+        for content_index, content in enumerate(
+            contents.iterator(chunk_size=chunk_size)
+        ):
+            data = {}
+            if "order" in content_fields:
+                data["order"] = content.order
+            if "item" in content_fields:
+                item = content.item
+                data["item"] = item and item_renderer.render_item(item)
+            yield (b"," if content_index else b"") + renderer.render(data)
+        yield b"]}"
+    yield b"]}"
+
+
+def iter_courses_ndjson(queryset, chunk_size=CHUNK_SIZE, **serializer_kwargs):
+    """Yield one ``CourseSerializer`` JSON document per line.
+
+    Args:
+        queryset (QuerySet): The courses to serialize, prefetching what the
+            serializer nests (prefetches run once per chunk).
+        chunk_size (int): The number of courses fetched per query.
+        **serializer_kwargs: Extra ``CourseSerializer`` arguments, such as
+            the ``fields``/``expand`` selection.
+
+    Yields:
+        bytes: One newline-terminated JSON document per course.
+    """
+    renderer = JSONRenderer()
+    courses = queryset.iterator(chunk_size=chunk_size)
+    while chunk := list(islice(courses, chunk_size)):
+        serializer = CourseSerializer(chunk, many=True, **serializer_kwargs)
+        for data in serializer.data:
+            yield renderer.render(data) + b"\n"
+
+
+def buffered(pieces, size=BUFFER_SIZE):
+    """Coalesce small pieces into chunks of about ``size`` bytes.
+
+    Args:
+        pieces (Iterable[bytes]): The pieces to coalesce.
+        size (int): The target chunk size.
+
+    Yields:
+        bytes: Chunks of at least ``size`` bytes, except for the last one.
+    """
+    buffer = []
+    length = 0
+    for piece in pieces:
+        buffer.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield b"".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def gzipped(chunks, level=6):
+    """Gzip a chunk stream, flushing after every chunk.
+
+    The sync flush lets the client decompress each chunk as it arrives.
+
+    Args:
+        chunks (Iterable[bytes]): The chunks to compress.
+        level (int): The zlib compression level.
+
+    Yields:
+        bytes: The gzip stream.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def streaming_response(request, pieces, content_type):
+    """Build a ``StreamingHttpResponse``, gzipped if the client accepts it.
+
+    Args:
+        request (HttpRequest): The request being answered.
+        pieces (Iterable[bytes]): The response body pieces.
+        content_type (str): The response content type.
+
+    Returns:
+        StreamingHttpResponse: The response.
+    """
+    chunks = buffered(pieces)
+    compress = "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", "")
+    if compress:
+        chunks = gzipped(chunks)
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response["Vary"] = "Accept-Encoding"
+    if compress:
+        response["Content-Encoding"] = "gzip"
+    return response
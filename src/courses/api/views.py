@@ -5,32 +5,86 @@ from rest_framework.authentication import BasicAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import generics
+from rest_framework import generics, status
+from ..cloning import clone_course
 from ..models import Subject, Course
 from .serializers import SubjectSerializer, CourseSerializer
-from .pemissions import IsEnrolled
+from .pemissions import IsEnrolled, IsOwner
+from .fast import FastCourseSerializer, FastListMixin, FastSubjectSerializer
+from .selection import FieldSelectionMixin
 from .serializers import CourseWithContentSerializer
+from .streaming import (NDJSON_CONTENT_TYPE, iter_course_contents,
+                        iter_courses_ndjson, streaming_response)
 
 
-class SubjectListView(generics.ListAPIView):
+class SubjectListView(FastListMixin, FieldSelectionMixin, generics.ListAPIView):
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
+    fast_serializer_class = FastSubjectSerializer
 
+    def get_queryset(self):
+        return self.optimize_queryset(super().get_queryset())
 
-class SubjectDetailView(generics.RetrieveAPIView):
+
+class SubjectDetailView(FieldSelectionMixin, generics.RetrieveAPIView):
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
 
+    def get_queryset(self):
+        return self.optimize_queryset(super().get_queryset())
+
 
-class CourseViewSet(viewsets.ReadOnlyModelViewSet):
+class CourseViewSet(FastListMixin, FieldSelectionMixin, viewsets.ReadOnlyModelViewSet):
+    """Courses, with ``?stream=1`` streaming variants of ``list`` and ``contents``.
+
+    ``list`` streams NDJSON (one course per line) and ``contents`` streams the
+    same JSON document it normally returns, both gzipped per chunk when the
+    client accepts it. ``list`` is served by ``FastCourseSerializer``. Every
+    rendition honours ``?fields=`` and ``?expand=`` (see
+    ``courses.api.selection``).
+    """
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
+    fast_serializer_class = FastCourseSerializer
+
+    def is_streaming(self):
+        return self.request.query_params.get('stream') in ('1', 'true')
+
+    def get_object(self):
+        # enroll, duplicate and the streamed contents only need the course
+        # itself, which the object cache serves; the other actions rely on
+        # get_queryset() prefetching what their serializer nests
+        if self.action not in ('enroll', 'duplicate') and not (
+                self.action == 'contents' and self.is_streaming()):
+            return super().get_object()
+        course = get_object_or_404(Course.cached, pk=self.kwargs['pk'])
+        self.check_object_permissions(self.request, course)
+        return course
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'unlocked', 'retrieve', 'contents') and not self.is_streaming():
+            queryset = self.optimize_queryset(queryset)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if self.is_streaming():
+            queryset = self.optimize_queryset(
+                self.filter_queryset(self.get_queryset()))
+            pieces = iter_courses_ndjson(queryset, **self.get_selection())
+            return streaming_response(request, pieces, NDJSON_CONTENT_TYPE)
+        return super().list(request, *args, **kwargs)
 
     @action(detail=True, methods=['get'],
             serializer_class=CourseWithContentSerializer,
             authentication_classes=[BasicAuthentication],
             permission_classes=[IsAuthenticated, IsEnrolled])
     def contents(self, request, *args, **kwargs):
+        if self.is_streaming():
+            return streaming_response(
+                request,
+                iter_course_contents(self.get_object(), **self.get_selection()),
+                'application/json')
         return self.retrieve(request, *args, **kwargs)
 
     @action(detail=True, methods=['post'],
@@ -38,5 +92,25 @@ class CourseViewSet(viewsets.ReadOnlyModelViewSet):
             permission_classes=[IsAuthenticated])
     def enroll(self, request, *args, **kwargs):
         course = self.get_object()
+        missing = Course.objects.missing_prerequisites(course, request.user)
+        missing = list(missing.values_list('pk', flat=True))
+        if missing:
+            return Response({'enrolled': False, 'missing_prerequisites': missing},
+                            status=status.HTTP_403_FORBIDDEN)
         course.students.add(request.user)
         return Response({'enrolled': True})
+
+    @action(detail=False, methods=['get'],
+            authentication_classes=[BasicAuthentication],
+            permission_classes=[IsAuthenticated])
+    def unlocked(self, request, *args, **kwargs):
+        # the courses whose prerequisites the user has all completed
+        queryset = self.filter_queryset(self.get_queryset()).unlocked_for(request.user)
+        return Response(self.get_serializer(queryset, many=True).data)
+
+    @action(detail=True, methods=['post'],
+            authentication_classes=[BasicAuthentication],
+            permission_classes=[IsAuthenticated, IsOwner])
+    def duplicate(self, request, *args, **kwargs):
+        clone = clone_course(self.get_object(), owner=request.user)
+        return Response(CourseSerializer(clone).data, status=status.HTTP_201_CREATED)
@@ -1,5 +1,93 @@
+"""App config module."""
+
 from django.apps import AppConfig
+from django.core import checks
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+
+from courses import pagecache
+from courses.checks import shared_cache_check
+from courses.db import configure_sqlite_connection
 
 
 class CoursesConfig(AppConfig):
-    name = 'courses'
+    """Configuration for the courses' app.
+
+    Attributes:
+        name (str): The name of the app.
+    """
+
+    name = "courses"
+
+    def ready(self):
+        """Register the checks, connect the database, cache and other hooks."""
+        # pylint: disable-next=import-outside-toplevel
+        from courses import export, prerequisites, recommendations, subjects
+
+        checks.register(shared_cache_check, checks.Tags.caches, deploy=True)
+        connection_created.connect(
+            configure_sqlite_connection,
+            dispatch_uid="courses.configure_sqlite_connection",
+        )
+        receivers = {
+            "Subject": pagecache.purge_subject,
+            "Course": pagecache.purge_course,
+            "Module": pagecache.purge_module,
+        }
+        for model_name, receiver in receivers.items():
+            model = self.get_model(model_name)
+            for signal in (post_save, post_delete):
+                signal.connect(
+                    receiver,
+                    sender=model,
+                    dispatch_uid=f"courses.{receiver.__name__}",
+                )
+        touches = {
+            "Module": export.touch_module_course,
+            "Content": export.touch_content_course,
+            "Text": export.touch_item_courses,
+            "File": export.touch_item_courses,
+            "Image": export.touch_item_courses,
+            "Video": export.touch_item_courses,
+        }
+        for model_name, receiver in touches.items():
+            model = self.get_model(model_name)
+            for signal in (post_save, post_delete):
+                signal.connect(
+                    receiver,
+                    sender=model,
+                    dispatch_uid=f"courses.{receiver.__name__}.{model_name}",
+                )
+        totals = [
+            (post_save, "Course", subjects.course_saved),
+            (post_delete, "Course", subjects.course_deleted),
+            (post_delete, "Subject", subjects.subject_deleted),
+        ]
+        for signal, model_name, receiver in totals:
+            signal.connect(
+                receiver,
+                sender=self.get_model(model_name),
+                dispatch_uid=f"courses.subjects.{receiver.__name__}",
+            )
+        closure = [
+            (pre_save, prerequisites.edge_saving),
+            (post_save, prerequisites.edge_saved),
+            (pre_delete, prerequisites.edge_deleting),
+        ]
+        for signal, receiver in closure:
+            signal.connect(
+                receiver,
+                sender=self.get_model("Prerequisite"),
+                dispatch_uid=f"courses.prerequisites.{receiver.__name__}",
+            )
+        m2m_changed.connect(
+            recommendations.enrollments_changed,
+            sender=self.get_model("Course").students.through,
+            dispatch_uid="courses.recommendations.enrollments_changed",
+        )
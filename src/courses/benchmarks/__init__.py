@@ -0,0 +1,69 @@
+"""Benchmarks for Kalakar's hot paths.
+
+Benchmarks are run with ``python manage.py benchmark <name>``. Every module
+listed in ``BENCHMARKS`` exposes:
+
+* ``description``: a one-line description shown by the command.
+* ``add_arguments(parser)``: registers the benchmark's own options.
+* ``run(**options)``: runs the benchmark and returns a list of result rows
+  (dicts) that the command prints as a table.
+* ``check(rows, **options)`` (optional): raises ``CommandError`` when the
+  printed results are a failure, e.g. a regression.
+
+Benchmarks never touch the configured databases: they run inside
+``benchmark_database()``, which sets up throwaway file-backed copies the same
+way the test runner does.
+"""
+
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.test.utils import setup_databases, teardown_databases
+
+BENCHMARKS = {
+    "cloning": "courses.benchmarks.cloning",
+    "chat": "courses.benchmarks.chat",
+    "micro": "courses.benchmarks.micro",
+    "pagecache": "courses.benchmarks.pagecache",
+    "render": "courses.benchmarks.render",
+    "serializers": "courses.benchmarks.serializers",
+    "sqlite_concurrency": "courses.benchmarks.concurrency",
+}
+
+
+@contextmanager
+def benchmark_database():
+    """Run the block against throwaway, migrated copies of the databases.
+
+    SQLite databases are created as files (not in memory) so that journal
+    modes and locking behave as they do in production.
+    """
+    directory = tempfile.mkdtemp(prefix="kalakar-bench-")
+    mirrors = {}
+    for alias in connections:
+        test = settings.DATABASES[alias].setdefault("TEST", {})
+        if test.get("MIRROR"):
+            mirrors[alias] = test["MIRROR"]
+        elif connections[alias].vendor == "sqlite":
+            test["NAME"] = os.path.join(directory, f"{alias}.sqlite3")
+    old_config = setup_databases(
+        verbosity=0, interactive=False, serialized_aliases=()
+    )
+    # set_as_test_mirror() only rewires the current thread's connection,
+    # point every thread's mirror at the benchmark database as well.
+    mirror_names = {}
+    for alias, mirror in mirrors.items():
+        mirror_names[alias] = settings.DATABASES[alias]["NAME"]
+        settings.DATABASES[alias]["NAME"] = settings.DATABASES[mirror]["NAME"]
+    try:
+        yield
+    finally:
+        connections.close_all()
+        teardown_databases(old_config, verbosity=0)
+        for alias, name in mirror_names.items():
+            settings.DATABASES[alias]["NAME"] = name
+        shutil.rmtree(directory, ignore_errors=True)
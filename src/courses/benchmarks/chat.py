@@ -0,0 +1,134 @@
+"""Idle chat streams held by one ASGI process, and the cost of a fan-out.
+
+Opens ``--connections`` event streams on a course's chat room through the
+ASGI application (the whole middleware stack, no server), posts messages
+and times until every stream has sent each one, then disconnects them all.
+Memory is the growth of the process's peak RSS while the streams are open.
+"""
+
+import asyncio
+import statistics
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.test import Client
+
+from chat.hub import get_hub
+from courses.benchmarks.data import make_course, make_users
+
+description = "Idle chat streams per ASGI process and fan-out latency."
+
+
+def add_arguments(parser):
+    """Register the benchmark options."""
+    parser.add_argument("--connections", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=20)
+
+
+class _Connection:
+    def __init__(self, application, scope):
+        self.chunks = 0
+        self.received = asyncio.Event()
+        self.closed = asyncio.Event()
+        self._started = False
+        self.task = asyncio.ensure_future(
+            application(scope, self.receive, self.send)
+        )
+
+    async def receive(self):
+        if not self._started:
+            self._started = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await self.closed.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            self.chunks += 1
+            self.received.set()
+
+
+def _max_rss():
+    # kilobytes on Linux; resource is POSIX-only, and the benchmark command
+    # imports this module to list it
+    # pylint: disable-next=import-outside-toplevel
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+async def _run(course, cookie, connections, messages, author):
+    application = get_asgi_application()
+    hub = get_hub()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": f"/chat/room/{course.pk}/stream/",
+        "query_string": b"",
+        "headers": [(b"host", b"localhost"), (b"cookie", cookie)],
+        "client": ("127.0.0.1", 0),
+        "server": ("localhost", 80),
+    }
+    rss = _max_rss()
+    started = time.perf_counter()
+    streams = [_Connection(application, scope) for _ in range(connections)]
+    # the first chunk (retry:) means the stream is subscribed
+    await asyncio.gather(*(stream.received.wait() for stream in streams))
+    opened = time.perf_counter() - started
+    memory = (_max_rss() - rss) / connections
+
+    publish = sync_to_async(hub.publish)
+    fan_out = []
+    for number in range(messages):
+        for stream in streams:
+            stream.received.clear()
+        started = time.perf_counter()
+        await publish(course.pk, author, f"Message {number}")
+        await asyncio.gather(*(stream.received.wait() for stream in streams))
+        fan_out.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for stream in streams:
+        stream.closed.set()
+    await asyncio.gather(*(stream.task for stream in streams))
+    closed = time.perf_counter() - started
+    return {
+        "connections": connections,
+        "open s": round(opened, 2),
+        "KiB/connection": round(memory, 1),
+        "fan-out ms (median)": round(statistics.median(fan_out) * 1000, 1),
+        "fan-out ms (max)": round(max(fan_out) * 1000, 1),
+        "close s": round(closed, 2),
+        "subscribers left": hub.subscribers(course.pk),
+        "delivered": sum(stream.chunks for stream in streams),
+    }
+
+
+def run(connections, messages, **options):  # pylint: disable=unused-argument
+    """Run the benchmark and return its result row.
+
+    Args:
+        connections (int): The number of streams held open.
+        messages (int): The number of messages posted.
+        **options: Other command options.
+
+    Returns:
+        list: The result rows.
+    """
+    owner, student = make_users(2)
+    course = make_course(owner, "chat", modules=0)
+    course.students.add(student)
+    client = Client()
+    client.force_login(student)
+    cookie = f"{settings.SESSION_COOKIE_NAME}="
+    cookie += client.cookies[settings.SESSION_COOKIE_NAME].value
+    row = asyncio.run(
+        _run(course, cookie.encode(), connections, messages, owner)
+    )
+    get_hub().writer.flush()
+    return [row]
@@ -0,0 +1,68 @@
+"""Queries and time taken by ``clone_course()``."""
+
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from courses.benchmarks.data import (
+    ITEM_FIELDS,
+    attach_items,
+    make_course,
+    make_items,
+    make_users,
+)
+from courses.cloning import clone_course
+
+description = "Queries and time taken by clone_course()."
+
+
+def add_arguments(parser):
+    """Register the benchmark options."""
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[100, 500, 2000],
+        help="Course sizes, in items.",
+    )
+    parser.add_argument("--modules", type=int, default=20)
+
+
+def run(sizes, modules, **options):  # pylint: disable=unused-argument
+    """Run the benchmark and return one row per course size.
+
+    Args:
+        sizes (list): The course sizes, in items, spread over the item types
+            and the modules.
+        modules (int): The number of modules per course.
+        **options: Other command options.
+
+    Returns:
+        list: The result rows.
+    """
+    owner = make_users(1)[0]
+    rows = []
+    for size in sizes:
+        course = make_course(
+            owner, f"clone-{size}", modules=modules, items_per_module=0
+        )
+        per_type = size // len(ITEM_FIELDS)
+        module_list = list(course.modules.all())
+        for model in ITEM_FIELDS:
+            items = make_items(owner, model, per_type)
+            for index, module in enumerate(module_list):
+                attach_items(module, items[index::modules])
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            clone_course(course)
+            elapsed = time.perf_counter() - started
+        rows.append(
+            {
+                "items": per_type * len(ITEM_FIELDS),
+                "modules": modules,
+                "queries": len(queries),
+                "ms": round(elapsed * 1e3, 1),
+            }
+        )
+    return rows
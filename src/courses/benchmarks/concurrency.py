@@ -0,0 +1,137 @@
+"""Mixed read/write throughput against the configured database.
+
+Reader threads run the catalog query (courses annotated with their module
+count), writer threads enroll and unenroll students. Run it once with and once
+without ``KALAKAR_SQLITE_PRODUCTION=1`` to compare the two profiles.
+"""
+
+import random
+import threading
+import time
+
+from django.db import OperationalError, connections, transaction
+from django.db.models import Count
+
+from courses.benchmarks.data import make_course, make_users
+from courses.db import read_only_routing
+from courses.models import Course
+
+description = "Mixed read/write throughput (catalog reads vs. enrollments)."
+
+
+def add_arguments(parser):
+    """Register the benchmark options."""
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument(
+        "--write-ratio",
+        type=float,
+        default=0.2,
+        help="Fraction of operations that are writes.",
+    )
+    parser.add_argument("--courses", type=int, default=20)
+
+
+def _read():
+    with read_only_routing():
+        list(Course.objects.annotate(total_modules=Count("modules"))[:20])
+
+
+def _write(rng, course_ids, user_ids):
+    course = Course(id=rng.choice(course_ids))
+    user_id = rng.choice(user_ids)
+    with transaction.atomic():
+        if rng.random() < 0.5:
+            course.students.add(user_id)
+        else:
+            course.students.remove(user_id)
+
+
+def _journal_mode():
+    connection = connections["default"]
+    if connection.vendor != "sqlite":
+        return "-"
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode")
+        return cursor.fetchone()[0]
+
+
+def _worker(seed, deadline, write_ratio, course_ids, user_ids, counts, lock):
+    rng = random.Random(seed)
+    local = {"reads": 0, "writes": 0, "errors": 0}
+    try:
+        while time.perf_counter() < deadline:
+            try:
+                if rng.random() < write_ratio:
+                    _write(rng, course_ids, user_ids)
+                    local["writes"] += 1
+                else:
+                    _read()
+                    local["reads"] += 1
+            except OperationalError:  # "database is locked"
+                local["errors"] += 1
+    finally:
+        connections.close_all()
+    with lock:
+        for key, value in local.items():
+            counts[key] += value
+
+
+def run(threads, duration, write_ratio, courses, **options):  # pylint: disable=unused-argument
+    """Run the benchmark and return a single result row.
+
+    Args:
+        threads (int): The number of concurrent client threads.
+        duration (float): The run time in seconds.
+        write_ratio (float): The fraction of operations that are writes.
+        courses (int): The number of synthetic courses.
+        **options: Other command options.
+
+    Returns:
+        list: The result rows.
+    """
+    users = make_users(200)
+    course_ids = [
+        make_course(
+            users[0], f"bench-{index}", modules=5, items_per_module=2
+        ).id
+        for index in range(courses)
+    ]
+    user_ids = [user.id for user in users]
+    connections.close_all()
+
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    workers = [
+        threading.Thread(
+            target=_worker,
+            args=(
+                seed,
+                deadline,
+                write_ratio,
+                course_ids,
+                user_ids,
+                counts,
+                lock,
+            ),
+        )
+        for seed in range(threads)
+    ]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    return [
+        {
+            "journal_mode": _journal_mode(),
+            "threads": threads,
+            "reads/s": round(counts["reads"] / elapsed, 1),
+            "writes/s": round(counts["writes"] / elapsed, 1),
+            "ops/s": round((counts["reads"] + counts["writes"]) / elapsed, 1),
+            "errors": counts["errors"],
+        }
+    ]
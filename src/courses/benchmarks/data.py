@@ -0,0 +1,129 @@
+"""Synthetic data factories shared by the benchmarks."""
+
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+
+from courses.embeds import LocalResolver
+from courses.models import (
+    Content,
+    Course,
+    File,
+    Image,
+    Module,
+    Subject,
+    Text,
+    Video,
+)
+
+VIDEO_URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+ITEM_FIELDS = {
+    Text: {"content": "Lorem ipsum dolor sit amet.\n\n" * 10},
+    File: {"file": "files/lecture.pdf"},
+    Image: {"image": "images/diagram.png"},
+    # bulk_create skips Video.save(), the embed is resolved here
+    Video: {
+        "url": VIDEO_URL,
+        **LocalResolver().resolve(VIDEO_URL)._asdict(),
+    },
+}
+
+
+def make_users(count, prefix="bench"):
+    """Create ``count`` users in one query.
+
+    Args:
+        count (int): The number of users to create.
+        prefix (str): The username prefix.
+
+    Returns:
+        list: The created users.
+    """
+    return User.objects.bulk_create(
+        User(username=f"{prefix}-{index}") for index in range(count)
+    )
+
+
+def make_items(owner, model, count):
+    """Create ``count`` items of ``model`` in one query.
+
+    Args:
+        owner (User): The items' owner.
+        model (class): One of the ``ITEM_FIELDS`` item models.
+        count (int): The number of items.
+
+    Returns:
+        list: The created items.
+    """
+    return model.objects.bulk_create(
+        model(owner=owner, title=f"Item {index}", **ITEM_FIELDS[model])
+        for index in range(count)
+    )
+
+
+def attach_items(module, items):
+    """Append ``items`` to ``module`` as ordered contents in one query.
+
+    Args:
+        module (Module): The module receiving the items.
+        items (list): Items of a single model.
+
+    Returns:
+        list: The created contents.
+    """
+    if not items:
+        return []
+    content_type = ContentType.objects.get_for_model(items[0])
+    return Content.objects.bulk_create(
+        Content(
+            module=module,
+            content_type=content_type,
+            object_id=item.id,
+            order=order,
+        )
+        for order, item in enumerate(items)
+    )
+
+
+def make_subject(slug="bench"):
+    """Return the benchmark subject, creating it if needed.
+
+    Args:
+        slug (str): The subject slug.
+
+    Returns:
+        Subject: The subject.
+    """
+    subject, _ = Subject.objects.get_or_create(
+        slug=slug, defaults={"title": slug.title()}
+    )
+    return subject
+
+
+def make_course(owner, slug, modules=5, items_per_module=10, subject=None):
+    """Create a course with text items using bulk inserts.
+
+    Args:
+        owner (User): The course owner.
+        slug (str): The course slug.
+        modules (int): The number of modules.
+        items_per_module (int): The number of text items per module.
+        subject (Subject, optional): The subject, the benchmark one by default.
+
+    Returns:
+        Course: The created course.
+    """
+    course = Course.objects.create(
+        owner=owner,
+        subject=subject or make_subject(),
+        title=slug.replace("-", " ").title(),
+        slug=slug,
+        overview="Synthetic benchmark course.",
+    )
+    module_objs = Module.objects.bulk_create(
+        Module(course=course, title=f"Module {index}", order=index)
+        for index in range(modules)
+    )
+    for module in module_objs:
+        attach_items(module, make_items(owner, Text, items_per_module))
+    return course
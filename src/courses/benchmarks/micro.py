@@ -0,0 +1,349 @@
+"""Microbenchmarks of the primitives the pages and endpoints are built from.
+
+Each case times one primitive in isolation (its data is created and fetched
+beforehand) at several data sizes, so a regression shows up in the primitive
+that caused it and the rows of a case show how it scales:
+
+* ``order_field.pre_save``: ``OrderField`` numbering a new content of a
+  module holding ``size`` contents.
+* ``render.<type>``: ``ItemBase.render()`` of ``size`` items of each type.
+* ``serializer.content``: ``ContentSerializer`` over ``size`` contents.
+* ``serializer.course_with_content``: ``CourseWithContentSerializer`` over a
+  course of ``size`` items, ten per module.
+* ``filter.model_name``: the ``model_name`` template filter on ``size``
+  items.
+* ``permission.is_enrolled``: ``IsEnrolled`` on a course with ``size``
+  students.
+* ``catalog.subjects`` and ``catalog.courses``: the annotated querysets of
+  the course list, over ``size`` courses.
+
+``--save`` writes the results to a JSON baseline, ``--compare`` reads one
+back and fails the run when a case got slower than ``--threshold``.
+"""
+
+import fnmatch
+import json
+import platform
+import statistics
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import django
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from courses.api.pemissions import IsEnrolled
+from courses.api.serializers import (
+    ContentSerializer,
+    CourseWithContentSerializer,
+)
+from courses.benchmarks.data import (
+    ITEM_FIELDS,
+    attach_items,
+    make_course,
+    make_items,
+    make_subject,
+    make_users,
+)
+from courses.models import Content, Course, Subject, Text
+from courses.templatetags.course import model_name
+
+description = "Time Kalakar's primitives in isolation, across data sizes."
+
+CASES = {}
+
+
+def case(name):
+    """Register a case.
+
+    A case is called with a fresh owner and a size, creates its data and
+    returns ``(call, units)``: the timed callable and the number of objects
+    it handles, by which its time is divided.
+    """
+
+    def register(func):
+        CASES[name] = func
+        return func
+
+    return register
+
+
+@case("order_field.pre_save")
+def _order_field(owner, size):
+    course = make_course(owner, f"order-{size}", modules=1, items_per_module=0)
+    module = course.modules.get()
+    attach_items(module, make_items(owner, Text, size))
+    field = Content._meta.get_field("order")  # pylint: disable=protected-access
+    content = Content(module=module)
+
+    def call():
+        content.order = None
+        field.pre_save(content, add=True)
+
+    return call, 1
+
+
+def _render_case(model):
+    def setup(owner, size):
+        items = make_items(owner, model, size)
+
+        def call():
+            for item in items:
+                item.render()
+
+        return call, size
+
+    return setup
+
+
+for _model in ITEM_FIELDS:
+    case(f"render.{_model._meta.model_name}")(_render_case(_model))  # pylint: disable=protected-access
+
+
+@case("serializer.content")
+def _content_serializer(owner, size):
+    course = make_course(
+        owner, f"contents-{size}", modules=1, items_per_module=size
+    )
+    contents = list(
+        Content.objects.filter(module__course=course).prefetch_related("item")
+    )
+    return lambda: ContentSerializer(contents, many=True).data, size
+
+
+@case("serializer.course_with_content")
+def _course_serializer(owner, size):
+    modules = max(1, size // 10)
+    make_course(
+        owner,
+        f"course-{size}",
+        modules=modules,
+        items_per_module=size // modules,
+    )
+    course = Course.objects.prefetch_related("modules__contents__item").get(
+        slug=f"course-{size}"
+    )
+    return lambda: CourseWithContentSerializer(course).data, size
+
+
+@case("filter.model_name")
+def _model_name(owner, size):
+    items = make_items(owner, Text, size)
+
+    def call():
+        for item in items:
+            model_name(item)
+
+    return call, size
+
+
+@case("permission.is_enrolled")
+def _is_enrolled(owner, size):
+    course = make_course(owner, f"enrolled-{size}", modules=0)
+    students = make_users(size, prefix=f"student-{size}")
+    course.students.add(*students)
+    request = SimpleNamespace(user=students[-1])
+    permission = IsEnrolled()
+    return lambda: permission.has_object_permission(request, None, course), 1
+
+
+def _catalog(owner, size):
+    prefix = f"catalog-{owner.username}-"
+    for index in range(size):
+        make_course(
+            owner,
+            f"{prefix}{index}",
+            modules=3,
+            items_per_module=0,
+            subject=make_subject(f"{prefix}{index % 10}"),
+        )
+    return prefix
+
+
+@case("catalog.subjects")
+def _catalog_subjects(owner, size):
+    prefix = _catalog(owner, size)
+    subjects = Subject.objects.filter(slug__startswith=prefix)
+    return lambda: list(subjects.order_by("path")), 1
+
+
+@case("catalog.courses")
+def _catalog_courses(owner, size):
+    prefix = _catalog(owner, size)
+    courses = (
+        Course.objects.filter(slug__startswith=prefix)
+        .with_module_count()
+        .select_related("owner", "subject")
+    )
+    return lambda: list(courses.all()), size
+
+
+def add_arguments(parser):
+    """Register the benchmark options."""
+    parser.add_argument(
+        "--sizes",
+        default="10,100,1000",
+        help="Comma-separated data sizes each case runs at.",
+    )
+    parser.add_argument(
+        "--only",
+        action="append",
+        help="Run the cases matching this pattern (e.g. 'render.*').",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.05,
+        help="Seconds each of the --repeat samples runs for, at least.",
+    )
+    parser.add_argument("--save", help="Write the results to this JSON file.")
+    parser.add_argument(
+        "--compare", help="Compare the results to this JSON baseline."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Slowdown past which a case fails, 0.25 for 25%%.",
+    )
+
+
+def measure(call, repeat, min_time):
+    """Time ``call``.
+
+    The number of calls per sample is doubled until a sample lasts
+    ``min_time``, then ``repeat`` samples are taken.
+
+    Returns:
+        float: The median duration of one call, in seconds.
+    """
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            call()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        number *= 2
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            call()
+        samples.append((time.perf_counter() - started) / number)
+    return statistics.median(samples)
+
+
+def selected(patterns):
+    """Return the names of the cases matching any of ``patterns``."""
+    if not patterns:
+        return list(CASES)
+    names = [
+        name
+        for name in CASES
+        if any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+    ]
+    if not names:
+        raise CommandError(f"No case matches {', '.join(patterns)}.")
+    return names
+
+
+def compare_rows(rows, baseline, threshold):
+    """Add the baseline and the change of every row.
+
+    Args:
+        rows (list): The result rows.
+        baseline (dict): A file written by ``--save``.
+        threshold (float): The slowdown past which a row regressed.
+
+    Returns:
+        list: The rows that regressed.
+    """
+    previous = baseline["results"]
+    regressions = []
+    for row in rows:
+        before = previous.get(f"{row['case']}@{row['size']}")
+        if before is None:
+            row.update({"baseline us": "-", "change": "new", "status": ""})
+            continue
+        change = row["us/call"] / before - 1
+        regressed = change > threshold
+        row.update(
+            {
+                "baseline us": before,
+                "change": f"{change:+.0%}",
+                "status": "REGRESSED" if regressed else "ok",
+            }
+        )
+        if regressed:
+            regressions.append(row)
+    return regressions
+
+
+def run(sizes, only, repeat, min_time, save, compare, threshold, **options):  # pylint: disable=unused-argument
+    """Run the cases and return one row per case and size.
+
+    Args:
+        sizes (str): Comma-separated data sizes.
+        only (list): Patterns selecting the cases, all of them if empty.
+        repeat (int): The number of samples, the median one is reported.
+        min_time (float): The minimum duration of a sample, in seconds.
+        save (str): A path to write the results to, if any.
+        compare (str): The path of a baseline to compare to, if any.
+        threshold (float): The slowdown past which a case regressed.
+        **options: Other command options.
+
+    Returns:
+        list: The result rows.
+    """
+    sizes = sorted({int(size) for size in sizes.split(",")})
+    rows = []
+    for name in selected(only):
+        for size in sizes:
+            owner = make_users(1, prefix=f"{name}-{size}")[0]
+            call, units = CASES[name](owner, size)
+            seconds = measure(call, repeat, min_time)
+            rows.append(
+                {
+                    "case": name,
+                    "size": size,
+                    "us/call": round(seconds * 1e6, 2),
+                    "us/object": round(seconds / units * 1e6, 3),
+                }
+            )
+    if save:
+        Path(save).write_text(
+            json.dumps(
+                {
+                    "created": timezone.now().isoformat(),
+                    "python": platform.python_version(),
+                    "django": django.get_version(),
+                    "results": {
+                        f"{row['case']}@{row['size']}": row["us/call"]
+                        for row in rows
+                    },
+                },
+                indent=2,
+            )
+        )
+    if compare:
+        baseline = json.loads(Path(compare).read_text())
+        compare_rows(rows, baseline, threshold)
+    return rows
+
+
+def check(rows, threshold, **options):  # pylint: disable=unused-argument
+    """Fail the command when a row regressed past ``threshold``.
+
+    Raises:
+        CommandError: Some cases got slower than the baseline allows.
+    """
+    regressed = [row for row in rows if row.get("status") == "REGRESSED"]
+    if regressed:
+        raise CommandError(
+            f"{len(regressed)} case(s) regressed past {threshold:.0%}: "
+            + ", ".join(f"{row['case']}@{row['size']}" for row in regressed)
+        )
@@ -0,0 +1,73 @@
+"""Latency of the public pages with a cold and a warm page cache.
+
+Requests go through the whole handler (middleware included) with the test
+client, as anonymous visitors without cookies.
+"""
+
+import time
+
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from courses import pagecache
+from courses.benchmarks.data import make_course, make_subject, make_users
+
+description = "Latency of the public pages with a cold and a warm page cache."
+
+
+def add_arguments(parser):
+    """Register the benchmark options."""
+    parser.add_argument("--courses", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200)
+
+
+def _mean_latency(client, url, count, before=None):
+    total = 0.0
+    for _ in range(count):
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        response = client.get(url)
+        total += time.perf_counter() - started
+        assert response.status_code == 200, url
+    return total / count
+
+
+def run(courses, requests, **options):  # pylint: disable=unused-argument
+    """Run the benchmark and return one row per page.
+
+    Args:
+        courses (int): The number of synthetic courses in the catalog.
+        requests (int): The number of requests per measurement.
+        **options: Other command options.
+
+    Returns:
+        list: The result rows.
+    """
+    owner = make_users(1)[0]
+    subject = make_subject()
+    for index in range(courses):
+        course = make_course(owner, f"course-{index}", subject=subject)
+    pages = {
+        "catalog": reverse("course_list"),
+        "subject": reverse("course_list_subject", args=[subject.slug]),
+        "course": reverse("course_detail", args=[course.slug]),
+    }
+    keys = [pagecache.catalog_key(), pagecache.course_key(course.pk)]
+    client = Client()
+    rows = []
+    for name, url in pages.items():
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            miss = _mean_latency(
+                client, url, requests, lambda: pagecache.purge(*keys)
+            )
+            hit = _mean_latency(client, url, requests)
+        rows.append(
+            {
+                "page": name,
+                "miss ms": round(miss * 1e3, 3),
+                "hit ms": round(hit * 1e3, 3),
+                "speedup": f"{miss / hit:.1f}x",
+            }
+        )
+    return rows
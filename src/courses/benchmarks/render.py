@@ -0,0 +1,80 @@
+"""Per-item render cost: ``render_to_string`` per item vs. ``ModuleRenderer``.
+
+Both paths render the same prefetched module, so the difference is the
+template lookup and context construction that the renderer pays only once.
+"""
+
+import time
+
+from django.template.loader import render_to_string
+
+from courses.benchmarks.data import (
+    ITEM_FIELDS,
+    attach_items,
+    make_course,
+    make_items,
+    make_users,
+)
+from courses.models import Module
+from courses.rendering import ModuleRenderer
+
+description = "Per-item render cost of render_to_string vs. ModuleRenderer."
+
+
+def add_arguments(parser):
+    """Register the benchmark options."""
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+
+
+def _best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _render_one_by_one(contents):
+    for content in contents:
+        render_to_string(
+            f"courses/content/{content.item._meta.model_name}.html",  # pylint: disable=protected-access
+            {"item": content.item},
+        )
+
+
+def run(items, repeat, **options):  # pylint: disable=unused-argument
+    """Run the benchmark and return one row per item type.
+
+    Args:
+        items (int): The number of items in the rendered module.
+        repeat (int): The number of runs, the best one is reported.
+        **options: Other command options.
+
+    Returns:
+        list: The result rows.
+    """
+    owner = make_users(1)[0]
+    course = make_course(owner, "render", modules=0)
+    rows = []
+    for model in ITEM_FIELDS:
+        module = Module.objects.create(course=course, title=model.__name__)
+        attach_items(module, make_items(owner, model, items))
+        contents = list(module.contents.prefetch_related("item"))
+
+        legacy = _best_of(repeat, lambda: _render_one_by_one(contents))  # pylint: disable=cell-var-from-loop
+        single = _best_of(
+            repeat,
+            lambda: ModuleRenderer().render_contents(contents),  # pylint: disable=cell-var-from-loop
+        )
+        rows.append(
+            {
+                "type": model._meta.model_name,  # pylint: disable=protected-access
+                "items": items,
+                "render_to_string us/item": round(legacy / items * 1e6, 1),
+                "ModuleRenderer us/item": round(single / items * 1e6, 1),
+                "speedup": f"{legacy / single:.2f}x",
+            }
+        )
+    return rows
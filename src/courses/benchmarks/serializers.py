@@ -0,0 +1,100 @@
+"""Objects/sec of the DRF serializers vs. their fast-path counterparts.
+
+Both paths include the queries and the JSON rendering, as the list endpoints
+do.
+"""
+
+import time
+
+from rest_framework.renderers import JSONRenderer
+
+from courses.api.fast import (
+    FastCourseSerializer,
+    FastModuleSerializer,
+    FastSubjectSerializer,
+)
+from courses.api.serializers import (
+    CourseSerializer,
+    ModuleSerializer,
+    SubjectSerializer,
+)
+from courses.benchmarks.data import make_course, make_subject, make_users
+from courses.models import Course, Module, Subject
+
+description = "Objects/sec of DRF serializers vs. the fast-path serializers."
+
+PAIRS = [
+    ("subject", Subject, SubjectSerializer, FastSubjectSerializer, None),
+    ("module", Module, ModuleSerializer, FastModuleSerializer, None),
+    ("course", Course, CourseSerializer, FastCourseSerializer, "modules"),
+]
+
+
+def add_arguments(parser):
+    """Register the benchmark options."""
+    parser.add_argument(
+        "--courses",
+        type=int,
+        default=500,
+        help="Synthetic courses (5 modules each, one subject per course).",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+
+
+def _best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(courses, repeat, **options):  # pylint: disable=unused-argument
+    """Run the benchmark and return one row per serializer.
+
+    Args:
+        courses (int): The number of synthetic courses.
+        repeat (int): The number of runs, the best one is reported.
+        **options: Other command options.
+
+    Returns:
+        list: The result rows.
+    """
+    owner = make_users(1)[0]
+    for index in range(courses):
+        make_course(
+            owner,
+            f"course-{index}",
+            modules=5,
+            items_per_module=0,
+            subject=make_subject(f"subject-{index}"),
+        )
+    renderer = JSONRenderer()
+    rows = []
+    for name, model, serializer_class, fast_class, prefetch in PAIRS:
+        queryset = model.objects.all()
+        count = queryset.count()
+        drf_queryset = (
+            queryset.prefetch_related(prefetch) if prefetch else queryset
+        )
+        drf = _best_of(
+            repeat,
+            lambda: renderer.render(  # pylint: disable=cell-var-from-loop
+                serializer_class(drf_queryset.all(), many=True).data  # pylint: disable=cell-var-from-loop
+            ),
+        )
+        fast = _best_of(
+            repeat,
+            lambda: renderer.render(fast_class().serialize(queryset.all())),  # pylint: disable=cell-var-from-loop
+        )
+        rows.append(
+            {
+                "serializer": name,
+                "objects": count,
+                "drf objects/s": round(count / drf),
+                "fast objects/s": round(count / fast),
+                "speedup": f"{drf / fast:.2f}x",
+            }
+        )
+    return rows
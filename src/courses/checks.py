@@ -0,0 +1,44 @@
+"""System checks of the deployment settings.
+
+The object cache (``courses.objectcache``) and the page cache
+(``courses.pagecache``) invalidate entries in the default cache; with a
+cache local to each process, an invalidation made by one worker never
+reaches the others, which keep serving stale rows and pages until their
+timeout. ``manage.py check --deploy`` refuses such a cache.
+"""
+
+from django.conf import settings
+from django.core import checks
+
+# caches that each process keeps for itself
+LOCAL_CACHE_BACKENDS = ("django.core.cache.backends.locmem.LocMemCache",)
+
+
+def is_local_cache(alias="default"):
+    """Return whether the cache ``alias`` is private to each process.
+
+    Args:
+        alias (str): The cache alias in ``settings.CACHES``.
+
+    Returns:
+        bool: True for local-memory caches.
+    """
+    return settings.CACHES[alias]["BACKEND"] in LOCAL_CACHE_BACKENDS
+
+
+def shared_cache_check(app_configs, **kwargs):  # pylint: disable=unused-argument
+    """Refuse a per-process default cache in production.
+
+    Returns:
+        list: The ``courses.E001`` error, if any.
+    """
+    if not is_local_cache():
+        return []
+    return [
+        checks.Error(
+            "The default cache is local to each process: cached courses, "
+            "subjects, modules and pages go stale in the other workers.",
+            hint="Set KALAKAR_CACHE_URL to a Redis or memcached server.",
+            id="courses.E001",
+        )
+    ]
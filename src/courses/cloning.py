@@ -0,0 +1,168 @@
+"""Deep copies of courses for re-runs.
+
+``clone_course()`` copies a course, its modules, their contents and the
+content items with one ``bulk_create()`` per table, so the number of queries
+depends on the number of item types, not on the size of the course:
+
+1. the new course is saved;
+2. the modules are read and bulk-created with their ``order`` values;
+3. the contents are read, and the items of each content type are read and
+   bulk-created;
+4. the contents are bulk-created, pointing at the new modules and, through
+   the remapped generic ``object_id``, at the new items.
+
+Setting ``order`` explicitly keeps ``OrderField`` from looking up the last
+order of every inserted row. Files and images are not copied: the new items
+reference the same stored blobs.
+
+The remapping needs the primary keys of the inserted rows. Backends that
+return them from a bulk ``INSERT`` (SQLite, PostgreSQL, MariaDB) get one
+statement per table; elsewhere, MySQL among them, ``_create()`` inserts the
+rows one at a time, still without the signals and ``save()`` overrides
+``bulk_create()`` skips, and the copy costs a query per row.
+"""
+
+from django.db import connections, router, transaction
+
+from courses.models import Content, Course, Module
+
+
+def _copy(obj, **overrides):
+    """Return an unsaved copy of ``obj`` with ``overrides`` applied."""
+    opts = obj._meta  # pylint: disable=protected-access
+    values = {
+        field.attname: getattr(obj, field.attname)
+        for field in opts.concrete_fields
+        if not field.primary_key
+    }
+    values.update(overrides)
+    return opts.model(**values)
+
+
+def _create(model, objs):
+    """Insert ``objs``, setting their primary keys.
+
+    Args:
+        model (type): The model of the objects.
+        objs (Iterable[Model]): Unsaved objects.
+
+    Returns:
+        list: The saved objects, in order.
+    """
+    using = router.db_for_write(model)
+    if connections[using].features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objs)
+    opts = model._meta  # pylint: disable=protected-access
+    fields = [
+        field
+        for field in opts.concrete_fields
+        if not field.primary_key and not field.generated
+    ]
+    created = []
+    for obj in objs:
+        # the INSERT of Model.save(), without its signals
+        # pylint: disable-next=protected-access
+        (row,) = model._base_manager._insert(
+            [obj],
+            fields=fields,
+            returning_fields=opts.db_returning_fields,
+            using=using,
+        )
+        for field, value in zip(opts.db_returning_fields, row):
+            setattr(obj, field.attname, value)
+        obj._state.adding = False  # pylint: disable=protected-access
+        obj._state.db = using  # pylint: disable=protected-access
+        created.append(obj)
+    return created
+
+
+def free_slug(slug):
+    """Return ``slug`` suffixed with the first unused number.
+
+    Args:
+        slug (str): The slug of the course being copied.
+
+    Returns:
+        str: A slug no course uses, such as ``<slug>-2``.
+    """
+    taken = set(
+        Course.objects.filter(slug__startswith=f"{slug}-").values_list(
+            "slug", flat=True
+        )
+    )
+    number = 2
+    while f"{slug}-{number}" in taken:
+        number += 1
+    return f"{slug}-{number}"
+
+
+@transaction.atomic
+def clone_course(course, owner=None, title=None, slug=None):
+    """Copy ``course`` with all its modules, contents and items.
+
+    Students are not copied.
+
+    Args:
+        course (Course): The course to copy.
+        owner (User, optional): The owner of the copy and of its items,
+            defaults to the owner of ``course``.
+        title (str, optional): The title of the copy, defaults to the
+            original title.
+        slug (str, optional): The slug of the copy, defaults to
+            ``free_slug(course.slug)``.
+
+    Returns:
+        Course: The new course.
+    """
+    owner_id = owner.pk if owner is not None else course.owner_id
+    clone = _copy(
+        course,
+        owner_id=owner_id,
+        title=title or course.title,
+        slug=slug or free_slug(course.slug),
+    )
+    clone.save()
+
+    modules = list(course.modules.all())
+    new_modules = _create(
+        Module, (_copy(module, course_id=clone.pk) for module in modules)
+    )
+    module_ids = {
+        module.pk: new_module.pk
+        for module, new_module in zip(modules, new_modules)
+    }
+
+    contents = list(
+        Content.objects.filter(module__course=course).select_related(
+            "content_type"
+        )
+    )
+    item_ids = {}
+    by_type = {}
+    for content in contents:
+        by_type.setdefault(content.content_type, []).append(content.object_id)
+    for content_type, object_ids in by_type.items():
+        items = list(
+            content_type.model_class().objects.filter(pk__in=object_ids)
+        )
+        new_items = _create(
+            content_type.model_class(),
+            (_copy(item, owner_id=owner_id) for item in items),
+        )
+        for item, new_item in zip(items, new_items):
+            item_ids[content_type.pk, item.pk] = new_item.pk
+
+    _create(
+        Content,
+        (
+            _copy(
+                content,
+                module_id=module_ids[content.module_id],
+                object_id=item_ids[content.content_type_id, content.object_id],
+            )
+            for content in contents
+            # contents whose item was deleted are dropped
+            if (content.content_type_id, content.object_id) in item_ids
+        ),
+    )
+    return clone
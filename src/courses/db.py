@@ -0,0 +1,99 @@
+"""Database helpers for the SQLite production profile.
+
+The profile is switched on with ``KALAKAR_SQLITE_PRODUCTION=1`` (see
+``root/settings.py``). It combines three pieces that live here:
+
+* ``configure_sqlite_connection`` is a ``connection_created`` receiver that
+  applies ``settings.SQLITE_PRAGMAS`` to every new SQLite connection and marks
+  the aliases listed in ``settings.DATABASE_READ_ALIASES`` as ``query_only``.
+* ``read_only_routing`` flags the current context (thread or task) as
+  read-only, so reads can be served by the read-only alias.
+* ``ReadOnlyRouter`` sends reads issued inside a read-only context to the
+  read-only alias and every write to the default database.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_read_only = ContextVar("kalakar_read_only_routing", default=False)
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):  # pylint: disable=unused-argument
+    """Apply the configured pragmas to a freshly opened SQLite connection.
+
+    Args:
+        sender (class): The database wrapper class.
+        connection (BaseDatabaseWrapper): The connection that was created.
+        **kwargs: Extra signal arguments.
+    """
+    if connection.vendor != "sqlite":
+        return
+    pragmas = getattr(settings, "SQLITE_PRAGMAS", {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        if connection.alias in getattr(settings, "DATABASE_READ_ALIASES", []):
+            cursor.execute("PRAGMA query_only = ON")
+
+
+def read_only_alias():
+    """Return the alias that serves read-only traffic, if one is configured.
+
+    Returns:
+        str | None: The first configured read alias or None.
+    """
+    aliases = getattr(settings, "DATABASE_READ_ALIASES", [])
+    return aliases[0] if aliases else None
+
+
+def is_read_only_routing():
+    """Return whether the current context routes reads to the read alias.
+
+    Returns:
+        bool: True inside a ``read_only_routing`` block.
+    """
+    return _read_only.get()
+
+
+@contextmanager
+def read_only_routing():
+    """Route every read issued inside the block to the read-only alias."""
+    token = _read_only.set(True)
+    try:
+        yield
+    finally:
+        _read_only.reset(token)
+
+
+class ReadOnlyRouter:
+    """Send reads of read-only contexts to the read alias, writes to default.
+
+    Writes are pinned to the default alias explicitly, otherwise Django would
+    write instances back to the alias they were loaded from.
+    """
+
+    def db_for_read(self, model, **hints):  # pylint: disable=unused-argument
+        """Return the read alias inside a read-only context."""
+        if is_read_only_routing():
+            return read_only_alias()
+        return None
+
+    def db_for_write(self, model, **hints):  # pylint: disable=unused-argument
+        """Return the default alias for every write."""
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):  # pylint: disable=unused-argument
+        """Allow relations between objects of the default and read aliases."""
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_READ_ALIASES}
+        if obj1._state.db in aliases and obj2._state.db in aliases:  # pylint: disable=protected-access
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):  # pylint: disable=unused-argument
+        """Never migrate the read aliases, they share the default database."""
+        if db in settings.DATABASE_READ_ALIASES:
+            return False
+        return None
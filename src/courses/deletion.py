@@ -0,0 +1,176 @@
+"""Set-based deletion of courses, modules and contents with their items.
+
+Contents point at their items through a generic foreign key, and nothing
+cascades from a ``Content`` to its ``Text``/``File``/``Image``/``Video`` row,
+so deleting a course or a module through the ORM orphans every item and every
+uploaded file. The functions here read the ``(content type, object id)``
+pairs first, delete the containers, then delete the items with one
+``DELETE ... WHERE id IN (...)`` per item type and remove the files that no
+remaining item references (copies made by ``courses.cloning`` share them).
+
+Item deletion for more than ``settings.DELETION_BACKGROUND_THRESHOLD`` items
+is handed to ``courses.tasks``; whatever a lost task leaves behind is
+reclaimed by ``manage.py gc_content``.
+
+The courses concerned are touched once, in bulk; the per-row receivers of
+``courses.export`` skip the rows deleted here (``in_bulk_deletion()``), so
+the number of queries does not grow with the size of the course.
+"""
+
+import contextlib
+import contextvars
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import models, transaction
+
+from courses.models import Content, Course, Module
+from courses.tasks import enqueue
+
+CHUNK_SIZE = 500
+
+_deleting = contextvars.ContextVar("deleting", default=False)
+
+
+def in_bulk_deletion():
+    """Tell whether the functions below are deleting rows right now."""
+    return _deleting.get()
+
+
+@contextlib.contextmanager
+def _bulk_deletion():
+    token = _deleting.set(True)
+    try:
+        yield
+    finally:
+        _deleting.reset(token)
+
+
+def file_fields(model):
+    """Return the ``FileField``s (images included) of ``model``."""
+    return [
+        field
+        for field in model._meta.concrete_fields  # pylint: disable=protected-access
+        if isinstance(field, models.FileField)
+    ]
+
+
+def delete_files(model, names):
+    """Delete the files in ``names`` that no ``model`` row references.
+
+    Args:
+        model (class): The item model the files belonged to.
+        names (Iterable[str]): Stored file names.
+
+    Returns:
+        int: The number of deleted files.
+    """
+    names = set(filter(None, names))
+    deleted = 0
+    for field in file_fields(model):
+        referenced = set(
+            model.objects.filter(**{f"{field.name}__in": names}).values_list(
+                field.name, flat=True
+            )
+        )
+        for name in names - referenced:
+            if field.storage.exists(name):
+                field.storage.delete(name)
+                deleted += 1
+    return deleted
+
+
+def delete_items(refs):
+    """Delete items and their unreferenced files.
+
+    Args:
+        refs (Iterable[tuple]): ``(content type id, object id)`` pairs.
+
+    Returns:
+        int: The number of deleted items.
+    """
+    by_type = {}
+    for content_type_id, object_id in refs:
+        by_type.setdefault(content_type_id, []).append(object_id)
+    deleted = 0
+    for content_type_id, object_ids in by_type.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        fields = [field.name for field in file_fields(model)]
+        for start in range(0, len(object_ids), CHUNK_SIZE):
+            items = model.objects.filter(
+                pk__in=object_ids[start : start + CHUNK_SIZE]
+            )
+            names = [
+                name
+                for row in items.values_list(*fields)
+                for name in row
+                if name
+            ]
+            # no content points at them anymore, no course to touch
+            with transaction.atomic(), _bulk_deletion():
+                deleted += items.delete()[0]
+            delete_files(model, names)
+    return deleted
+
+
+def _delete_items_later(refs):
+    refs = list(refs)
+    if len(refs) > settings.DELETION_BACKGROUND_THRESHOLD:
+        enqueue(delete_items, refs)
+    else:
+        transaction.on_commit(lambda: delete_items(refs))
+    return len(refs)
+
+
+@transaction.atomic
+def delete_contents(contents):
+    """Delete contents and their items.
+
+    Args:
+        contents (QuerySet): The contents to delete.
+
+    Returns:
+        int: The number of items scheduled for deletion.
+    """
+    refs = list(contents.values_list("content_type_id", "object_id"))
+    Course.objects.filter(modules__contents__in=contents).touch()
+    with _bulk_deletion():
+        contents.delete()
+    return _delete_items_later(refs)
+
+
+@transaction.atomic
+def delete_modules(modules):
+    """Delete modules with their contents and items.
+
+    Args:
+        modules (Iterable[Module]): The modules to delete.
+
+    Returns:
+        int: The number of items scheduled for deletion.
+    """
+    module_ids = [module.pk for module in modules]
+    count = delete_contents(Content.objects.filter(module__in=module_ids))
+    Course.objects.filter(modules__in=module_ids).touch()
+    with _bulk_deletion():
+        Module.objects.filter(pk__in=module_ids).delete()
+    return count
+
+
+@transaction.atomic
+def delete_course(course):
+    """Delete a course with its modules, contents and items.
+
+    The course disappears at once; its items are deleted after the commit,
+    in the background for large courses.
+
+    Args:
+        course (Course): The course to delete.
+
+    Returns:
+        int: The number of items scheduled for deletion.
+    """
+    count = delete_contents(Content.objects.filter(module__course=course))
+    with _bulk_deletion():
+        Course.objects.filter(pk=course.pk).delete()
+    return count
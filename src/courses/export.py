@@ -0,0 +1,307 @@
+"""Offline packages of a course, streamed as ZIP archives.
+
+A package holds an ``index.html``, one standalone HTML page per module with
+the rendered items, the files and images of the ``File``/``Image`` items
+under their storage names, and a ``manifest.json`` describing it all.
+
+``iter_package()`` produces the archive as a sequence of chunks: the
+``ZipFile`` writes into a sink that is drained after every entry and every
+block of a media file, so memory use does not grow with the package size.
+``download_response()`` streams those chunks to the student and tees them
+into ``settings.EXPORT_CACHE_DIR``; once a package is complete, later
+downloads send the cached file.
+
+Packages are keyed on ``Course.updated``. Saving the course bumps it, and
+the signal receivers below bump it when a module, a content or an item of
+the course changes; bulk writes call ``CourseQuerySet.touch()`` themselves.
+"""
+
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.http import FileResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+
+from courses.deletion import file_fields, in_bulk_deletion
+from courses.models import Course
+from courses.rendering import ModuleRenderer
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 64 * 1024
+
+# already compressed, deflating them again only costs CPU
+STORED_EXTENSIONS = {
+    ".7z", ".avi", ".gif", ".gz", ".jpeg", ".jpg", ".mkv", ".mov", ".mp3",
+    ".mp4", ".ogg", ".png", ".webm", ".webp", ".zip",
+}  # fmt: skip
+
+
+class PackageRenderer(ModuleRenderer):
+    """Render items with links into the package instead of ``MEDIA_URL``.
+
+    ``courses/export/<model>.html`` templates take precedence over the
+    regular ones.
+    """
+
+    export_template_name = "courses/export/{model_name}.html"
+
+    def get_template(self, model_name):
+        """Return the export template of ``model_name``, or the regular one."""
+        template = self._templates.get(model_name)
+        if template is None:
+            template = self.engine.select_template(
+                [
+                    self.export_template_name.format(model_name=model_name),
+                    self.template_name.format(model_name=model_name),
+                ]
+            )
+            self._templates[model_name] = template
+        return template
+
+
+class _Sink:
+    """An unseekable file collecting what ``ZipFile`` writes."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stamp(course):
+    """Return the version of ``course``'s package, from ``Course.updated``."""
+    return course.updated.strftime("%Y%m%d%H%M%S%f")
+
+
+def package_path(course):
+    """Return the path of the cached package of ``course``."""
+    return (
+        Path(settings.EXPORT_CACHE_DIR)
+        / f"course-{course.pk}-{stamp(course)}.zip"
+    )
+
+
+def _entry(name, course, size=0):
+    import zipfile  # pylint: disable=import-outside-toplevel
+
+    info = zipfile.ZipInfo(name, date_time=course.updated.timetuple()[:6])
+    if os.path.splitext(name)[1].lower() in STORED_EXTENSIONS:
+        info.compress_type = zipfile.ZIP_STORED
+    else:
+        info.compress_type = zipfile.ZIP_DEFLATED
+    # lets ZipFile pick ZIP64 up front for files over 2 GB
+    info.file_size = size
+    return info
+
+
+def _media(item):
+    return [
+        fieldfile
+        for fieldfile in (
+            getattr(item, field.name) for field in file_fields(type(item))
+        )
+        if fieldfile
+    ]
+
+
+def iter_package(course):
+    """Produce the ZIP package of ``course`` chunk by chunk.
+
+    Args:
+        course (Course): The course to package.
+
+    Yields:
+        bytes: The next part of the archive.
+    """
+    # zipfile pulls in the compression modules; this module is imported at
+    # startup for its receivers, the archive code only runs on downloads
+    import zipfile  # pylint: disable=import-outside-toplevel
+
+    sink = _Sink()
+    renderer = PackageRenderer()
+    modules = list(course.modules.all())
+    pages = [
+        f"module-{number:02}.html" for number in range(1, len(modules) + 1)
+    ]
+    manifest = {
+        "course": {
+            "id": course.pk,
+            "title": course.title,
+            "slug": course.slug,
+            "overview": course.overview,
+            "updated": course.updated.isoformat(),
+        },
+        "modules": [],
+        "missing": [],
+    }
+    written = set()
+    with zipfile.ZipFile(sink, "w") as archive:
+        for number, (module, page) in enumerate(zip(modules, pages)):
+            contents = renderer.render_module(module)
+            html = render_to_string(
+                "courses/export/module.html",
+                {
+                    "course": course,
+                    "module": module,
+                    "contents": contents,
+                    "previous": pages[number - 1] if number else None,
+                    "next": pages[number + 1]
+                    if number + 1 < len(pages)
+                    else None,
+                },
+            )
+            archive.writestr(_entry(page, course), html)
+            yield sink.drain()
+            items = []
+            for rendered in contents:
+                files = []
+                for fieldfile in _media(rendered.item):
+                    files.append(fieldfile.name)
+                    if fieldfile.name in written:
+                        continue
+                    written.add(fieldfile.name)
+                    try:
+                        yield from _write_media(
+                            archive, sink, course, fieldfile
+                        )
+                    except FileNotFoundError:
+                        logger.warning(
+                            "Missing file %s of course %s",
+                            fieldfile.name,
+                            course.pk,
+                        )
+                        manifest["missing"].append(fieldfile.name)
+                items.append(
+                    {
+                        "type": rendered.item._meta.model_name,  # pylint: disable=protected-access
+                        "title": rendered.item.title,
+                        "files": files,
+                    }
+                )
+            manifest["modules"].append(
+                {"title": module.title, "page": page, "items": items}
+            )
+        index = render_to_string(
+            "courses/export/index.html",
+            {"course": course, "modules": zip(modules, pages)},
+        )
+        archive.writestr(_entry("index.html", course), index)
+        archive.writestr(
+            _entry("manifest.json", course), json.dumps(manifest, indent=2)
+        )
+    yield sink.drain()
+
+
+def _write_media(archive, sink, course, fieldfile):
+    storage = fieldfile.storage
+    # opened before the entry, so a missing file leaves no empty entry
+    with storage.open(fieldfile.name) as source:
+        info = _entry(fieldfile.name, course, storage.size(fieldfile.name))
+        with archive.open(info, "w") as target:
+            while block := source.read(BLOCK_SIZE):
+                target.write(block)
+                yield sink.drain()
+    yield sink.drain()
+
+
+def _remove_stale(course, keep):
+    for path in keep.parent.glob(f"course-{course.pk}-*.zip"):
+        if path != keep:
+            path.unlink(missing_ok=True)
+
+
+def iter_cached_package(course):
+    """Stream the package of ``course`` while caching it on disk.
+
+    The archive is written to a temporary file next to ``package_path()``
+    and renamed into place once complete; an interrupted download leaves
+    nothing behind.
+
+    Args:
+        course (Course): The course to package.
+
+    Yields:
+        bytes: The next part of the archive.
+    """
+    path = package_path(course)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=path.parent, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as cached:
+            for chunk in iter_package(course):
+                cached.write(chunk)
+                yield chunk
+        os.replace(temporary, path)
+    finally:
+        Path(temporary).unlink(missing_ok=True)
+    _remove_stale(course, path)
+
+
+def download_response(course):
+    """Answer a download of ``course``'s package.
+
+    Args:
+        course (Course): The course, with an up-to-date ``updated``.
+
+    Returns:
+        HttpResponse: The cached package, or the package being built.
+    """
+    filename = f"{course.slug}.zip"
+    path = package_path(course)
+    try:
+        # opened right away: a concurrent rebuild may remove the file
+        return FileResponse(
+            path.open("rb"), as_attachment=True, filename=filename
+        )
+    except FileNotFoundError:
+        pass
+    response = StreamingHttpResponse(
+        iter_cached_package(course), content_type="application/zip"
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def touch_module_course(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Bump the stamp of the course of a saved or deleted module."""
+    if in_bulk_deletion():
+        return
+    Course.objects.filter(pk=instance.course_id).touch()
+
+
+def touch_content_course(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Bump the stamp of the course of a saved or deleted content."""
+    if in_bulk_deletion():
+        return
+    Course.objects.filter(modules=instance.module_id).touch()
+
+
+def touch_item_courses(sender, instance, created=False, **kwargs):  # pylint: disable=unused-argument
+    """Bump the stamp of the courses showing a changed item."""
+    if in_bulk_deletion():
+        return
+    if created:
+        # no content points at a new item yet
+        return
+    Course.objects.filter(
+        modules__contents__content_type=ContentType.objects.get_for_model(
+            sender
+        ),
+        modules__contents__object_id=instance.pk,
+    ).touch()
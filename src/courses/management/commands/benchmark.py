@@ -0,0 +1,57 @@
+"""Run one of the benchmarks in ``courses.benchmarks``."""
+
+from importlib import import_module
+
+from django.core.management.base import BaseCommand
+
+from courses.benchmarks import BENCHMARKS, benchmark_database
+
+
+class Command(BaseCommand):
+    """Run a benchmark against a throwaway database and print its results."""
+
+    help = "Run a benchmark against a throwaway copy of the database."
+
+    def add_arguments(self, parser):
+        """Register one sub-command per benchmark."""
+        subparsers = parser.add_subparsers(dest="benchmark", required=True)
+        for name, module_path in BENCHMARKS.items():
+            module = import_module(module_path)
+            subparser = subparsers.add_parser(name, help=module.description)
+            module.add_arguments(subparser)
+
+    def handle(self, *args, **options):
+        """Run the selected benchmark, print and check its result rows."""
+        module = import_module(BENCHMARKS[options["benchmark"]])
+        with benchmark_database():
+            rows = module.run(**options)
+        self.print_table(rows)
+        check = getattr(module, "check", None)
+        if check is not None:
+            check(rows, **options)
+
+    def print_table(self, rows):
+        """Print result rows as an aligned table.
+
+        Args:
+            rows (list): The result rows, all with the same keys.
+        """
+        if not rows:
+            return
+        columns = list(rows[0])
+        widths = {
+            column: max(
+                len(str(row[column]))
+                for row in [*rows, dict(zip(columns, columns))]
+            )
+            for column in columns
+        }
+        self.stdout.write(
+            "  ".join(column.ljust(widths[column]) for column in columns)
+        )
+        for row in rows:
+            self.stdout.write(
+                "  ".join(
+                    str(row[column]).ljust(widths[column]) for column in columns
+                )
+            )
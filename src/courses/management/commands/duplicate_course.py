@@ -0,0 +1,52 @@
+"""Duplicate a course with all its modules and contents."""
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from courses.cloning import clone_course
+from courses.models import Course
+
+
+class Command(BaseCommand):
+    """Copy a course for a new run, see ``courses.cloning``."""
+
+    help = "Duplicate a course with all its modules, contents and items."
+
+    def add_arguments(self, parser):
+        """Register the command options."""
+        parser.add_argument("course", help="The id or slug of the course.")
+        parser.add_argument("--owner", help="The username of the copy's owner.")
+        parser.add_argument("--title", help="The title of the copy.")
+        parser.add_argument("--slug", help="The slug of the copy.")
+
+    def handle(self, *args, **options):
+        """Copy the course and report the copy."""
+        lookup = options["course"]
+        try:
+            if lookup.isdigit():
+                course = Course.objects.get(pk=lookup)
+            else:
+                course = Course.objects.get(slug=lookup)
+        except Course.DoesNotExist as error:
+            raise CommandError(f"No course {lookup!r}.") from error
+        owner = None
+        if options["owner"]:
+            try:
+                owner = User.objects.get(username=options["owner"])
+            except User.DoesNotExist as error:
+                raise CommandError(f"No user {options['owner']!r}.") from error
+        with CaptureQueriesContext(connection) as queries:
+            clone = clone_course(
+                course,
+                owner=owner,
+                title=options["title"],
+                slug=options["slug"],
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Duplicated {course.slug!r} as {clone.slug!r} (id {clone.pk})"
+                f" in {len(queries)} queries."
+            )
+        )
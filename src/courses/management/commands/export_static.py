@@ -0,0 +1,43 @@
+"""Export the public catalog and course pages as static files."""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from courses import staticsite
+
+
+class Command(BaseCommand):
+    """Render the pages that changed since the last export, and the sitemaps.
+
+    Run it after the content changes, and with ``--all`` after a deployment:
+    template changes are not detected.
+    """
+
+    help = "Export the public catalog and course pages as static files."
+
+    def add_arguments(self, parser):
+        """Register the command options."""
+        parser.add_argument("--output", default=str(settings.STATIC_EXPORT_DIR))
+        parser.add_argument(
+            "--base-url", default=settings.STATIC_EXPORT_BASE_URL
+        )
+        parser.add_argument(
+            "--workers", type=int, default=settings.STATIC_EXPORT_WORKERS
+        )
+        parser.add_argument(
+            "--all", action="store_true", help="Render every page."
+        )
+
+    def handle(self, *args, **options):
+        """Export and report what was done."""
+        counts = staticsite.export(
+            options["output"],
+            options["base_url"],
+            workers=options["workers"],
+            force=options["all"],
+        )
+        self.stdout.write(
+            "Rendered {rendered} of {pages} pages, {written} changed, "
+            "{removed} removed, {failed} failed; "
+            "wrote {sitemaps} sitemaps.".format(**counts)
+        )
@@ -0,0 +1,146 @@
+"""Reclaim orphaned content items and unreferenced media files."""
+
+import datetime
+import os
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from courses.deletion import delete_files, delete_items, file_fields
+from courses.models import Content, File, Image, Text, Video
+
+ITEM_MODELS = [Text, File, Image, Video]
+
+
+class Command(BaseCommand):
+    """Delete items no content points at, then files no item references.
+
+    Both passes work in chunks and skip what is younger than ``--min-age``,
+    which leaves alone the items being created right now (the item is saved
+    before the content pointing at it) and uploads not yet saved.
+    """
+
+    help = "Delete orphaned content items and unreferenced media files."
+
+    def add_arguments(self, parser):
+        """Register the command options."""
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=60,
+            help="Only reclaim what is older than this many minutes.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would be reclaimed without deleting it.",
+        )
+
+    def handle(self, *args, **options):
+        """Run both passes and report what they reclaimed."""
+        cutoff = timezone.now() - datetime.timedelta(minutes=options["min_age"])
+        chunk_size = options["chunk_size"]
+        dry_run = options["dry_run"]
+        verb = "Would delete" if dry_run else "Deleted"
+        for model in ITEM_MODELS:
+            count = self.collect_items(model, cutoff, chunk_size, dry_run)
+            self.stdout.write(
+                f"{verb} {count} orphaned {model._meta.verbose_name} items."  # pylint: disable=protected-access
+            )
+        for model in ITEM_MODELS:
+            for field in file_fields(model):
+                count, size = self.collect_files(
+                    model, field, cutoff, chunk_size, dry_run
+                )
+                self.stdout.write(
+                    f"{verb} {count} unreferenced files ({size} bytes)"
+                    f" under {field.storage.path(field.upload_to)}."
+                )
+
+    def collect_items(self, model, cutoff, chunk_size, dry_run):
+        """Delete the ``model`` items that no content points at.
+
+        Args:
+            model (class): The item model.
+            cutoff (datetime): Younger items are kept.
+            chunk_size (int): The number of items read per query.
+            dry_run (bool): Only count the orphans.
+
+        Returns:
+            int: The number of orphaned items.
+        """
+        content_type = ContentType.objects.get_for_model(model)
+        attached = Content.objects.filter(
+            content_type=content_type, object_id=OuterRef("pk")
+        )
+        orphans = (
+            model.objects.filter(created__lt=cutoff)
+            .filter(~Exists(attached))
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        count = 0
+        last = 0
+        while ids := list(orphans.filter(pk__gt=last)[:chunk_size]):
+            last = ids[-1]
+            count += len(ids)
+            if not dry_run:
+                delete_items((content_type.pk, pk) for pk in ids)
+        return count
+
+    def collect_files(self, model, field, cutoff, chunk_size, dry_run):
+        """Delete the files under ``field.upload_to`` no item references.
+
+        Args:
+            model (class): The item model.
+            field (FileField): The model's file field.
+            cutoff (datetime): Younger files are kept.
+            chunk_size (int): The number of files checked per query.
+            dry_run (bool): Only count the files.
+
+        Returns:
+            tuple: The number and total size of the unreferenced files.
+        """
+        storage = field.storage
+        if not storage.exists(field.upload_to):
+            return 0, 0
+        count = size = 0
+        for names in _chunks(_walk(storage, field.upload_to), chunk_size):
+            referenced = set(
+                model.objects.filter(
+                    **{f"{field.name}__in": names}
+                ).values_list(field.name, flat=True)
+            )
+            unreferenced = [
+                name
+                for name in names
+                if name not in referenced
+                and storage.get_modified_time(name) < cutoff
+            ]
+            count += len(unreferenced)
+            size += sum(storage.size(name) for name in unreferenced)
+            if not dry_run:
+                delete_files(model, unreferenced)
+        return count, size
+
+
+def _walk(storage, directory):
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield os.path.join(directory, name)
+    for name in directories:
+        yield from _walk(storage, os.path.join(directory, name))
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for value in iterable:
+        chunk.append(value)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,25 @@
+"""Print a token that enables the profiling of a request."""
+
+from django.core.management.base import BaseCommand
+
+from courses import profiling
+
+
+class Command(BaseCommand):
+    """Print a signed value for the ``X-Profile`` request header.
+
+    Anyone holding the token can profile requests until it expires, after
+    ``settings.PROFILING_TOKEN_MAX_AGE`` seconds.
+    """
+
+    help = "Print an X-Profile header value that profiles the request."
+
+    def add_arguments(self, parser):
+        """Register the command options."""
+        parser.add_argument(
+            "--mode", choices=profiling.MODES, default="sampling"
+        )
+
+    def handle(self, *args, **options):
+        """Print the token."""
+        self.stdout.write(profiling.make_token(options["mode"]))
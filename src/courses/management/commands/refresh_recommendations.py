@@ -0,0 +1,34 @@
+"""Refresh the "students also took" recommendations of the courses."""
+
+from django.core.management.base import BaseCommand
+
+from courses import recommendations
+
+
+class Command(BaseCommand):
+    """Refresh the stale recommendations now, or rebuild all of them.
+
+    Refreshes are also scheduled in-process after enrollments; run this
+    periodically so that the last changes of a quiet period are picked up,
+    and with ``--all`` now and then to refresh the courses that only share
+    students with the changed ones.
+    """
+
+    help = "Refresh the recommendations of the courses whose students changed."
+
+    def add_arguments(self, parser):
+        """Register the command options."""
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rebuild the recommendations of every course.",
+        )
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        """Refresh and report how many courses were."""
+        if options["all"]:
+            count = recommendations.rebuild(options["batch_size"])
+        else:
+            count = recommendations.refresh_stale(options["batch_size"])
+        self.stdout.write(f"Refreshed the recommendations of {count} courses.")
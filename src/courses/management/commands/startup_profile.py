@@ -0,0 +1,71 @@
+"""Report the start-up time of a worker, phase by phase and per import."""
+
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from courses import startup
+
+
+class Command(BaseCommand):
+    """Boot a fresh interpreter like a WSGI worker and time it.
+
+    Prints the time of each phase (importing Django, setting up the apps,
+    the optional warm-up), the import time of each top-level package, and
+    the slowest modules.
+    """
+
+    help = "Time the start-up of a worker and of each imported module."
+
+    def add_arguments(self, parser):
+        """Register the command options."""
+        parser.add_argument(
+            "--warm-up",
+            action="store_true",
+            help="Also run courses.startup.warm_up().",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=25,
+            help="The number of modules and packages listed.",
+        )
+        parser.add_argument(
+            "--sort",
+            choices=("self", "cumulative"),
+            default="self",
+            help="Rank modules by their own time or with their imports.",
+        )
+
+    def handle(self, *args, **options):
+        """Print the report."""
+        report = startup.profile_startup(warm=options["warm_up"])
+        limit = options["limit"]
+
+        self.stdout.write("Phases:")
+        for phase, seconds in report["phases"].items():
+            self.stdout.write(f"  {phase:<10} {seconds * 1000:8.1f} ms")
+
+        if report["loaded"]:
+            self.stdout.write(
+                self.style.WARNING(
+                    "Imported at start-up although deferred: "
+                    + ", ".join(report["loaded"])
+                )
+            )
+
+        packages = defaultdict(int)
+        for module, own, _, _ in report["imports"]:
+            packages[module.partition(".")[0]] += own
+        self.stdout.write("\nPackages (self time):")
+        for package, micros in sorted(
+            packages.items(), key=lambda item: item[1], reverse=True
+        )[:limit]:
+            self.stdout.write(f"  {micros / 1000:8.1f} ms  {package}")
+
+        column = 1 if options["sort"] == "self" else 2
+        self.stdout.write(f"\nModules ({options['sort']} time):")
+        for row in sorted(
+            report["imports"], key=lambda row: row[column], reverse=True
+        )[:limit]:
+            self.stdout.write(f"  {row[column] / 1000:8.1f} ms  {row[0]}")
@@ -0,0 +1,19 @@
+"""Remove abandoned resumable uploads."""
+
+from django.core.management.base import BaseCommand
+
+from courses.uploads import sweep
+
+
+class Command(BaseCommand):
+    """Remove the uploads idle for ``RESUMABLE_UPLOAD_EXPIRY`` seconds.
+
+    Run it periodically, e.g. hourly from cron.
+    """
+
+    help = "Remove abandoned resumable uploads and their partial files."
+
+    def handle(self, *args, **options):
+        """Sweep and report the number of removed uploads."""
+        removed = sweep()
+        self.stdout.write(f"Removed {removed} abandoned uploads.")
@@ -0,0 +1,77 @@
+"""Middleware module."""
+
+import random
+import time
+
+from django.conf import settings
+
+from courses import profiling
+from courses.db import read_only_alias, read_only_routing
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class ReadOnlyRoutingMiddleware:
+    """Serve the reads of safe requests from the read-only database alias.
+
+    Read-only views and API GETs only issue reads, so routing them away from
+    the default connection keeps them out of the way of concurrent writers
+    (enrollments, reorders). Writes still go to the default database through
+    ``courses.db.ReadOnlyRouter``.
+    """
+
+    def __init__(self, get_response):
+        """Store the next handler in the chain."""
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Route the request's reads according to its method."""
+        if request.method not in SAFE_METHODS or read_only_alias() is None:
+            return self.get_response(request)
+        with read_only_routing():
+            return self.get_response(request)
+
+
+class ProfilingMiddleware:
+    """Profile the requests that ask for it, see ``courses.profiling``.
+
+    Must come after ``AuthenticationMiddleware``: the staff flag is only
+    honoured for staff users.
+    """
+
+    def __init__(self, get_response):
+        """Store the next handler in the chain and the sampling rate."""
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+
+    def get_mode(self, request):
+        """Return the profiler ``request`` asks for, ``None`` for none.
+
+        Args:
+            request (HttpRequest): The request.
+
+        Returns:
+            str | None: ``sampling``, ``cprofile`` or ``None``.
+        """
+        token = request.META.get(profiling.HEADER)
+        if token is not None:
+            return profiling.read_token(token)
+        if profiling.FLAG in request.META.get("QUERY_STRING", ""):
+            mode = request.GET.get(profiling.FLAG)
+            if request.user.is_staff and mode:
+                return (
+                    mode if mode in profiling.MODES else settings.PROFILING_MODE
+                )
+        if self.sample_rate and random.random() < self.sample_rate:  # noqa: S311
+            return settings.PROFILING_MODE
+        return None
+
+    def __call__(self, request):
+        """Run the request, under a profiler when asked."""
+        mode = self.get_mode(request)
+        if mode is None:
+            return self.get_response(request)
+        start = time.perf_counter()
+        response, write = profiling.profile(mode, self.get_response, request)
+        profiling.save(request, mode, write, time.perf_counter() - start)
+        return response
@@ -0,0 +1,97 @@
+# Generated by Django 5.1.4 on 2026-10-19 16:01
+
+import re
+from urllib.parse import parse_qs, urlparse
+
+from django.db import migrations, models
+
+# a frozen copy of courses.embeds.LocalResolver as of this migration, so
+# later changes to the resolver do not change what the migration does
+YOUTUBE_HOSTS = {'youtube.com', 'www.youtube.com', 'm.youtube.com'}
+YOUTUBE_PATH = re.compile(r'^/(?:embed|shorts|v)/(?P<id>[\w-]{11})')
+VIMEO_PATH = re.compile(r'^/(?:video/)?(?P<id>\d+)')
+VIDEO_ID = re.compile(r'[\w-]{11}')
+
+
+def parse(url):
+    parts = urlparse(url)
+    host = parts.netloc.lower()
+    if host in YOUTUBE_HOSTS:
+        if parts.path == '/watch':
+            video_id = parse_qs(parts.query).get('v', [''])[0]
+            if VIDEO_ID.fullmatch(video_id):
+                return 'youtube', video_id
+        elif match := YOUTUBE_PATH.match(parts.path):
+            return 'youtube', match['id']
+    elif host == 'youtu.be':
+        video_id = parts.path.strip('/')
+        if VIDEO_ID.fullmatch(video_id):
+            return 'youtube', video_id
+    elif host in ('vimeo.com', 'www.vimeo.com', 'player.vimeo.com'):
+        if match := VIMEO_PATH.match(parts.path):
+            return 'vimeo', match['id']
+    return '', ''
+
+
+def resolve(url):
+    # provider, embed_url, thumbnail_url, width, height
+    provider, video_id = parse(url)
+    if provider == 'youtube':
+        return (
+            provider,
+            f'https://www.youtube.com/embed/{video_id}',
+            f'https://i.ytimg.com/vi/{video_id}/hqdefault.jpg',
+            480,
+            360,
+        )
+    if provider == 'vimeo':
+        return provider, f'https://player.vimeo.com/video/{video_id}', '', 480, 360
+    return '', '', '', None, None
+
+
+def resolve_embeds(apps, schema_editor):
+    # offline resolution, videos saved later go through the configured resolver
+    Video = apps.get_model('courses', 'Video')
+    fields = ['provider', 'embed_url', 'thumbnail_url', 'width', 'height']
+    videos = []
+    for video in Video.objects.only('url').iterator(chunk_size=500):
+        for field, value in zip(fields, resolve(video.url)):
+            setattr(video, field, value)
+        videos.append(video)
+    Video.objects.bulk_update(videos, fields, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='embed_url',
+            field=models.URLField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='height',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='provider',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='thumbnail_url',
+            field=models.URLField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='width',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(resolve_embeds, migrations.RunPython.noop),
+    ]
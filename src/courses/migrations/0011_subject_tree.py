@@ -0,0 +1,49 @@
+# Generated by Django 5.1.4 on 2026-10-19 16:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_paths(apps, schema_editor):
+    # every existing subject is a root
+    Subject = apps.get_model('courses', 'Subject')
+    Course = apps.get_model('courses', 'Course')
+    totals = dict(
+        Course.objects.values('subject').annotate(count=models.Count('pk')).values_list('subject', 'count')
+    )
+    subjects = list(Subject.objects.only('pk'))
+    for subject in subjects:
+        # courses.models.path_step() as of this migration
+        subject.path = f'{subject.pk:08d}/'
+        subject.course_total = totals.get(subject.pk, 0)
+    Subject.objects.bulk_update(subjects, ['path', 'course_total'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_recommendations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subject',
+            name='course_total',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='subject',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='courses.subject'),
+        ),
+        migrations.AddField(
+            model_name='subject',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['path'], name='subject_path_idx'),
+        ),
+        migrations.RunPython(build_paths, migrations.RunPython.noop),
+    ]
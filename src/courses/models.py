@@ -1,9 +1,16 @@
-from django.db import models
+import uuid
+
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, Concat, Left, Length, Substr
+from django.utils import timezone
+from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
+from .embeds import resolve_embed
 from .fields import OrderField
-from django.template.loader import render_to_string
+from .objectcache import CachedManager
+from .rendering import ModuleRenderer
 """
 we have a Subject the contain courses and every course contain modules
     - subject has:
@@ -42,16 +49,207 @@ the ItemBase model is an abstract model that is inherited in the content types (
 """
 
 
+# Subject.path lists the zero-padded pk of every ancestor and of the subject,
+# each followed by PATH_SEPARATOR: '00000001/00000007/'. PATH_END sorts right
+# after PATH_SEPARATOR, so a subtree is the range [path, path[:-1] + PATH_END)
+PATH_STEP = 8
+PATH_SEPARATOR = '/'
+PATH_END = '0'
+
+
+def path_step(pk):
+    return f'{pk:0{PATH_STEP}d}{PATH_SEPARATOR}'
+
+
+def path_ancestor_ids(path):
+    """The pks of the ancestors in ``path``, root first, read without a query."""
+    return [int(step) for step in path.split(PATH_SEPARATOR)[:-2]]
+
+
+class SubjectQuerySet(models.QuerySet):
+    def with_course_count(self):
+        """Annotate ``total_courses`` with a correlated count.
+
+        A subquery instead of a JOIN + GROUP BY keeps the outer query free to
+        walk the ordering index.
+        """
+        return self.annotate(total_courses=_count_of(Course, 'subject'))
+
+    def subtree(self, subject):
+        """``subject`` and its descendants, one range of the path index."""
+        return self.filter(path__gte=subject.path, path__lt=subject.path_end)
+
+    def ancestors(self, subject):
+        """The ancestors of ``subject``, root first."""
+        return self.filter(pk__in=subject.ancestor_ids).order_by('path')
+
+    def refresh_totals(self):
+        """Store in ``course_total`` the courses of each subject's subtree.
+
+        One UPDATE with a range count per subject; called for the ancestors of
+        what changed only, see ``courses.subjects``.
+        """
+        path = models.OuterRef('path')
+        end = Concat(Left(path, Length(path) - 1), models.Value(PATH_END))
+        courses = Course.objects.filter(subject__path__gte=path, subject__path__lt=end).order_by()
+        count = courses.annotate(
+            count=models.Func('pk', function='COUNT', output_field=models.IntegerField())
+        ).values('count')
+        pks = list(self.values_list('pk', flat=True))
+        updated = Subject.objects.filter(pk__in=pks).update(course_total=models.Subquery(count))
+        Subject.cached.invalidate(pks)
+        return updated
+
+
+class CourseQuerySet(models.QuerySet):
+    def with_module_count(self):
+        """Annotate ``total_modules`` with a correlated count.
+
+        A JOIN + GROUP BY drops ``Meta.ordering`` and sorting it again needs a
+        temp B-tree, the subquery keeps the ``-created`` indexes usable.
+        """
+        return self.annotate(total_modules=_count_of(Module, 'course'))
+
+    def touch(self):
+        """Mark the courses as changed, see ``Course.updated``.
+
+        Also drops them from ``Course.cached``, a bulk UPDATE sends no signal.
+        """
+        pks = list(self.values_list('pk', flat=True).distinct())
+        updated = Course.objects.filter(pk__in=pks).update(updated=timezone.now())
+        Course.cached.invalidate(pks)
+        return updated
+
+    def in_subject(self, subject):
+        """The courses of ``subject`` and of its descendants.
+
+        One range of the subject path index joined to the courses, however
+        deep the subtree.
+        """
+        return self.filter(subject__path__gte=subject.path, subject__path__lt=subject.path_end)
+
+    def prerequisites_of(self, course):
+        """The direct prerequisites of ``course``."""
+        return self.filter(dependent_edges__course=course)
+
+    def missing_prerequisites(self, course, user):
+        """The prerequisites of ``course``, direct or not, ``user`` has not completed.
+
+        One set difference on the closure index: the closure rows of
+        ``course`` minus the courses in ``user``'s completions.
+        """
+        completed = CourseCompletion.objects.filter(user=user).values('course')
+        required = PrerequisiteClosure.objects.filter(course=course).exclude(required__in=completed)
+        return self.filter(pk__in=required.values('required'))
+
+    def unlocked_for(self, user):
+        """The courses whose prerequisites ``user`` has all completed.
+
+        A course is locked when one of its closure rows requires a course
+        outside ``user``'s completions.
+        """
+        completed = CourseCompletion.objects.filter(user=user).values('course')
+        locked = PrerequisiteClosure.objects.exclude(required__in=completed)
+        return self.exclude(pk__in=locked.values('course'))
+
+    def recommended_for(self, course):
+        """The courses the students of ``course`` also took, best first.
+
+        One lookup of the ``CourseRecommendation`` index, see
+        ``courses.recommendations``.
+        """
+        return self.filter(recommended_by__course=course).order_by('recommended_by__rank')
+
+
+def _count_of(model, field):
+    rows = model.objects.filter(**{field: models.OuterRef('pk')}).order_by()
+    count = rows.values(field).annotate(count=models.Count('pk')).values('count')
+    return Coalesce(models.Subquery(count, output_field=models.IntegerField()), 0)
+
+
 class Subject(models.Model):
+    parent = models.ForeignKey('self', related_name='children', null=True, blank=True, on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=200, unique=True)
+    # materialized path, see path_step(); maintained by save()
+    path = models.CharField(max_length=255, editable=False, default='')
+    # courses of the subject and of its descendants, see refresh_totals()
+    course_total = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = SubjectQuerySet.as_manager()
+    cached = CachedManager(slug_field='slug')
 
     class Meta:
         ordering = ['title']
+        indexes = [
+            models.Index(fields=['title'], name='subject_title_idx'),
+            models.Index(fields=['path'], name='subject_path_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @property
+    def path_end(self):
+        return self.path[:-1] + PATH_END
+
+    @property
+    def depth(self):
+        return self.path.count(PATH_SEPARATOR) - 1
+
+    @property
+    def ancestor_ids(self):
+        return path_ancestor_ids(self.path)
+
+    def clean(self):
+        if self.parent_id is not None and self.path and self.parent.path.startswith(self.path):
+            raise ValidationError({'parent': 'A subject cannot be moved under itself.'})
+
+    def save(self, *args, **kwargs):
+        parent_path = ''
+        if self.parent_id is not None:
+            parent_path = Subject.objects.values_list('path', flat=True).get(pk=self.parent_id)
+        with transaction.atomic():
+            if self._state.adding:
+                # the path ends with the pk, known after the INSERT
+                super().save(*args, **kwargs)
+                self.path = parent_path + path_step(self.pk)
+                Subject.objects.filter(pk=self.pk).update(path=self.path)
+                Subject.cached.invalidate([self.pk])
+                return
+            # path and course_total are written by queries only, a loaded
+            # copy may be stale
+            if kwargs.get('update_fields') is None:
+                kwargs['update_fields'] = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name not in ('path', 'course_total')
+                ]
+            old_path = Subject.objects.values_list('path', flat=True).get(pk=self.pk)
+            new_path = parent_path + path_step(self.pk)
+            if new_path != old_path:
+                self._move_subtree(old_path, new_path)
+            super().save(*args, **kwargs)
+
+    def _move_subtree(self, old_path, new_path):
+        if new_path.startswith(old_path):
+            raise ValueError('A subject cannot be moved under itself.')
+        subtree = Subject.objects.filter(path__gte=old_path, path__lt=old_path[:-1] + PATH_END)
+        pks = list(subtree.values_list('pk', flat=True))
+        # one UPDATE rewrites the prefix of the whole subtree
+        subtree.update(path=Concat(models.Value(new_path), Substr('path', len(old_path) + 1)))
+        Subject.cached.invalidate(pks)
+        self.path = new_path
+        moved = path_ancestor_ids(old_path) + path_ancestor_ids(new_path)
+        Subject.objects.filter(pk__in=moved).refresh_totals()
+
+    def move_to(self, parent):
+        """Reparent the subject with its subtree, ``parent`` None for a root.
+
+        Loaded instances of the descendants keep their old path, refresh them.
+        """
+        self.parent = parent
+        self.save()
+
 
 class Course(models.Model):
     owner = models.ForeignKey(User, related_name="courses_created", on_delete=models.CASCADE)
@@ -60,14 +258,31 @@ class Course(models.Model):
     overview = models.TextField()
     slug = models.CharField(max_length=200, unique=True)
     created = models.DateTimeField(auto_now_add=True)
+    # last change of the course or of anything in it, see courses.export
+    updated = models.DateTimeField(auto_now=True)
     students = models.ManyToManyField(User, related_name="courses_joined", blank=True)
 
+    objects = CourseQuerySet.as_manager()
+    cached = CachedManager(slug_field='slug')
+
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['-created'], name='course_created_idx'),
+            models.Index(fields=['subject', '-created'], name='course_subject_created_idx'),
+            models.Index(fields=['owner', '-created'], name='course_owner_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # the subject counting the course, see courses.subjects
+        instance._counted_subject_id = instance.__dict__.get('subject_id')
+        return instance
+
 
 class Module(models.Model):
     course = models.ForeignKey(Course, related_name="modules", on_delete=models.CASCADE)
@@ -75,8 +290,14 @@ class Module(models.Model):
     description = models.TextField(blank=True)
     order = OrderField(blank=True, for_fields=['course'])
 
+    objects = models.Manager()
+    cached = CachedManager()
+
     class Meta:
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['course', 'order'], name='module_course_order_idx'),
+        ]
 
     def __str__(self):
         return f'{self.order}, {self.title}'
@@ -92,6 +313,10 @@ class Content(models.Model):
 
     class Meta:
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['module', 'order'], name='content_module_order_idx'),
+            models.Index(fields=['content_type', 'object_id'], name='content_item_idx'),
+        ]
 
 
 class ItemBase(models.Model):
@@ -107,9 +332,8 @@ class ItemBase(models.Model):
         return self.title
 
     def render(self):
-        return render_to_string(
-            f'courses/content/{self._meta.model_name}.html', {'item': self}
-        )
+        # rendering many items? use one ModuleRenderer for all of them
+        return ModuleRenderer().render_item(self)
 
 
 class Text(ItemBase):
@@ -126,3 +350,145 @@ class Image(ItemBase):
 
 class Video(ItemBase):
     url = models.URLField()
+    # resolved from url on save, see courses.embeds
+    provider = models.CharField(max_length=20, blank=True, editable=False)
+    embed_url = models.URLField(blank=True, editable=False)
+    thumbnail_url = models.URLField(blank=True, editable=False)
+    width = models.PositiveIntegerField(null=True, editable=False)
+    height = models.PositiveIntegerField(null=True, editable=False)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._resolved_url = instance.__dict__.get('url')
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self.url != getattr(self, '_resolved_url', None):
+            self.resolve_embed()
+        super().save(*args, **kwargs)
+
+    def resolve_embed(self):
+        """Store the player of ``url``, resolved once instead of per render."""
+        embed = resolve_embed(self.url)
+        self.provider, self.embed_url, self.thumbnail_url, self.width, self.height = embed
+        self._resolved_url = self.url
+
+
+class Upload(models.Model):
+    # a resumable upload in progress, see courses.uploads
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(User, related_name='uploads', on_delete=models.CASCADE)
+    module = models.ForeignKey(Module, related_name='uploads', on_delete=models.CASCADE)
+    title = models.CharField(max_length=250)
+    filename = models.CharField(max_length=255)
+    length = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated'], name='upload_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.filename} ({self.offset}/{self.length})'
+
+
+class CourseRecommendation(models.Model):
+    # "students also took", precomputed by courses.recommendations
+    course = models.ForeignKey(Course, related_name='recommendations', on_delete=models.CASCADE)
+    recommended = models.ForeignKey(Course, related_name='recommended_by', on_delete=models.CASCADE)
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['rank']
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'rank'], name='recommendation_course_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.course_id} -> {self.recommended_id} ({self.score:.3f})'
+
+
+class StaleRecommendations(models.Model):
+    # a course whose enrollments changed since its recommendations were built
+    course = models.OneToOneField(Course, primary_key=True, related_name='+', on_delete=models.CASCADE)
+
+
+class Prerequisite(models.Model):
+    # course requires required; PrerequisiteClosure follows, see courses.prerequisites
+    course = models.ForeignKey(Course, related_name='prerequisite_edges', on_delete=models.CASCADE)
+    required = models.ForeignKey(Course, related_name='dependent_edges', on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'required'], name='prerequisite_course_required_uniq'),
+            models.CheckConstraint(condition=~models.Q(course=models.F('required')), name='prerequisite_not_self'),
+        ]
+
+    def __str__(self):
+        return f'{self.course_id} requires {self.required_id}'
+
+    def closes_cycle(self):
+        # required already requires course, or is it; the chains through the
+        # edge this one replaces do not count, they go with it
+        if self.course_id == self.required_id:
+            return True
+        paths = self._paths(self.required_id, self.course_id)
+        if paths and not self._state.adding:
+            old = Prerequisite.objects.filter(pk=self.pk).values_list('course', 'required').first()
+            if old is not None:
+                paths -= self._paths(self.required_id, old[0]) * self._paths(old[1], self.course_id)
+        return paths > 0
+
+    @staticmethod
+    def _paths(course_id, required_id):
+        # chains from course to required, counting the empty one
+        if course_id == required_id:
+            return 1
+        return PrerequisiteClosure.objects.filter(
+            course=course_id, required=required_id).values_list('paths', flat=True).first() or 0
+
+    def clean(self):
+        if self.course_id is not None and self.required_id is not None and self.closes_cycle():
+            raise ValidationError({'required': 'This prerequisite would make a cycle.'})
+
+    def save(self, *args, **kwargs):
+        # the closure is updated by the signal receivers, in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class PrerequisiteClosure(models.Model):
+    # course requires required through paths chains of Prerequisite edges
+    course = models.ForeignKey(Course, related_name='+', on_delete=models.CASCADE)
+    required = models.ForeignKey(Course, related_name='+', on_delete=models.CASCADE)
+    paths = models.PositiveBigIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'required'], name='closure_course_required_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['required', 'course'], name='closure_required_course_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.course_id} requires {self.required_id} ({self.paths})'
+
+
+class CourseCompletion(models.Model):
+    user = models.ForeignKey(User, related_name='course_completions', on_delete=models.CASCADE)
+    course = models.ForeignKey(Course, related_name='completions', on_delete=models.CASCADE)
+    completed = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'course'], name='completion_user_course_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} completed {self.course_id}'
@@ -0,0 +1,203 @@
+"""Two-tier cache for single-object lookups by primary key or slug.
+
+``CachedManager`` answers ``get(pk=...)`` and ``get_by_slug(...)`` from:
+
+1. a per-process LRU (``LocalCache``) whose entries are trusted for
+   ``settings.OBJECT_CACHE_LOCAL_TTL`` seconds, then revalidated against the
+   object's version stamp;
+2. the shared Django cache, where each object is stored with the version
+   stamp it was read under;
+3. the database.
+
+Saving or deleting an object drops it from the local tier and bumps its
+version stamp in the shared cache, which invalidates the shared copy and,
+once their TTL runs out, the local copies of the other processes. Bulk
+``update()`` calls send no signal: code changing a cached model that way
+calls ``invalidate()`` with the primary keys it changed. Slugs map
+to primary keys in both tiers and are checked against the loaded object, so
+a renamed slug is never served.
+
+The version stamps only reach the other processes through a cache they all
+share: a local-memory default cache leaves each worker with its own stamps
+and stale copies for ``settings.OBJECT_CACHE_TIMEOUT``, which is why
+``courses.checks`` refuses one in production.
+
+Lookups return copies, callers are free to modify them.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+from django.db.models.signals import post_delete, post_save
+
+KEY_PREFIX = "object"
+
+
+class LocalCache:
+    """A thread-safe LRU mapping whose entries carry an expiry time.
+
+    Attributes:
+        maxsize (int): The number of entries kept.
+    """
+
+    def __init__(self, maxsize):
+        """Create an empty cache holding up to ``maxsize`` entries."""
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return ``(value, expires)`` for ``key``, or None when absent."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value, ttl):
+        """Store ``value`` under ``key`` for ``ttl`` seconds."""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """Drop ``key`` if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+
+class CachedManager(models.Manager):
+    """A manager whose primary key and slug lookups are cached.
+
+    Declare it after the default manager, so that the model keeps using the
+    regular one for relations and the admin::
+
+        objects = models.Manager()
+        cached = CachedManager()
+
+    Attributes:
+        slug_field (str | None): The unique field looked up by
+            ``get_by_slug()``.
+    """
+
+    def __init__(self, slug_field=None):
+        """Create the manager, ``slug_field`` enables ``get_by_slug()``."""
+        super().__init__()
+        self.slug_field = slug_field
+        self.local = None
+
+    def contribute_to_class(self, cls, name):
+        """Attach to ``cls`` and invalidate on its saves and deletions."""
+        super().contribute_to_class(cls, name)
+        if cls._meta.abstract:  # pylint: disable=protected-access
+            return
+        self.local = LocalCache(settings.OBJECT_CACHE_LOCAL_SIZE)
+        for signal in (post_save, post_delete):
+            signal.connect(
+                self._invalidate,
+                sender=cls,
+                weak=False,
+                dispatch_uid=f"{cls._meta.label_lower}.{name}",  # pylint: disable=protected-access
+            )
+
+    def get(self, *args, **kwargs):
+        """Answer ``get(pk=...)`` from the cache, other lookups from the DB."""
+        if args or len(kwargs) != 1:
+            return super().get(*args, **kwargs)
+        ((field, value),) = kwargs.items()
+        if field in ("pk", self.model._meta.pk.name):  # pylint: disable=protected-access
+            return copy.copy(self._get_by_pk(value))
+        if field == self.slug_field:
+            return self.get_by_slug(value)
+        return super().get(*args, **kwargs)
+
+    def get_by_slug(self, slug):
+        """Return the object whose ``slug_field`` is ``slug``.
+
+        Args:
+            slug (str): The slug.
+
+        Returns:
+            Model: A copy of the cached object.
+
+        Raises:
+            DoesNotExist: No object has this slug.
+        """
+        key = self._key(self.slug_field, slug)
+        pk = self.local.get(key)
+        pk = pk[0] if pk is not None else cache.get(key)
+        if pk is not None:
+            try:
+                obj = self._get_by_pk(pk)
+            except self.model.DoesNotExist:
+                obj = None
+            if obj is not None and getattr(obj, self.slug_field) == slug:
+                return copy.copy(obj)
+        obj = super().get(**{self.slug_field: slug})
+        cache.set(key, obj.pk, settings.OBJECT_CACHE_TIMEOUT)
+        self.local.set(key, obj.pk, settings.OBJECT_CACHE_LOCAL_TTL)
+        return copy.copy(obj)
+
+    def _key(self, field, value):
+        label = self.model._meta.label_lower  # pylint: disable=protected-access
+        return f"{KEY_PREFIX}:{label}:{field}:{value}"
+
+    def _get_by_pk(self, pk):
+        pk = self.model._meta.pk.to_python(pk)  # pylint: disable=protected-access
+        key = self._key("pk", pk)
+        version_key = f"{key}:version"
+        entry = self.local.get(key)
+        if entry is not None:
+            (version, obj), expires = entry
+            if time.monotonic() < expires:
+                return obj
+            if cache.get(version_key) == version:
+                self.local.set(key, entry[0], settings.OBJECT_CACHE_LOCAL_TTL)
+                return obj
+        shared = cache.get_many([key, version_key])
+        version = shared.get(version_key)
+        if version is None:
+            version = time.time_ns()
+            cache.add(version_key, version, None)
+            version = cache.get(version_key, version)
+        if key in shared and shared[key][0] == version:
+            obj = shared[key][1]
+        else:
+            obj = super().get(pk=pk)
+            cache.set(key, (version, obj), settings.OBJECT_CACHE_TIMEOUT)
+        self.local.set(key, (version, obj), settings.OBJECT_CACHE_LOCAL_TTL)
+        return obj
+
+    def invalidate(self, pks):
+        """Drop the cached copies of the objects of ``pks``.
+
+        Args:
+            pks (Iterable): The primary keys of objects changed without a
+                ``post_save`` signal, by ``QuerySet.update()`` for instance.
+        """
+        to_python = self.model._meta.pk.to_python  # pylint: disable=protected-access
+        keys = [self._key("pk", to_python(pk)) for pk in pks]
+        for key in keys:
+            self.local.delete(key)
+        version = time.time_ns()
+        cache.set_many({f"{key}:version": version for key in keys}, None)
+
+    def _invalidate(self, sender, instance, **kwargs):  # pylint: disable=unused-argument
+        self.invalidate([instance.pk])
+        if self.slug_field is not None:
+            slug_key = self._key(
+                self.slug_field, getattr(instance, self.slug_field)
+            )
+            self.local.delete(slug_key)
@@ -0,0 +1,249 @@
+"""Full-page cache for the public pages served to anonymous visitors.
+
+Anonymous visitors all get the same catalog and course pages, so
+``PageCacheMixin`` stores the rendered response in the default cache, keyed
+on the host, the full path and ``KEY_HEADERS``, and replays it on the next
+anonymous hit without touching the database.
+
+Every cached page is tagged with surrogate keys (``catalog``,
+``subject-<pk>``, ``course-<pk>``). Each key has a version stamp in the cache;
+an entry remembers the stamps it was rendered against and is a miss as soon
+as one of them changes, so ``purge()`` invalidates every page of a key in
+O(1). The model signal receivers below purge on writes, and the keys are also
+sent in the ``Surrogate-Key`` header so an upstream cache can purge the same
+way.
+
+Requests carrying an authenticated session and responses that set cookies or
+embed a CSRF token are never cached.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+KEY_PREFIX = "page"
+
+VERSION_PREFIX = "surrogate"
+
+# request headers whose value changes the rendered page
+KEY_HEADERS = ("HTTP_ACCEPT_LANGUAGE",)
+
+# response headers replayed on hits
+STORED_HEADERS = ("Content-Type", "Content-Language", "Vary")
+
+
+def catalog_key():
+    """Return the surrogate key shared by every catalog page."""
+    return "catalog"
+
+
+def subject_key(subject_id):
+    """Return the surrogate key of a subject's pages."""
+    return f"subject-{subject_id}"
+
+
+def course_key(course_id):
+    """Return the surrogate key of a course's pages."""
+    return f"course-{course_id}"
+
+
+def _version_keys(keys):
+    return {f"{VERSION_PREFIX}:{key}": key for key in keys}
+
+
+def get_versions(keys):
+    """Return the current version stamp of each surrogate key.
+
+    Missing stamps are created, so the result always covers ``keys``.
+
+    Args:
+        keys (Iterable[str]): The surrogate keys.
+
+    Returns:
+        dict: ``{surrogate key: version}``.
+    """
+    version_keys = _version_keys(keys)
+    found = cache.get_many(version_keys)
+    for version_key in version_keys.keys() - found.keys():
+        cache.add(version_key, time.time_ns(), None)
+        found[version_key] = cache.get(version_key)
+    return {version_keys[key]: version for key, version in found.items()}
+
+
+def purge(*keys):
+    """Invalidate every page tagged with one of ``keys``.
+
+    Args:
+        *keys (str): The surrogate keys to purge.
+    """
+    stamp = time.time_ns()
+    cache.set_many(dict.fromkeys(_version_keys(keys), stamp), None)
+
+
+def page_cache_key(request):
+    """Return the cache key of the page answering ``request``.
+
+    Args:
+        request (HttpRequest): A GET or HEAD request.
+
+    Returns:
+        str: The cache key.
+    """
+    parts = [request.get_host(), request.get_full_path()]
+    parts.extend(request.META.get(header, "") for header in KEY_HEADERS)
+    digest = hashlib.md5(
+        "\n".join(parts).encode(), usedforsecurity=False
+    ).hexdigest()
+    return f"{KEY_PREFIX}:{digest}"
+
+
+def is_anonymous(request):
+    """Tell whether ``request`` comes from an anonymous visitor.
+
+    A request without a session cookie is anonymous without loading the
+    session; otherwise the session user decides.
+
+    Args:
+        request (HttpRequest): The request.
+
+    Returns:
+        bool: True for anonymous visitors.
+    """
+    if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+        return True
+    user = getattr(request, "user", None)
+    return user is None or not user.is_authenticated
+
+
+def is_cacheable(request, response):
+    """Tell whether ``response`` may be shared between anonymous visitors.
+
+    Args:
+        request (HttpRequest): The answered request.
+        response (HttpResponse): The rendered response.
+
+    Returns:
+        bool: False for errors, streams, cookies, CSRF tokens and responses
+        marked private or uncacheable.
+    """
+    if response.status_code != 200 or response.streaming:
+        return False
+    if response.cookies or request.META.get("CSRF_COOKIE_NEEDS_UPDATE"):
+        return False
+    cache_control = response.get("Cache-Control", "")
+    return "private" not in cache_control and "no-store" not in cache_control
+
+
+class PageCacheMixin:
+    """Serve the GET and HEAD requests of anonymous visitors from the cache.
+
+    Views return their surrogate keys from ``get_surrogate_keys()``, which is
+    called with the template context of the rendered response.
+
+    Attributes:
+        page_cache_timeout (int | None): The lifetime of a cached page, in
+            seconds, ``settings.PAGE_CACHE_TIMEOUT`` when None.
+    """
+
+    page_cache_timeout = None
+
+    def get_page_cache_timeout(self):
+        """Return the lifetime of a cached page, in seconds."""
+        if self.page_cache_timeout is None:
+            return settings.PAGE_CACHE_TIMEOUT
+        return self.page_cache_timeout
+
+    def get_surrogate_keys(self, context):
+        """Return the surrogate keys of the rendered page.
+
+        Args:
+            context (dict): The template context of the response.
+
+        Returns:
+            list: The surrogate keys.
+        """
+        raise NotImplementedError
+
+    def dispatch(self, request, *args, **kwargs):
+        """Answer from the cache, or render and store the page."""
+        if request.method not in ("GET", "HEAD"):
+            return super().dispatch(request, *args, **kwargs)
+        if not is_anonymous(request):
+            response = super().dispatch(request, *args, **kwargs)
+            patch_cache_control(response, private=True)
+            return response
+        key = page_cache_key(request)
+        entry = cache.get(key)
+        if (
+            entry is not None
+            and get_versions(entry["versions"]) == entry["versions"]
+        ):
+            return self.replay(entry)
+        response = super().dispatch(request, *args, **kwargs)
+        if hasattr(response, "render"):
+            response.render()
+        if not is_cacheable(request, response):
+            patch_cache_control(response, private=True)
+            return response
+        keys = self.get_surrogate_keys(response.context_data)
+        entry = {
+            "versions": get_versions(keys),
+            "content": response.content,
+            "headers": {
+                name: response[name]
+                for name in STORED_HEADERS
+                if name in response
+            },
+        }
+        cache.set(key, entry, self.get_page_cache_timeout())
+        self.add_cache_headers(response, keys)
+        return response
+
+    def replay(self, entry):
+        """Build the response of a cache hit.
+
+        Args:
+            entry (dict): The stored page.
+
+        Returns:
+            HttpResponse: The cached page.
+        """
+        response = HttpResponse(entry["content"], headers=entry["headers"])
+        self.add_cache_headers(response, entry["versions"])
+        return response
+
+    def add_cache_headers(self, response, keys):
+        """Let upstream caches store the page and purge it by key.
+
+        The page is for anonymous visitors only, so it varies on the cookie
+        whether or not the session was read: hits skip the middleware that
+        would say so.
+
+        Args:
+            response (HttpResponse): The cacheable response.
+            keys (Iterable[str]): Its surrogate keys.
+        """
+        patch_cache_control(
+            response, public=True, max_age=self.get_page_cache_timeout()
+        )
+        patch_vary_headers(response, ("Cookie",))
+        response["Surrogate-Key"] = " ".join(keys)
+
+
+def purge_subject(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Purge the pages showing a saved or deleted subject."""
+    purge(catalog_key(), subject_key(instance.pk))
+
+
+def purge_course(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Purge the pages showing a saved or deleted course."""
+    purge(catalog_key(), course_key(instance.pk))
+
+
+def purge_module(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Purge the pages counting the modules of a course."""
+    purge(catalog_key(), course_key(instance.course_id))
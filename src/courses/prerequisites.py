@@ -0,0 +1,99 @@
+"""Transitive closure of the course prerequisites.
+
+``Prerequisite`` rows are the edges of the graph: a course requires another.
+``PrerequisiteClosure`` holds a row for every course another one requires,
+directly or not, with the number of edge chains (``paths``) leading there.
+Checking an enrollment or listing the unlocked courses is then one query
+against the closure (``CourseQuerySet.missing_prerequisites()`` and
+``unlocked_for()``) instead of a walk of the chains.
+
+The receivers below keep the closure up to date edge by edge. Adding the
+edge ``course -> required`` adds, for every course ``x`` that requires
+``course`` (or is it) and every course ``y`` that ``required`` requires (or
+is it), ``paths(x, course) * paths(required, y)`` chains from ``x`` to ``y``;
+removing it subtracts them, and a row left without chains is deleted.
+Counting chains is what makes removals exact without recomputing anything.
+An edge that would close a cycle is refused; when an edge is updated, the
+chains through its old version are not counted towards the cycle.
+"""
+
+from courses.models import Prerequisite, PrerequisiteClosure
+from courses.pagecache import course_key, purge
+
+
+def _chains(course_id, required_id):
+    # chains through the edge course -> required, {(x, y): count}
+    dependents = [(course_id, 1)]
+    dependents.extend(
+        PrerequisiteClosure.objects.filter(required=course_id).values_list(
+            "course", "paths"
+        )
+    )
+    requirements = [(required_id, 1)]
+    requirements.extend(
+        PrerequisiteClosure.objects.filter(course=required_id).values_list(
+            "required", "paths"
+        )
+    )
+    return {
+        (x, y): x_paths * y_paths
+        for x, x_paths in dependents
+        for y, y_paths in requirements
+    }
+
+
+def _update_closure(course_id, required_id, sign):
+    chains = _chains(course_id, required_id)
+    rows = PrerequisiteClosure.objects.filter(
+        course__in={x for x, _ in chains}, required__in={y for _, y in chains}
+    )
+    existing = {(row.course_id, row.required_id): row for row in rows}
+    created, changed, emptied = [], [], []
+    for pair, count in chains.items():
+        row = existing.get(pair)
+        if row is None:
+            if sign > 0:
+                created.append(
+                    PrerequisiteClosure(
+                        course_id=pair[0], required_id=pair[1], paths=count
+                    )
+                )
+        else:
+            row.paths += sign * count
+            if row.paths:
+                changed.append(row)
+            else:
+                emptied.append(row.pk)
+    PrerequisiteClosure.objects.bulk_create(created, batch_size=500)
+    PrerequisiteClosure.objects.bulk_update(changed, ["paths"], batch_size=500)
+    PrerequisiteClosure.objects.filter(pk__in=emptied).delete()
+
+
+def edge_saving(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Refuse cycles, and take a replaced edge out of the closure.
+
+    Raises:
+        ValueError: The edge would close a cycle.
+    """
+    if instance.closes_cycle():
+        raise ValueError("This prerequisite would make a cycle.")
+    if not instance._state.adding:  # pylint: disable=protected-access
+        old = Prerequisite.objects.get(pk=instance.pk)
+        _update_closure(old.course_id, old.required_id, -1)
+        purge(course_key(old.course_id))
+
+
+def edge_saved(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Add the chains through a saved edge to the closure."""
+    _update_closure(instance.course_id, instance.required_id, 1)
+    purge(course_key(instance.course_id))
+
+
+def edge_deleting(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Take the chains through a deleted edge out of the closure.
+
+    Done before the deletion: when a course goes, the closure rows naming it
+    are deleted without signals, and the chains through it would be lost.
+    """
+    _update_closure(instance.course_id, instance.required_id, -1)
+    purge(course_key(instance.course_id))
@@ -0,0 +1,216 @@
+"""On-demand profiling of production requests.
+
+``courses.middleware.ProfilingMiddleware`` profiles a request when
+
+* it carries an ``X-Profile`` header holding a token from
+  ``manage.py profiling_token`` (signed, valid for
+  ``settings.PROFILING_TOKEN_MAX_AGE`` seconds);
+* a staff user adds ``?_profile=1`` (or ``?_profile=cprofile``) to the URL;
+* it is picked by the global ``settings.PROFILING_SAMPLE_RATE`` (0 to 1).
+
+Two profilers are available, chosen by ``settings.PROFILING_MODE`` or the
+token/flag:
+
+* ``sampling`` (the default): a thread records the stack of the request's
+  thread every ``settings.PROFILING_INTERVAL`` seconds. Its cost does not
+  depend on the number of calls, and the result is written as collapsed
+  stacks (``*.collapsed``) that ``flamegraph.pl`` or speedscope render.
+* ``cprofile``: deterministic ``cProfile`` statistics (``*.prof``), to be
+  read with ``pstats`` or snakeviz; exact call counts, higher overhead.
+
+Files land in ``settings.PROFILING_DIR``, named after the time, the URL name
+(``course_list``, ``student_course_detail``, ``api-course-contents``...) and
+the duration; only the newest ``settings.PROFILING_MAX_FILES`` are kept. The
+staff-only ``profile_list`` view lists and serves them.
+
+When nothing asks for a profile the middleware only checks a header and the
+raw query string. Streaming responses are profiled until the view returns,
+not while their content is sent.
+"""
+
+import cProfile
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+
+HEADER = "HTTP_X_PROFILE"
+
+FLAG = "_profile"
+
+MODES = ("sampling", "cprofile")
+
+EXTENSIONS = {"sampling": ".collapsed", "cprofile": ".prof"}
+
+SALT = "courses.profiling"
+
+FILE_NAME = re.compile(
+    r"^(?P<time>\d{8}T\d{6}-\d{6})-(?P<url_name>[\w.-]+)-(?P<ms>\d+)ms"
+    r"(?P<extension>\.collapsed|\.prof)$"
+)
+
+
+def make_token(mode="sampling"):
+    """Return a signed ``X-Profile`` header value for ``mode``."""
+    return signing.TimestampSigner(salt=SALT).sign(mode)
+
+
+def read_token(token):
+    """Return the mode of a valid token, ``None`` otherwise."""
+    try:
+        mode = signing.TimestampSigner(salt=SALT).unsign(
+            token, max_age=settings.PROFILING_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return None
+    return mode if mode in MODES else None
+
+
+class Sampler:
+    """Sample the stack of the current thread from a background thread.
+
+    Attributes:
+        interval (float): Seconds between two samples.
+        stacks (Counter): The number of samples of each collapsed stack.
+    """
+
+    def __init__(self, interval):
+        """Create a sampler of the calling thread."""
+        self.interval = interval
+        self.stacks = Counter()
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="kalakar-profiler", daemon=True
+        )
+
+    def start(self):
+        """Start sampling."""
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the last sample."""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)  # pylint: disable=protected-access
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                name = getattr(code, "co_qualname", code.co_name)
+                module = frame.f_globals.get("__name__", "?")
+                stack.append(f"{module}.{name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        """Return the samples as collapsed stacks, one ``stack count`` a line."""
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+
+def profile(mode, func, *args):
+    """Call ``func(*args)`` under the profiler of ``mode``.
+
+    Args:
+        mode (str): ``sampling`` or ``cprofile``.
+        func (callable): The profiled call.
+        *args: Its arguments.
+
+    Returns:
+        tuple: The result of the call, and a callable writing the profile
+        to the path it is given.
+    """
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        result = profiler.runcall(func, *args)
+        return result, profiler.dump_stats
+    sampler = Sampler(settings.PROFILING_INTERVAL)
+    sampler.start()
+    try:
+        result = func(*args)
+    finally:
+        sampler.stop()
+    return result, lambda path: Path(path).write_text(sampler.collapsed())
+
+
+def url_name(request):
+    """Return the file-name-safe URL name of ``request``."""
+    match = getattr(request, "resolver_match", None)
+    name = match.view_name if match is not None else ""
+    return re.sub(r"[^\w.-]", "-", name) or "unresolved"
+
+
+def save(request, mode, write, elapsed):
+    """Write a request's profile and drop the oldest ones.
+
+    Args:
+        request (HttpRequest): The profiled request.
+        mode (str): The profiler used.
+        write (callable): Writes the profile to a path.
+        elapsed (float): The duration of the request, in seconds.
+
+    Returns:
+        Path: The written file.
+    """
+    directory = Path(settings.PROFILING_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    now = time.time()
+    stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now))
+    micro = int(now % 1 * 1_000_000)
+    path = directory / (
+        f"{stamp}-{micro:06}-{url_name(request)}-{round(elapsed * 1000)}ms"
+        f"{EXTENSIONS[mode]}"
+    )
+    write(path)
+    for stale in list_profiles()[settings.PROFILING_MAX_FILES :]:
+        stale["path"].unlink(missing_ok=True)
+    return path
+
+
+def profile_path(name):
+    """Return the path of the stored profile ``name``, ``None`` if invalid."""
+    if FILE_NAME.match(name) is None:
+        return None
+    return Path(settings.PROFILING_DIR) / name
+
+
+def list_profiles():
+    """Return the stored profiles, newest first.
+
+    Returns:
+        list: A dict per file with ``name``, ``path``, ``url_name``,
+        ``duration`` (ms), ``mode``, ``size`` and ``time``.
+    """
+    directory = Path(settings.PROFILING_DIR)
+    if not directory.is_dir():
+        return []
+    profiles = []
+    for path in directory.iterdir():
+        match = FILE_NAME.match(path.name)
+        if match is None:
+            continue
+        profiles.append(
+            {
+                "name": path.name,
+                "path": path,
+                "url_name": match["url_name"],
+                "duration": int(match["ms"]),
+                "mode": "cprofile"
+                if match["extension"] == ".prof"
+                else "sampling",
+                "size": path.stat().st_size,
+                "time": match["time"],
+            }
+        )
+    profiles.sort(key=lambda profile: profile["name"], reverse=True)
+    return profiles
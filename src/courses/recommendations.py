@@ -0,0 +1,216 @@
+"""Precomputed "students also took" recommendations.
+
+Two courses are similar when the same students took them: their score is the
+cosine of their enrollment vectors, ``shared students / sqrt(students of
+one * students of the other)``. The ``settings.RECOMMENDATIONS_TOP_K`` best
+courses of each course are stored in ``CourseRecommendation``, so showing
+them is one indexed lookup (``Course.objects.recommended_for(course)``)
+instead of a self-join of the enrollments.
+
+Enrollment changes mark their course stale (``StaleRecommendations``) and
+schedule ``refresh_stale()`` in the background, at most every
+``settings.RECOMMENDATIONS_REFRESH_INTERVAL`` seconds. A refresh reads the
+enrollments of the students of the stale courses only, builds the sparse
+course x student matrix of that slice in memory and counts the shared
+students from it. The courses that share students with a stale course are
+not refreshed with it, although their score against it moved;
+``manage.py refresh_recommendations --all`` rebuilds everything.
+"""
+
+import heapq
+import math
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from courses.models import Course, CourseRecommendation, StaleRecommendations
+from courses.pagecache import course_key, purge
+from courses.tasks import enqueue
+
+SCHEDULED_KEY = "recommendations:refresh:scheduled"
+
+# keeps IN lists below the SQLite variable limit
+CHUNK_SIZE = 500
+
+Enrollment = Course.students.through
+
+
+def _chunks(values, size=CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def _enrollment_counts(course_ids):
+    counts = {}
+    for chunk in _chunks(course_ids):
+        counts.update(
+            Enrollment.objects.filter(course_id__in=chunk)
+            .values("course_id")
+            .annotate(count=Count("pk"))
+            .order_by()
+            .values_list("course_id", "count")
+        )
+    return counts
+
+
+def similar_courses(course_ids, top_k):
+    """Compute the most similar courses of each course.
+
+    Args:
+        course_ids (Iterable[int]): The courses.
+        top_k (int): The number of courses kept per course.
+
+    Returns:
+        dict: ``{course id: [(score, similar course id), ...]}``, best
+        first, for every course given (an empty list for courses without
+        students).
+    """
+    targets = set(course_ids)
+    # one row (student, course) per enrollment of the students concerned
+    courses_of = defaultdict(list)
+    for chunk in _chunks(targets):
+        students = Enrollment.objects.filter(course_id__in=chunk).values(
+            "user_id"
+        )
+        for user_id, course_id in Enrollment.objects.filter(
+            user_id__in=students
+        ).values_list("user_id", "course_id"):
+            courses_of[user_id].append(course_id)
+
+    shared = defaultdict(Counter)
+    for courses in courses_of.values():
+        for target in targets.intersection(courses):
+            shared[target].update(courses)
+
+    sizes = _enrollment_counts(
+        {course for counter in shared.values() for course in counter}
+    )
+    similar = {}
+    for target in targets:
+        counter = shared.get(target, Counter())
+        counter.pop(target, None)
+        similar[target] = heapq.nlargest(
+            top_k,
+            (
+                (count / math.sqrt(sizes[target] * sizes[course]), course)
+                for course, count in counter.items()
+            ),
+            # ties go to the oldest course
+            key=lambda pair: (pair[0], -pair[1]),
+        )
+    return similar
+
+
+def refresh(course_ids, top_k=None):
+    """Recompute and store the recommendations of some courses.
+
+    Args:
+        course_ids (Iterable[int]): The courses.
+        top_k (int, optional): The number of recommendations per course,
+            defaults to ``settings.RECOMMENDATIONS_TOP_K``.
+
+    Returns:
+        int: The number of recommendations stored.
+    """
+    top_k = top_k or settings.RECOMMENDATIONS_TOP_K
+    course_ids = set(
+        Course.objects.filter(pk__in=list(course_ids)).values_list(
+            "pk", flat=True
+        )
+    )
+    similar = similar_courses(course_ids, top_k)
+    rows = [
+        CourseRecommendation(
+            course_id=course_id, recommended_id=other, rank=rank, score=score
+        )
+        for course_id, best in similar.items()
+        for rank, (score, other) in enumerate(best)
+    ]
+    with transaction.atomic():
+        for chunk in _chunks(course_ids):
+            CourseRecommendation.objects.filter(course_id__in=chunk).delete()
+        CourseRecommendation.objects.bulk_create(rows, batch_size=CHUNK_SIZE)
+    purge(*(course_key(course_id) for course_id in course_ids))
+    return len(rows)
+
+
+def refresh_stale(batch_size=None):
+    """Refresh the stale courses, batch by batch.
+
+    The stale marks of a batch are taken before its refresh, so an
+    enrollment during the refresh marks its course stale again.
+
+    Args:
+        batch_size (int, optional): The number of courses per batch,
+            defaults to ``settings.RECOMMENDATIONS_BATCH_SIZE``.
+
+    Returns:
+        int: The number of courses refreshed.
+    """
+    batch_size = batch_size or settings.RECOMMENDATIONS_BATCH_SIZE
+    total = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                StaleRecommendations.objects.values_list(
+                    "course_id", flat=True
+                )[:batch_size]
+            )
+            StaleRecommendations.objects.filter(course_id__in=batch).delete()
+        if not batch:
+            return total
+        try:
+            refresh(batch)
+        except Exception:
+            mark_stale(batch)
+            raise
+        total += len(batch)
+
+
+def rebuild(batch_size=None):
+    """Recompute the recommendations of every course.
+
+    Returns:
+        int: The number of courses refreshed.
+    """
+    batch_size = batch_size or settings.RECOMMENDATIONS_BATCH_SIZE
+    StaleRecommendations.objects.all().delete()
+    course_ids = list(Course.objects.values_list("pk", flat=True))
+    for batch in _chunks(course_ids, batch_size):
+        refresh(batch)
+    return len(course_ids)
+
+
+def schedule_refresh():
+    """Refresh the stale courses in the background, unless done recently."""
+    if cache.add(
+        SCHEDULED_KEY, True, settings.RECOMMENDATIONS_REFRESH_INTERVAL
+    ):
+        enqueue(refresh_stale)
+
+
+def mark_stale(course_ids):
+    """Queue courses for a refresh of their recommendations."""
+    StaleRecommendations.objects.bulk_create(
+        [StaleRecommendations(course_id=pk) for pk in course_ids],
+        ignore_conflicts=True,
+    )
+
+
+def enrollments_changed(sender, instance, action, reverse, pk_set, **kwargs):  # pylint: disable=unused-argument
+    """Mark the courses whose students changed, from either side."""
+    if action in ("post_add", "post_remove") and pk_set:
+        mark_stale(pk_set if reverse else [instance.pk])
+    elif action == "pre_clear":
+        mark_stale(
+            instance.courses_joined.values_list("pk", flat=True)
+            if reverse
+            else [instance.pk]
+        )
+    else:
+        return
+    schedule_refresh()
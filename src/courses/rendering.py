@@ -0,0 +1,138 @@
+"""Rendering of content items.
+
+``render_to_string()`` looks the template up and builds a fresh context for
+every call, so rendering a module item by item pays both once per item.
+``ModuleRenderer`` resolves each ``courses/content/<model>.html`` template
+once and renders every item of a module against one shared context.
+
+``render_outline()`` renders none of them: the student view lists the item
+titles and fetches each body when it is opened, so the page costs the same
+whatever the size of the items.
+"""
+
+from collections import namedtuple
+
+from django.contrib.contenttypes.prefetch import GenericPrefetch
+from django.template import Context, engines
+
+RenderedContent = namedtuple("RenderedContent", ["content", "item", "html"])
+
+
+class ModuleRenderer:
+    """Render content items with one template lookup per item type.
+
+    An instance caches the templates it resolved and reuses a single
+    ``Context``, so it should live for one request or one batch of items.
+
+    Attributes:
+        engine (Engine): The Django template engine used for lookups.
+    """
+
+    template_name = "courses/content/{model_name}.html"
+
+    def __init__(self, using="django"):
+        """Create a renderer bound to the ``using`` template backend.
+
+        Args:
+            using (str): The alias of a DjangoTemplates backend.
+        """
+        self.engine = engines[using].engine
+        self._templates = {}
+        self._context = Context(autoescape=self.engine.autoescape)
+
+    def get_template(self, model_name):
+        """Return the template for ``model_name``, resolving it only once.
+
+        Args:
+            model_name (str): The item model name (text, file, image, video).
+
+        Returns:
+            Template: The compiled template.
+        """
+        template = self._templates.get(model_name)
+        if template is None:
+            template = self.engine.get_template(
+                self.template_name.format(model_name=model_name)
+            )
+            self._templates[model_name] = template
+        return template
+
+    def render_item(self, item):
+        """Render a single item.
+
+        Args:
+            item (ItemBase): The item to render.
+
+        Returns:
+            str: The rendered, safe HTML.
+        """
+        template = self.get_template(item._meta.model_name)  # pylint: disable=protected-access
+        with self._context.push(item=item):
+            return template.render(self._context)
+
+    def render_contents(self, contents):
+        """Render a sequence of contents in one pass.
+
+        Contents whose item no longer exists are skipped.
+
+        Args:
+            contents (Iterable[Content]): Contents, ideally with ``item``
+                prefetched.
+
+        Returns:
+            list: A ``RenderedContent`` per content, in order.
+        """
+        return [
+            RenderedContent(
+                content, content.item, self.render_item(content.item)
+            )
+            for content in contents
+            if content.item is not None
+        ]
+
+    def render_module(self, module):
+        """Render every item of a module, fetching items per type in bulk.
+
+        Args:
+            module (Module): The module to render.
+
+        Returns:
+            list: A ``RenderedContent`` per content, in order.
+        """
+        return self.render_contents(module.contents.prefetch_related("item"))
+
+    def render_outline(self, module, expanded=None):
+        """List the items of a module, rendering one of them at most.
+
+        Only the titles and ``updated`` stamps of the items are fetched.
+
+        Args:
+            module (Module): The module to list.
+            expanded (int, optional): The ID of the content to render.
+
+        Returns:
+            list: A ``RenderedContent`` per content, in order, whose
+            ``html`` is None unless it is the expanded one.
+        """
+        # pylint: disable-next=import-outside-toplevel
+        from courses.models import File, Image, Text, Video
+
+        contents = module.contents.prefetch_related(
+            GenericPrefetch(
+                "item",
+                [
+                    model.objects.only("title", "updated")
+                    for model in (Text, File, Image, Video)
+                ],
+            )
+        )
+        outline = []
+        for content in contents:
+            item, html = content.item, None
+            if item is None:
+                continue
+            if content.pk == expanded:
+                item = type(item).objects.get(pk=item.pk)
+                html = self.render_item(item)
+            outline.append(RenderedContent(content, item, html))
+        return outline
@@ -0,0 +1,201 @@
+"""Worker start-up: import-time profiling and warm-up.
+
+A new worker imports Django, the apps and their models, then pays on its
+first request for the rest: the URLconf imports every view module (DRF,
+braces, the admin's views), the URL resolver builds its reverse tables,
+templates are read and compiled on first use, and ``ContentType`` lookups
+fill their cache one query at a time.
+
+``warm_up()`` does that work up front. ``root/wsgi.py`` and ``root/asgi.py``
+call it when ``settings.WORKER_WARM_UP`` is on, i.e. before the server hands
+the worker any traffic (in the master process with ``gunicorn --preload``).
+
+``profile_startup()`` boots a fresh interpreter with ``-X importtime`` and
+reports the time of each start-up phase and of each imported module; see
+``manage.py startup_profile``. Modules Django loads with
+``importlib.import_module()`` (the settings, the app configs and models, the
+URLconf) are not reported themselves, only the modules they import.
+"""
+
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# too slow to import at boot, they are imported where they are used
+DEFERRED_MODULES = ("zipfile", "urllib.request", "PIL")
+
+IMPORT_TIME = re.compile(
+    r"^import time:\s+(?P<self>\d+) \|\s+(?P<cumulative>\d+) \|"
+    r"(?P<indent>\s*)(?P<module>\S+)$"
+)
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+phases = {}
+import django.core.wsgi
+phases["import"] = time.perf_counter() - start
+mark = time.perf_counter()
+django.core.wsgi.get_wsgi_application()
+phases["setup"] = time.perf_counter() - mark
+loaded = [name for name in json.loads(sys.argv[1]) if name in sys.modules]
+if sys.argv[2] == "1":
+    from courses.startup import warm_up
+    mark = time.perf_counter()
+    warm_up()
+    phases["warm_up"] = time.perf_counter() - mark
+phases["total"] = time.perf_counter() - start
+print(json.dumps({"phases": phases, "loaded": loaded}))
+"""
+
+
+def _warm_resolver(resolver):
+    # reverse_dict populates the resolver; namespaces have their own
+    resolver.reverse_dict  # pylint: disable=pointless-statement
+    for _, namespace_resolver in resolver.namespace_dict.values():
+        _warm_resolver(namespace_resolver)
+
+
+def _project_template_names(engine):
+    base_dir = Path(settings.BASE_DIR).resolve()
+    for loader in engine.template_loaders:
+        # the cached loader wraps the filesystem and app directories loaders
+        for inner in getattr(loader, "loaders", [loader]):
+            for directory in inner.get_dirs():
+                directory = Path(directory).resolve()
+                # third-party templates (admin, DRF) wait until they are used
+                if directory.is_dir() and directory.is_relative_to(base_dir):
+                    for path in directory.rglob("*.html"):
+                        yield path.relative_to(directory).as_posix()
+
+
+def warm_up():
+    """Build what the first request of a worker would otherwise build.
+
+    Imports the URLconf and builds the reverse tables of every resolver,
+    compiles the project's templates into the cached loader and fills the
+    ``ContentType`` cache, then closes the database connections so that
+    forked workers do not share them.
+
+    Returns:
+        dict: The duration of each step, in seconds.
+    """
+    # pylint: disable=import-outside-toplevel
+    from django.apps import apps
+    from django.contrib.contenttypes.models import ContentType
+    from django.db import DatabaseError, connections
+    from django.template import TemplateSyntaxError, engines
+    from django.urls import get_resolver
+
+    timings = {}
+    mark = time.perf_counter()
+    _warm_resolver(get_resolver())
+    timings["urls"] = time.perf_counter() - mark
+
+    mark = time.perf_counter()
+    count = 0
+    for backend in engines.all():
+        engine = getattr(backend, "engine", None)
+        if engine is None:
+            continue
+        for name in _project_template_names(engine):
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError:
+                logger.warning("Template %s does not compile", name)
+            count += 1
+    timings["templates"] = time.perf_counter() - mark
+
+    mark = time.perf_counter()
+    try:
+        ContentType.objects.get_for_models(*apps.get_models())
+    except DatabaseError:
+        logger.warning("ContentType cache not primed", exc_info=True)
+    finally:
+        connections.close_all()
+    timings["content_types"] = time.perf_counter() - mark
+
+    logger.info(
+        "Warmed up in %.0f ms (%d templates)",
+        sum(timings.values()) * 1000,
+        count,
+    )
+    return timings
+
+
+def parse_import_times(output):
+    """Parse the ``-X importtime`` report of an interpreter.
+
+    Args:
+        output (str): What the interpreter wrote to stderr.
+
+    Returns:
+        list: A ``(module, self µs, cumulative µs, depth)`` tuple per
+        imported module, in import order.
+    """
+    imports = []
+    for line in output.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match:
+            imports.append(
+                (
+                    match["module"],
+                    int(match["self"]),
+                    int(match["cumulative"]),
+                    (len(match["indent"]) - 1) // 2,
+                )
+            )
+    return imports
+
+
+def profile_startup(warm=False):
+    """Boot a fresh worker interpreter and time its start-up.
+
+    Args:
+        warm (bool): Run ``warm_up()`` after the WSGI application is built.
+
+    Returns:
+        dict: ``phases`` (seconds per phase: ``import``, ``setup``, maybe
+        ``warm_up``, and ``total``), ``loaded`` (the ``DEFERRED_MODULES``
+        imported anyway by the setup) and ``imports`` (see
+        ``parse_import_times()``).
+
+    Raises:
+        subprocess.CalledProcessError: The interpreter failed to boot.
+    """
+    base_dir = str(settings.BASE_DIR)
+    env = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE,
+        "PYTHONPATH": os.pathsep.join(
+            filter(None, [base_dir, os.environ.get("PYTHONPATH")])
+        ),
+    }
+    result = subprocess.run(  # noqa: S603
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            SCRIPT,
+            json.dumps(DEFERRED_MODULES),
+            "1" if warm else "0",
+        ],
+        cwd=base_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report["imports"] = parse_import_times(result.stderr)
+    return report
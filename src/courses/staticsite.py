@@ -0,0 +1,290 @@
+"""Static export of the public catalog and course pages.
+
+``export()`` renders the catalog (``course_list``), the subject pages
+(``course_list_subject``) and the course pages (``course_detail``) as an
+anonymous visitor sees them, into ``index.html`` files under the output
+directory. Signed-in visitors must not get those copies (they would lose
+their enroll buttons and see another visitor's view), so the front-end
+server answers from them only for requests without the session cookie
+(``settings.SESSION_COOKIE_NAME``) and hands the others to Django::
+
+    map $cookie_sessionid $export_root {
+        ""      /srv/kalakar/public;
+        default /nonexistent;
+    }
+
+    location / {
+        root $export_root;
+        try_files $uri $uri/index.html @django;
+    }
+
+Django then only serves signed-in visitors and the pages not exported.
+
+Each page has a source fingerprint computed from a few bulk queries (the
+subject tree, the courses' ``updated`` stamps, their recommendations and
+prerequisites) without rendering anything. ``manifest.json`` keeps the
+fingerprint and the SHA-256 of the HTML of every exported page; the next
+export renders only the pages whose fingerprint changed, and rewrites only
+the files whose HTML did. Template or code changes are not fingerprinted,
+export with ``force`` after a deployment.
+
+Pages are rendered by a pool of worker processes, through the whole
+middleware stack. The sitemap index (``sitemap.xml``) points at sitemaps of
+``settings.STATIC_EXPORT_SITEMAP_SIZE`` URLs at most.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+from urllib.parse import urlsplit
+from xml.sax.saxutils import escape
+
+import django
+from django.conf import settings
+from django.db import connections
+from django.urls import reverse
+
+from courses.models import (
+    Course,
+    CourseRecommendation,
+    Prerequisite,
+    Subject,
+    path_ancestor_ids,
+)
+
+MANIFEST = "manifest.json"
+
+SITEMAP_INDEX = "sitemap.xml"
+
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+# set in each worker process by _init_worker()
+_client = None
+_output = None
+
+
+def _digest(*parts):
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+def page_sources():
+    """Fingerprint the data each public page shows.
+
+    Returns:
+        dict: ``{URL path: fingerprint}`` for every public page.
+    """
+    subjects = list(
+        Subject.objects.order_by("path").values_list(
+            "pk", "slug", "title", "path", "course_total"
+        )
+    )
+    # every catalog page has the subject tree in its sidebar
+    sidebar = _digest(subjects)
+    paths = {pk: path for pk, _, _, path, _ in subjects}
+    courses = list(
+        Course.objects.order_by("pk").values_list(
+            "pk", "slug", "subject_id", "owner_id", "updated"
+        )
+    )
+    stamps = {pk: updated for pk, _, _, _, updated in courses}
+    recommended = defaultdict(list)
+    for course_id, other in CourseRecommendation.objects.order_by(
+        "course", "rank"
+    ).values_list("course", "recommended"):
+        recommended[course_id].append((other, stamps.get(other)))
+    prerequisites = defaultdict(list)
+    for course_id, required in Prerequisite.objects.order_by(
+        "course", "required"
+    ).values_list("course", "required"):
+        prerequisites[course_id].append((required, stamps.get(required)))
+
+    listed = defaultdict(list)
+    for row in courses:
+        path = paths[row[2]]
+        for subject_id in path_ancestor_ids(path) + [row[2]]:
+            listed[subject_id].append(row)
+
+    sources = {reverse("course_list"): _digest(sidebar, courses)}
+    for pk, slug, *_ in subjects:
+        path = reverse("course_list_subject", args=[slug])
+        sources[path] = _digest(sidebar, pk, listed[pk])
+    subject_rows = {row[0]: row for row in subjects}
+    for row in courses:
+        path = reverse("course_detail", args=[row[1]])
+        sources[path] = _digest(
+            row,
+            subject_rows[row[2]][:3],
+            recommended[row[0]],
+            prerequisites[row[0]],
+        )
+    return sources
+
+
+def output_file(output, path):
+    """Return the file of the page at URL ``path``."""
+    return Path(output, path.strip("/"), "index.html")
+
+
+def _write(target, data):
+    # readers never see a half-written file
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp = tempfile.mkstemp(dir=target.parent, prefix=".export-")
+    with os.fdopen(fd, "wb") as stream:
+        stream.write(data)
+    os.chmod(temp, 0o644)
+    os.replace(temp, target)
+
+
+def _init_worker(output, host, worker=True):
+    global _client, _output  # pylint: disable=global-statement
+    if worker:
+        # spawned workers start without Django, forked ones share its
+        # connections with the parent
+        django.setup()
+        connections.close_all()
+    # pylint: disable-next=import-outside-toplevel
+    from django.test import Client
+
+    _client = Client(HTTP_HOST=host)
+    _output = output
+
+
+def _render(task):
+    path, previous = task
+    response = _client.get(path)
+    if response.status_code != 200:
+        return path, None, False
+    content = response.content
+    sha = hashlib.sha256(content).hexdigest()
+    target = output_file(_output, path)
+    if sha != previous or not target.exists():
+        _write(target, content)
+        return path, sha, True
+    return path, sha, False
+
+
+def render_pages(tasks, output, host, workers):
+    """Render pages into ``output``.
+
+    Args:
+        tasks (list): ``(URL path, SHA-256 of the exported HTML or None)``
+            pairs; a page whose HTML has not changed is not rewritten.
+        output (str): The output directory.
+        host (str): The ``Host`` of the requests.
+        workers (int): The number of processes, 1 renders in this one.
+
+    Returns:
+        list: ``(URL path, SHA-256 or None if not 200, written)`` triples.
+    """
+    if workers <= 1 or len(tasks) <= 1:
+        _init_worker(output, host, worker=False)
+        return [_render(task) for task in tasks]
+    # the workers open connections of their own
+    connections.close_all()
+    with multiprocessing.Pool(
+        workers, initializer=_init_worker, initargs=(output, host)
+    ) as pool:
+        chunksize = max(1, len(tasks) // (workers * 4))
+        return list(pool.imap_unordered(_render, tasks, chunksize))
+
+
+def write_sitemaps(output, base_url, paths, size):
+    """Write the sitemap index and its sitemaps.
+
+    Args:
+        output (str): The output directory.
+        base_url (str): The scheme and host of the site.
+        paths (list): The URL paths, in order.
+        size (int): URLs per sitemap.
+
+    Returns:
+        int: The number of sitemaps.
+    """
+    base_url = base_url.rstrip("/")
+    names = []
+    for start in range(0, len(paths), size):
+        name = f"sitemap-{len(names) + 1}.xml"
+        urls = "".join(
+            f"<url><loc>{escape(base_url + path)}</loc></url>\n"
+            for path in paths[start : start + size]
+        )
+        _write(
+            Path(output, name),
+            f'<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<urlset xmlns="{SITEMAP_NS}">\n{urls}</urlset>\n'.encode(),
+        )
+        names.append(name)
+    sitemaps = "".join(
+        f"<sitemap><loc>{escape(f'{base_url}/{name}')}</loc></sitemap>\n"
+        for name in names
+    )
+    _write(
+        Path(output, SITEMAP_INDEX),
+        f'<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<sitemapindex xmlns="{SITEMAP_NS}">\n{sitemaps}</sitemapindex>\n'.encode(),
+    )
+    # sitemaps beyond the new count are stale
+    for stale in Path(output).glob("sitemap-*.xml"):
+        if stale.name not in names:
+            stale.unlink()
+    return len(names)
+
+
+def export(output, base_url, workers=1, force=False):
+    """Export the public pages that changed since the last export.
+
+    Args:
+        output (str): The output directory.
+        base_url (str): The scheme and host of the site, for the sitemaps
+            and the ``Host`` of the rendered requests.
+        workers (int): The number of rendering processes.
+        force (bool): Render every page.
+
+    Returns:
+        dict: The numbers of ``pages``, ``rendered``, ``written``,
+        ``removed`` and ``failed`` pages, and of ``sitemaps``.
+    """
+    manifest_file = Path(output, MANIFEST)
+    try:
+        manifest = json.loads(manifest_file.read_text())
+    except FileNotFoundError:
+        manifest = {"pages": {}}
+    previous = manifest["pages"]
+    sources = page_sources()
+    tasks = [
+        (path, previous.get(path, {}).get("sha256"))
+        for path, source in sources.items()
+        if force or previous.get(path, {}).get("source") != source
+    ]
+    results = render_pages(tasks, output, urlsplit(base_url).netloc, workers)
+
+    pages = {path: entry for path, entry in previous.items() if path in sources}
+    failed = 0
+    for path, sha, _ in results:
+        if sha is None:
+            failed += 1
+            pages.pop(path, None)
+        else:
+            pages[path] = {"source": sources[path], "sha256": sha}
+    removed = 0
+    for path in previous.keys() - sources.keys():
+        output_file(output, path).unlink(missing_ok=True)
+        removed += 1
+    # in catalog order, whatever the order of the exports
+    pages = {path: pages[path] for path in sources if path in pages}
+    sitemaps = write_sitemaps(
+        output, base_url, list(pages), settings.STATIC_EXPORT_SITEMAP_SIZE
+    )
+    _write(manifest_file, json.dumps({"pages": pages}, indent=1).encode())
+    return {
+        "pages": len(pages),
+        "rendered": len(results),
+        "written": sum(written for _, _, written in results),
+        "removed": removed,
+        "failed": failed,
+        "sitemaps": sitemaps,
+    }
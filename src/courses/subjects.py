@@ -0,0 +1,48 @@
+"""Course totals of the subject tree.
+
+``Subject.course_total`` counts the courses of a subject and of its
+descendants, so the catalog shows the totals of the whole tree without
+counting. A course saved in, moved out of or deleted from a subject changes
+the totals of that subject's ancestors only: the receivers below recount
+those few rows, ancestor ids being read from the materialized path
+(``Subject.path``). Moving a subject recounts its old and new ancestors, see
+``Subject.save()``.
+"""
+
+from courses.models import PATH_SEPARATOR, Subject, path_ancestor_ids
+
+
+def refresh_subject_totals(subject_ids):
+    """Recount the totals of some subjects and of their ancestors.
+
+    Args:
+        subject_ids (Iterable[int]): The subjects.
+    """
+    paths = Subject.objects.filter(pk__in=list(subject_ids)).values_list(
+        "path", flat=True
+    )
+    ids = {
+        int(step) for path in paths for step in path.split(PATH_SEPARATOR)[:-1]
+    }
+    if ids:
+        Subject.objects.filter(pk__in=ids).refresh_totals()
+
+
+def course_saved(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """Recount when a course is added to or moved out of a subject."""
+    counted = getattr(instance, "_counted_subject_id", None)
+    if created or counted != instance.subject_id:
+        refresh_subject_totals({counted, instance.subject_id} - {None})
+        instance._counted_subject_id = instance.subject_id  # pylint: disable=protected-access
+
+
+def course_deleted(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Recount the subjects of a deleted course."""
+    refresh_subject_totals([instance.subject_id])
+
+
+def subject_deleted(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Recount the ancestors of a deleted subject."""
+    ancestors = path_ancestor_ids(instance.path)
+    if ancestors:
+        Subject.objects.filter(pk__in=ancestors).refresh_totals()
@@ -0,0 +1,58 @@
+"""A minimal in-process background queue.
+
+``enqueue()`` runs a function on a single worker thread once the current
+transaction commits, so the request that scheduled it returns right away.
+Each task gets its own database connection, closed when the task ends.
+
+Tasks are lost if the process exits before they run; only schedule work
+that a periodic job can redo, such as ``manage.py gc_content``.
+With ``settings.BACKGROUND_TASKS_EAGER`` tasks run inline, which is what
+tests and management commands want.
+"""
+
+import logging
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor  # pylint: disable=global-statement
+    if _executor is None:
+        # imported on first use, most processes never run a task
+        # pylint: disable-next=import-outside-toplevel
+        from concurrent.futures import ThreadPoolExecutor
+
+        _executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="kalakar-task"
+        )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:  # pylint: disable=broad-exception-caught
+        logger.exception("Background task %s failed", func.__qualname__)
+    finally:
+        connections.close_all()
+
+
+def enqueue(func, *args, **kwargs):
+    """Run ``func(*args, **kwargs)`` in the background after commit.
+
+    Args:
+        func (callable): The task.
+        *args: Positional arguments of the task.
+        **kwargs: Keyword arguments of the task.
+    """
+    if settings.BACKGROUND_TASKS_EAGER:
+        transaction.on_commit(lambda: func(*args, **kwargs))
+        return
+    transaction.on_commit(
+        lambda: _get_executor().submit(_run, func, args, kwargs)
+    )
@@ -1,3 +1,1746 @@
-from django.test import TestCase
+"""Unit test case module."""
 
-# Create your tests here.
+import base64
+import datetime
+import gzip
+import hashlib
+import http.client
+import io
+import json
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core import checks
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.http import FileResponse, HttpResponse
+from django.template import engines
+from django.template.loader import render_to_string
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from courses import (
+    pagecache,
+    profiling,
+    recommendations,
+    startup,
+    staticsite,
+    uploads,
+)
+from courses.api import streaming
+from courses.api.fast import (
+    FastCourseSerializer,
+    FastModuleSerializer,
+    FastSubjectSerializer,
+)
+from courses.api.selection import optimize_queryset, parse_paths
+from courses.api.serializers import (
+    CourseSerializer,
+    CourseWithContentSerializer,
+    ModuleSerializer,
+    SubjectSerializer,
+)
+from courses.benchmarks import micro
+from courses.checks import shared_cache_check
+from courses.cloning import clone_course
+from courses.db import ReadOnlyRouter
+from courses.deletion import delete_course, delete_items
+from courses.middleware import ReadOnlyRoutingMiddleware
+from courses.models import (
+    Content,
+    Course,
+    CourseCompletion,
+    CourseRecommendation,
+    File,
+    Module,
+    Prerequisite,
+    PrerequisiteClosure,
+    StaleRecommendations,
+    Subject,
+    Text,
+    Upload,
+    Video,
+)
+from courses.rendering import ModuleRenderer
+from notifications.models import CourseUpdate
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN is SQLite's")
+class QueryPlanTest(TestCase):
+    """Guard the query plans of the hot querysets.
+
+    A plan regresses when SQLite falls back to a full table scan or sorts in
+    a temp B-tree instead of walking one of the composite indexes.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create one row per table, the planner does not need more."""
+        cls.owner = User.objects.create(username="owner")
+        cls.subject = Subject.objects.create(title="Python", slug="python")
+        cls.course = Course.objects.create(
+            owner=cls.owner,
+            subject=cls.subject,
+            title="Django",
+            slug="django",
+            overview="",
+        )
+        cls.module = Module.objects.create(course=cls.course, title="Intro")
+        text = Text.objects.create(owner=cls.owner, title="Hello", content="")
+        cls.content = Content.objects.create(module=cls.module, item=text)
+
+    def assertIndexedPlan(self, queryset, allow_index_scan=False):  # pylint: disable=invalid-name
+        """Fail if the plan of ``queryset`` scans a table or sorts.
+
+        Args:
+            queryset (QuerySet): The queryset to explain.
+            allow_index_scan (bool): Accept walking a whole index in order,
+                for listings that return every row anyway.
+        """
+        plan = queryset.explain()
+        assert "USE TEMP B-TREE" not in plan, plan
+        for line in plan.splitlines():
+            assert not re.search(r"\bSCAN \S+$", line), plan
+            assert allow_index_scan or "SCAN" not in line, plan
+
+    def test_catalog(self):
+        """The catalog walks the created index, counts use the FK index."""
+        courses = Course.objects.with_module_count().select_related(
+            "owner", "subject"
+        )
+        self.assertIndexedPlan(courses, allow_index_scan=True)
+
+    def test_catalog_by_subject(self):
+        """A subject's catalog uses the (subject, -created) index."""
+        courses = Course.objects.with_module_count().filter(
+            subject=self.subject
+        )
+        self.assertIndexedPlan(courses)
+        assert "course_subject_created_idx" in courses.explain()
+
+    def test_catalog_by_subject_tree(self):
+        """A subject's subtree is one range of the path index."""
+        courses = Course.objects.with_module_count().in_subject(self.subject)
+        plan = courses.explain()
+        assert "subject_path_idx (path>? AND path<?)" in plan, plan
+        assert "SCAN" not in plan, plan
+
+    def test_subject_list(self):
+        """The subject sidebar walks the path index."""
+        subjects = Subject.objects.order_by("path")
+        self.assertIndexedPlan(subjects, allow_index_scan=True)
+
+    def test_owner_courses(self):
+        """An instructor's courses use the (owner, -created) index."""
+        courses = Course.objects.filter(owner=self.owner)
+        self.assertIndexedPlan(courses)
+        assert "course_owner_created_idx" in courses.explain()
+
+    def test_course_outline(self):
+        """A course's modules use the (course, order) index."""
+        self.assertIndexedPlan(self.course.modules.all())
+        assert "module_course_order_idx" in self.course.modules.explain()
+
+    def test_module_content_list(self):
+        """A module's contents use the (module, order) index."""
+        self.assertIndexedPlan(self.module.contents.all())
+        assert "content_module_order_idx" in self.module.contents.explain()
+
+    def test_reorder(self):
+        """The reorder endpoints look rows up by primary key."""
+        self.assertIndexedPlan(
+            Module.objects.filter(id=self.module.id, course__owner=self.owner)
+        )
+        self.assertIndexedPlan(
+            Content.objects.filter(
+                id=self.content.id, module__course__owner=self.owner
+            )
+        )
+
+    def test_generic_item_lookup(self):
+        """Finding the content of an item uses the (content_type, object_id) index."""
+        contents = Content.objects.filter(
+            content_type=ContentType.objects.get_for_model(Text),
+            object_id=self.content.object_id,
+        ).order_by()
+        self.assertIndexedPlan(contents)
+        assert "content_item_idx" in contents.explain()
+
+
+class FastSerializerTest(TestCase):
+    """The fast-path serializers must render byte-identical JSON."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create courses across subjects, one without modules."""
+        owner = User.objects.create(username="owner")
+        for subject_index in range(2):
+            subject = Subject.objects.create(
+                title=f"Subject {subject_index}", slug=f"s{subject_index}"
+            )
+            for course_index in range(3):
+                course = Course.objects.create(
+                    owner=owner,
+                    subject=subject,
+                    title=f"Course \u00e9 {course_index}",
+                    slug=f"c{subject_index}-{course_index}",
+                    overview='Line one\nLine "two"',
+                )
+                for module_index in range(course_index):
+                    Module.objects.create(
+                        course=course,
+                        title=f"Module {module_index}",
+                        description="<b>bold</b>",
+                    )
+        first, *others = Course.objects.order_by("pk")
+        CourseRecommendation.objects.bulk_create(
+            CourseRecommendation(
+                course=first, recommended=other, rank=rank, score=1
+            )
+            for rank, other in enumerate(reversed(others[:3]))
+        )
+
+    def assertSameJSON(
+        self, serializer_class, fast_class, queryset, **selection
+    ):  # pylint: disable=invalid-name
+        """Compare the DRF and fast renditions of ``queryset``."""
+        renderer = JSONRenderer()
+        expected = renderer.render(
+            serializer_class(queryset, many=True, **selection).data
+        )
+        actual = renderer.render(fast_class(**selection).serialize(queryset))
+        assert actual == expected
+
+    def test_subjects(self):
+        """Subjects render identically."""
+        self.assertSameJSON(
+            SubjectSerializer, FastSubjectSerializer, Subject.objects.all()
+        )
+
+    def test_modules(self):
+        """Modules render identically."""
+        self.assertSameJSON(
+            ModuleSerializer, FastModuleSerializer, Module.objects.all()
+        )
+
+    def test_courses(self):
+        """Courses, with their nested modules, render identically."""
+        self.assertSameJSON(
+            CourseSerializer, FastCourseSerializer, Course.objects.all()
+        )
+
+    def test_courses_with_selection(self):
+        """``fields`` and ``expand`` prune both renditions the same way."""
+        for fields, expand in [
+            ("id,title", None),
+            ("id,modules.title", None),
+            (None, ""),
+            ("created,modules", "modules"),
+            ("id,recommended", "modules"),
+        ]:
+            self.assertSameJSON(
+                CourseSerializer,
+                FastCourseSerializer,
+                Course.objects.filter(subject__slug="s1"),
+                fields=parse_paths(fields),
+                expand=parse_paths(expand),
+            )
+
+    def test_course_list_endpoint(self):
+        """The course list endpoint serves the fast rendition."""
+        response = self.client.get("/api/courses/")
+        expected = JSONRenderer().render(
+            CourseSerializer(Course.objects.all(), many=True).data
+        )
+        assert response.content == expected
+
+
+@override_settings(VIDEO_EMBED_RESOLVER="courses.embeds.LocalResolver")
+class QuerySelectionTest(TestCase):
+    """Unrequested relations are neither serialized nor fetched."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create two courses with modules of texts and videos."""
+        owner = User.objects.create(username="owner")
+        subject = Subject.objects.create(title="Music", slug="music")
+        for slug in ("tabla", "sitar"):
+            course = Course.objects.create(
+                owner=owner, subject=subject, title=slug, slug=slug
+            )
+            for module_index in range(2):
+                module = Module.objects.create(
+                    course=course, title=f"Module {module_index}"
+                )
+                for item in (
+                    Text.objects.create(
+                        owner=owner, title="Bols", content="dha"
+                    ),
+                    Video.objects.create(
+                        owner=owner,
+                        title="Intro",
+                        url="https://youtu.be/dQw4w9WgXcQ",
+                    ),
+                ):
+                    Content.objects.create(module=module, item=item)
+        ContentType.objects.get_for_models(Text, Video)
+
+    def serialize(self, queries, fields=None, expand=None):
+        """Serialize the courses in ``queries`` queries, return the first."""
+        selection = {
+            "fields": parse_paths(fields),
+            "expand": parse_paths(expand),
+        }
+        queryset = optimize_queryset(
+            Course.objects.order_by("pk"),
+            CourseWithContentSerializer(**selection),
+        )
+        with self.assertNumQueries(queries):
+            courses = list(queryset)
+            data = CourseWithContentSerializer(
+                courses, many=True, **selection
+            ).data
+        return courses[0], data[0]
+
+    def test_scalar_fields(self):
+        """Only the selected columns are loaded, in one query."""
+        course, data = self.serialize(1, fields="id,title")
+        assert set(data) == {"id", "title"}
+        assert {"overview", "slug"} <= course.get_deferred_fields()
+
+    def test_collapsed_relations(self):
+        """Relations that are not expanded are not prefetched."""
+        _, data = self.serialize(2, expand="modules")
+        assert "contents" not in data["modules"][0]
+        _, data = self.serialize(3, fields="modules.contents.order")
+        assert data == {
+            "modules": [{"contents": [{"order": 0}, {"order": 1}]}] * 2
+        }
+
+    def test_everything(self):
+        """The full document costs one query per relation and item type."""
+        # courses, modules, contents, texts and videos
+        course, data = self.serialize(5)
+        assert data == CourseWithContentSerializer(course).data
+        assert [len(module["contents"]) for module in data["modules"]] == [2, 2]
+
+
+@override_settings(VIDEO_EMBED_RESOLVER="courses.embeds.LocalResolver")
+class VideoEmbedTest(TestCase):
+    """Videos are resolved when saved and rendered from the stored fields."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create the videos' owner."""
+        cls.owner = User.objects.create(username="owner")
+
+    def create(self, url):
+        """Create a video of ``url``."""
+        return Video.objects.create(owner=self.owner, title="Intro", url=url)
+
+    def test_youtube(self):
+        """Watch, short and shortened URLs give the same player."""
+        for url in (
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42",
+            "https://youtu.be/dQw4w9WgXcQ",
+            "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+        ):
+            video = self.create(url)
+            assert video.provider == "youtube"
+            assert (
+                video.embed_url == "https://www.youtube.com/embed/dQw4w9WgXcQ"
+            )
+            assert video.thumbnail_url.endswith("/dQw4w9WgXcQ/hqdefault.jpg")
+
+    def test_vimeo(self):
+        """Vimeo URLs give a Vimeo player."""
+        video = self.create("https://vimeo.com/76979871")
+        assert video.provider == "vimeo"
+        assert video.embed_url == "https://player.vimeo.com/video/76979871"
+
+    def test_unknown_provider_renders_a_link(self):
+        """Unknown URLs are rendered as links."""
+        video = self.create("https://example.com/intro.mp4")
+        assert video.embed_url == ""
+        assert 'href="https://example.com/intro.mp4"' in video.render()
+
+    def test_resolved_once(self):
+        """Saves resolve again only when the URL changes."""
+        video = Video.objects.get(
+            pk=self.create("https://youtu.be/dQw4w9WgXcQ").pk
+        )
+        with mock.patch("courses.models.resolve_embed") as resolve:
+            video.title = "Renamed"
+            video.save()
+            assert not resolve.called
+            html = video.render()
+        assert 'src="https://www.youtube.com/embed/dQw4w9WgXcQ"' in html
+        video.url = "https://vimeo.com/76979871"
+        video.save()
+        assert video.provider == "vimeo"
+
+    @override_settings(VIDEO_EMBED_RESOLVER="courses.embeds.OEmbedResolver")
+    def test_provider_unreachable(self):
+        """Provider failures fall back to the local resolution."""
+        for error in (
+            ConnectionResetError(104, "Connection reset by peer"),
+            http.client.RemoteDisconnected("closed"),
+            http.client.IncompleteRead(b""),
+        ):
+            with mock.patch("urllib.request.urlopen", side_effect=error):
+                video = self.create("https://youtu.be/dQw4w9WgXcQ")
+            assert (
+                video.embed_url == "https://www.youtube.com/embed/dQw4w9WgXcQ"
+            )
+            assert 'src="https://www.youtube.com/embed/' in video.render()
+
+
+@override_settings(RESUMABLE_UPLOAD_CHUNK_SIZE=4)
+class ResumableUploadTest(TestCase):
+    """Chunked uploads resume at the stored offset and end as File items."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a module of the uploading instructor."""
+        cls.owner = User.objects.create(username="owner")
+        subject = Subject.objects.create(title="Music", slug="music")
+        course = Course.objects.create(
+            owner=cls.owner, subject=subject, title="Tabla", slug="tabla"
+        )
+        cls.module = Module.objects.create(course=course, title="Basics")
+
+    def setUp(self):
+        """Keep partial and uploaded files in a temporary directory."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(
+            MEDIA_ROOT=directory.name,
+            RESUMABLE_UPLOAD_DIR=f"{directory.name}/uploads",
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client.force_login(self.owner)
+
+    def create(self, length):
+        """Start an upload of ``length`` bytes and return its URL."""
+        filename = base64.b64encode(b"lesson.txt").decode()
+        response = self.client.post(
+            f"/course/module/{self.module.pk}/uploads/",
+            headers={
+                "Upload-Length": str(length),
+                "Upload-Metadata": f"filename {filename}",
+            },
+        )
+        assert response.status_code == 201
+        return response["Location"]
+
+    def patch(self, url, offset, chunk, **headers):
+        """Send ``chunk`` at ``offset`` with the extra ``headers``."""
+        return self.client.generic(
+            "PATCH",
+            url,
+            chunk,
+            content_type="application/offset+octet-stream",
+            headers={"Upload-Offset": str(offset), **headers},
+        )
+
+    def test_upload(self):
+        """Chunks are appended in order and the last one creates the item."""
+        url = self.create(10)
+        assert self.patch(url, 0, b"dha ")["Upload-Offset"] == "4"
+        assert self.patch(url, 0, b"dha ").status_code == 409
+        assert self.patch(url, 4, b"dhin ").status_code == 413
+        checksum = base64.b64encode(hashlib.sha256(b"x").digest()).decode()
+        response = self.patch(
+            url, 4, b"dhin", **{"Upload-Checksum": f"sha256 {checksum}"}
+        )
+        assert response.status_code == 460
+        assert self.client.head(url)["Upload-Offset"] == "4"
+        assert self.patch(url, 4, b"dhin")["Upload-Offset"] == "8"
+        response = self.patch(url, 8, b"na")
+        assert response.status_code == 204
+        item = File.objects.get()
+        assert item.file.read() == b"dha dhinna"
+        assert self.module.contents.get().item == item
+        assert not Upload.objects.exists()
+
+    def test_abort(self):
+        """Deleted uploads are gone for good."""
+        url = self.create(10)
+        assert self.client.delete(url).status_code == 204
+        assert self.client.head(url).status_code == 404
+
+    def test_locked(self):
+        """Chunks sent while another is being written get a 423."""
+        url = self.create(10)
+        upload = Upload.objects.get()
+        with uploads._locked(uploads.part_path(upload)):  # pylint: disable=protected-access
+            assert self.patch(url, 0, b"dha ").status_code == 423
+        assert self.patch(url, 0, b"dha ")["Upload-Offset"] == "4"
+
+    def test_windows_lock(self):
+        """Without fcntl, chunks are serialized with msvcrt byte locks."""
+        msvcrt = mock.Mock(LK_NBLCK=2, LK_UNLCK=0)
+        url = self.create(10)
+        with mock.patch.dict(sys.modules, {"fcntl": None, "msvcrt": msvcrt}):
+            assert self.patch(url, 0, b"dha ")["Upload-Offset"] == "4"
+            assert [
+                call.args[1:] for call in msvcrt.locking.call_args_list
+            ] == [
+                (2, 1),
+                (0, 1),
+            ]
+            msvcrt.locking.side_effect = PermissionError(13, "locked")
+            assert self.patch(url, 4, b"dhin").status_code == 423
+
+
+class CourseExportTest(TestCase):
+    """Enrolled students download the course as a cached ZIP package."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a course with a text and a file, and an enrolled student."""
+        cls.owner = User.objects.create(username="owner")
+        cls.student = User.objects.create(username="student")
+        subject = Subject.objects.create(title="Music", slug="music")
+        cls.course = Course.objects.create(
+            owner=cls.owner, subject=subject, title="Tabla", slug="tabla"
+        )
+        cls.course.students.add(cls.student)
+        cls.module = Module.objects.create(course=cls.course, title="Basics")
+        cls.text = Text.objects.create(
+            owner=cls.owner, title="Bols", content="dha dhin"
+        )
+        Content.objects.create(module=cls.module, item=cls.text)
+        cls.url = f"/students/courses/{cls.course.pk}/download/"
+
+    def setUp(self):
+        """Keep media files and packages in a temporary directory."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(
+            MEDIA_ROOT=directory.name,
+            EXPORT_CACHE_DIR=f"{directory.name}/exports",
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        item = File(owner=self.owner, title="Notes")
+        item.file.save("notes.txt", ContentFile(b"na tin"))
+        Content.objects.create(module=self.module, item=item)
+        self.client.force_login(self.student)
+
+    def download(self):
+        """Download the package and return the response and the archive."""
+        response = self.client.get(self.url)
+        assert response.status_code == 200
+        data = b"".join(response.streaming_content)
+        return response, zipfile.ZipFile(io.BytesIO(data))
+
+    def test_package(self):
+        """Packages hold the module pages, the files and a manifest."""
+        response, archive = self.download()
+        assert response["Content-Disposition"].endswith('filename="tabla.zip"')
+        page = archive.read("module-01.html").decode()
+        assert "dha dhin" in page
+        assert 'href="files/notes.txt"' in page
+        assert archive.read("files/notes.txt") == b"na tin"
+        manifest = json.loads(archive.read("manifest.json"))
+        assert [item["title"] for item in manifest["modules"][0]["items"]] == [
+            "Bols",
+            "Notes",
+        ]
+
+    def test_cached_until_the_course_changes(self):
+        """Repeat downloads send the cached file until an item changes."""
+        first, _ = self.download()
+        assert not isinstance(first, FileResponse)
+        cached, _ = self.download()
+        assert isinstance(cached, FileResponse)
+        self.text.content = "ta tete"
+        self.text.save()
+        rebuilt, archive = self.download()
+        assert not isinstance(rebuilt, FileResponse)
+        assert "ta tete" in archive.read("module-01.html").decode()
+
+    def test_enrolled_only(self):
+        """Students not enrolled in the course get a 404."""
+        self.client.force_login(self.owner)
+        assert self.client.get(self.url).status_code == 404
+
+
+class SubjectTreeTest(TestCase):
+    """Subjects nest, and list and count the courses of their subtree."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create Programming > Python > Django and a course in each."""
+        cls.owner = User.objects.create(username="owner")
+        cls.programming = Subject.objects.create(
+            title="Programming", slug="programming"
+        )
+        cls.python = Subject.objects.create(
+            title="Python", slug="python", parent=cls.programming
+        )
+        cls.django = Subject.objects.create(
+            title="Django", slug="django", parent=cls.python
+        )
+        cls.music = Subject.objects.create(title="Music", slug="music")
+        for subject in (cls.programming, cls.python, cls.django):
+            Course.objects.create(
+                owner=cls.owner,
+                subject=subject,
+                title=subject.title,
+                slug=f"{subject.slug}-course",
+            )
+
+    def totals(self):
+        """Return the stored course total of each subject, by slug."""
+        return dict(Subject.objects.values_list("slug", "course_total"))
+
+    def test_subtree(self):
+        """Subtrees and totals cover the descendants."""
+        assert self.django.ancestor_ids == [
+            self.programming.pk,
+            self.python.pk,
+        ]
+        assert set(Subject.objects.subtree(self.python)) == {
+            self.python,
+            self.django,
+        }
+        assert Course.objects.in_subject(self.python).count() == 2
+        assert self.totals() == {
+            "programming": 3,
+            "python": 2,
+            "django": 1,
+            "music": 0,
+        }
+
+    def test_move(self):
+        """Moving a subject moves its subtree and its courses' totals."""
+        self.python.move_to(self.music)
+        self.django.refresh_from_db()
+        assert self.django.path.startswith(self.music.path)
+        assert list(Subject.objects.ancestors(self.django)) == [
+            self.music,
+            self.python,
+        ]
+        assert self.totals()["programming"] == 1
+        assert self.totals()["music"] == 2
+        with self.assertRaisesMessage(ValueError, "under itself"):
+            self.music.move_to(self.django)
+
+    def test_course_changes(self):
+        """Totals follow the courses moved and deleted."""
+        course = Course.objects.get(slug="django-course")
+        course.subject = self.music
+        course.save()
+        assert self.totals()["python"] == 1
+        assert self.totals()["music"] == 1
+        course.delete()
+        assert self.totals()["music"] == 0
+
+    def test_catalog(self):
+        """A subject's page lists the courses of its whole subtree."""
+        response = self.client.get("/course/subject/python/")
+        titles = {course.title for course in response.context["courses"]}
+        assert titles == {"Python", "Django"}
+
+
+class PrerequisiteTest(TestCase):
+    """Prerequisites gate enrollment through their transitive closure."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create basics <- scales <- ragas, and improvisation requiring both."""
+        owner = User.objects.create(username="owner")
+        cls.student = User.objects.create_user("student", password="secret")
+        subject = Subject.objects.create(title="Music", slug="music")
+        cls.basics, cls.scales, cls.ragas, cls.improvisation = [
+            Course.objects.create(
+                owner=owner, subject=subject, title=title, slug=title.lower()
+            )
+            for title in ("Basics", "Scales", "Ragas", "Improvisation")
+        ]
+        for course, required in [
+            (cls.scales, cls.basics),
+            (cls.ragas, cls.scales),
+            (cls.improvisation, cls.ragas),
+            (cls.improvisation, cls.basics),
+        ]:
+            Prerequisite.objects.create(course=course, required=required)
+
+    def closure(self):
+        """Return the closure as ``{(course slug, required slug): paths}``."""
+        rows = PrerequisiteClosure.objects.values_list(
+            "course__slug", "required__slug", "paths"
+        )
+        return {(course, required): paths for course, required, paths in rows}
+
+    def test_closure(self):
+        """The closure counts every chain and follows removed edges."""
+        closure = self.closure()
+        assert closure[("ragas", "basics")] == 1
+        assert closure[("improvisation", "basics")] == 2
+        assert len(closure) == 6
+        Prerequisite.objects.get(course=self.ragas).delete()
+        assert self.closure() == {
+            ("scales", "basics"): 1,
+            ("improvisation", "ragas"): 1,
+            ("improvisation", "basics"): 1,
+        }
+        self.scales.delete()
+        assert set(self.closure()) == {
+            ("improvisation", "ragas"),
+            ("improvisation", "basics"),
+        }
+
+    def test_cycles(self):
+        """Edges closing a cycle are refused."""
+        edge = Prerequisite(course=self.basics, required=self.ragas)
+        with self.assertRaisesMessage(ValidationError, "cycle"):
+            edge.full_clean()
+        with self.assertRaisesMessage(ValueError, "cycle"):
+            edge.save()
+        assert len(self.closure()) == 6
+
+    def test_reversed_edge(self):
+        """An edge can be turned around unless other chains close the loop."""
+        # improvisation also requires basics through ragas and scales
+        edge = Prerequisite.objects.get(
+            course=self.improvisation, required=self.basics
+        )
+        edge.course, edge.required = self.basics, self.improvisation
+        with self.assertRaisesMessage(ValidationError, "cycle"):
+            edge.full_clean()
+        with self.assertRaisesMessage(ValueError, "cycle"):
+            edge.save()
+        assert len(self.closure()) == 6
+        edge = Prerequisite.objects.get(course=self.scales)
+        edge.course, edge.required = self.basics, self.scales
+        edge.full_clean()
+        edge.save()
+        assert self.closure() == {
+            ("basics", "scales"): 1,
+            ("ragas", "scales"): 1,
+            ("improvisation", "ragas"): 1,
+            ("improvisation", "basics"): 1,
+            ("improvisation", "scales"): 2,
+        }
+
+    def test_enrollment(self):
+        """Students enroll once every prerequisite is completed."""
+        missing = Course.objects.missing_prerequisites(self.ragas, self.student)
+        assert set(missing) == {self.basics, self.scales}
+        assert set(Course.objects.unlocked_for(self.student)) == {self.basics}
+        credentials = base64.b64encode(b"student:secret").decode()
+        headers = {"Authorization": f"Basic {credentials}"}
+        url = f"/api/courses/{self.scales.pk}/enroll/"
+        response = self.client.post(url, headers=headers)
+        assert response.status_code == 403
+        assert response.json()["missing_prerequisites"] == [self.basics.pk]
+        CourseCompletion.objects.create(user=self.student, course=self.basics)
+        response = self.client.post(url, headers=headers)
+        assert response.json() == {"enrolled": True}
+        response = self.client.get("/api/courses/unlocked/", headers=headers)
+        assert [course["slug"] for course in response.json()] == [
+            "scales",
+            "basics",
+        ]
+
+    def test_enroll_and_complete_views(self):
+        """The course page lists what is missing, completing unlocks it."""
+        self.client.force_login(self.student)
+        self.basics.students.add(self.student)
+        response = self.client.get("/course/scales/")
+        assert response.context["missing_prerequisites"] == [self.basics]
+        enroll = {"course": self.scales.pk}
+        response = self.client.post("/students/enroll-course/", enroll)
+        assert response.url == "/course/scales/"
+        assert not self.scales.students.filter(pk=self.student.pk).exists()
+        module = Module.objects.create(course=self.basics, title="Bols")
+        self.client.get(f"/students/courses/{self.basics.pk}/{module.pk}")
+        self.client.post(f"/students/courses/{self.basics.pk}/complete/")
+        response = self.client.post("/students/enroll-course/", enroll)
+        assert response.url == f"/students/coursjes/{self.scales.pk}/"
+        assert self.scales.students.filter(pk=self.student.pk).exists()
+
+    def test_completion_needs_views(self):
+        """A fresh enrollee cannot complete a course to unlock the next one."""
+        self.client.force_login(self.student)
+        first, second = [
+            Module.objects.create(course=self.basics, title=title)
+            for title in ("Bols", "Thekas")
+        ]
+        self.client.post("/students/enroll-course/", {"course": self.basics.pk})
+        complete = f"/students/courses/{self.basics.pk}/complete/"
+        self.client.post(complete)
+        self.client.get(f"/students/courses/{self.basics.pk}/{first.pk}")
+        self.client.post(complete)
+        assert not CourseCompletion.objects.filter(user=self.student).exists()
+        response = self.client.post(
+            "/students/enroll-course/", {"course": self.scales.pk}
+        )
+        assert response.url == "/course/scales/"
+        response = self.client.get(
+            f"/students/courses/{self.basics.pk}/{second.pk}"
+        )
+        assert response.context["modules_left"] == 0
+        self.client.post(complete)
+        assert CourseCompletion.objects.filter(
+            user=self.student, course=self.basics
+        ).exists()
+
+
+class RecommendationTest(TestCase):
+    """Courses recommend the courses their students also took."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create four courses and students who took several of them."""
+        owner = User.objects.create(username="owner")
+        subject = Subject.objects.create(title="Music", slug="music")
+        cls.tabla, cls.sitar, cls.veena, cls.flute = [
+            Course.objects.create(
+                owner=owner, subject=subject, title=title, slug=title.lower()
+            )
+            for title in ("Tabla", "Sitar", "Veena", "Flute")
+        ]
+        students = [
+            User.objects.create(username=f"student{index}")
+            for index in range(4)
+        ]
+        # tabla shares 2 students with sitar, 1 with veena, none with flute
+        cls.tabla.students.add(*students[:3])
+        cls.sitar.students.add(*students[:2])
+        cls.veena.students.add(students[2], students[3])
+        cls.flute.students.add(students[3])
+
+    def test_refresh(self):
+        """Recommendations are ranked by the cosine of shared students."""
+        recommendations.refresh([self.tabla.pk], top_k=5)
+        assert list(Course.objects.recommended_for(self.tabla)) == [
+            self.sitar,
+            self.veena,
+        ]
+        scores = self.tabla.recommendations.values_list("score", flat=True)
+        assert [round(score, 3) for score in scores] == [0.816, 0.408]
+        recommendations.refresh([self.tabla.pk], top_k=1)
+        assert self.tabla.recommendations.count() == 1
+
+    def test_enrollment_marks_stale(self):
+        """Enrollments from either side mark the course for a refresh."""
+        StaleRecommendations.objects.all().delete()
+        student = User.objects.create(username="newcomer")
+        self.flute.students.add(student)
+        student.courses_joined.add(self.tabla)
+        stale = StaleRecommendations.objects.values_list("pk", flat=True)
+        assert set(stale) == {self.flute.pk, self.tabla.pk}
+        assert recommendations.refresh_stale() == 2
+        assert not StaleRecommendations.objects.exists()
+        assert list(Course.objects.recommended_for(self.flute)) == [
+            self.veena,
+            self.tabla,
+        ]
+
+    def test_served(self):
+        """The detail page and the API show the stored recommendations."""
+        recommendations.rebuild()
+        response = self.client.get(f"/course/{self.tabla.slug}/")
+        assert "Students also took" in response.content.decode()
+        assert response.context["related_courses"][0] == self.sitar
+        response = self.client.get(f"/api/courses/{self.tabla.pk}/")
+        assert response.json()["recommended"] == [self.sitar.pk, self.veena.pk]
+
+
+class ProfilingTest(TestCase):
+    """Requests are profiled on demand only."""
+
+    def setUp(self):
+        """Keep the profiles in a temporary directory."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(PROFILING_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.staff = User.objects.create(username="staff", is_staff=True)
+
+    def test_token(self):
+        """Signed tokens profile the request, tagged with its URL name."""
+        self.client.get("/", headers={"X-Profile": "forged"})
+        assert profiling.list_profiles() == []
+        self.client.get(
+            "/", headers={"X-Profile": profiling.make_token("cprofile")}
+        )
+        [profile] = profiling.list_profiles()
+        assert profile["url_name"] == "course_list"
+        assert profile["mode"] == "cprofile"
+
+    def test_staff_flag(self):
+        """Only staff users can profile with the query flag."""
+        self.client.get("/?_profile=1")
+        assert profiling.list_profiles() == []
+        self.client.force_login(self.staff)
+        self.client.get("/?_profile=1")
+        [profile] = profiling.list_profiles()
+        assert profile["name"].endswith(".collapsed")
+        response = self.client.get("/course/profiles/")
+        assert profile["name"] in response.content.decode()
+
+    def test_listing_is_staff_only(self):
+        """Other users cannot list or download the profiles."""
+        self.client.force_login(User.objects.create(username="student"))
+        assert self.client.get("/course/profiles/").status_code == 403
+
+
+class StartupTest(TestCase):
+    """Workers boot within their budget and can be warmed up."""
+
+    # modules imported to set up the apps (about 600), with room to grow
+    MODULE_BUDGET = 750
+
+    def test_report(self):
+        """The start-up is profiled phase by phase and import by import."""
+        report = startup.profile_startup()
+        phases = report["phases"]
+        assert set(phases) == {"import", "setup", "total"}
+        assert phases["total"] >= phases["import"] + phases["setup"] > 0
+        assert report["loaded"] == []
+        for module, own, cumulative, depth in report["imports"]:
+            assert isinstance(module, str)
+            assert 0 <= own <= cumulative
+            assert depth >= 0
+        modules = {row[0] for row in report["imports"]}
+        assert "django.db.models" in modules
+        assert modules.isdisjoint(startup.DEFERRED_MODULES)
+
+    def test_budget(self):
+        """Booting imports a bounded number of modules.
+
+        The module count is the same on every run, unlike wall-clock times;
+        ``KALAKAR_STARTUP_BUDGET`` (seconds) adds a timing check on machines
+        quiet enough for one.
+        """
+        report = startup.profile_startup()
+        assert len(report["imports"]) <= self.MODULE_BUDGET
+        budget = os.environ.get("KALAKAR_STARTUP_BUDGET")
+        if budget:
+            phases = report["phases"]
+            assert phases["import"] + phases["setup"] < float(budget), phases
+
+    def test_warm_up(self):
+        """The warm-up compiles the project templates ahead of requests."""
+        # closing would break the test transaction
+        with mock.patch("django.db.connections.close_all") as close_all:
+            timings = startup.warm_up()
+        close_all.assert_called_once()
+        assert set(timings) == {"urls", "templates", "content_types"}
+        [loader] = engines["django"].engine.template_loaders
+        names = {
+            template.origin.template_name
+            for template in loader.get_template_cache.values()
+            if hasattr(template, "origin")
+        }
+        assert "courses/course/list.html" in names
+        assert "students/student/detail.html" in names
+
+
+class MicrobenchmarkTest(TestCase):
+    """The microbenchmarks run, save a baseline and catch regressions."""
+
+    def run_cases(self, **options):
+        """Run two cases once on tiny data."""
+        defaults = {
+            "sizes": "2,3",
+            "only": ["order_field.*", "permission.*"],
+            "repeat": 1,
+            "min_time": 0,
+            "save": None,
+            "compare": None,
+            "threshold": 0.25,
+        }
+        return micro.run(**{**defaults, **options})
+
+    def test_baseline(self):
+        """Saved results compare to themselves, slower ones fail."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = f"{directory}/baseline.json"
+            rows = self.run_cases(save=path)
+            assert [(row["case"], row["size"]) for row in rows] == [
+                ("order_field.pre_save", 2),
+                ("order_field.pre_save", 3),
+                ("permission.is_enrolled", 2),
+                ("permission.is_enrolled", 3),
+            ]
+            with open(path, encoding="utf-8") as baseline:
+                saved = json.load(baseline)
+        assert set(saved["results"]) == {
+            "order_field.pre_save@2",
+            "order_field.pre_save@3",
+            "permission.is_enrolled@2",
+            "permission.is_enrolled@3",
+        }
+        micro.check(micro.compare_rows(rows, saved, 0.25), 0.25)
+        faster = {key: value / 10 for key, value in saved["results"].items()}
+        regressions = micro.compare_rows(rows, {"results": faster}, 0.25)
+        assert len(regressions) == 4
+        with self.assertRaisesMessage(CommandError, "4 case(s) regressed"):
+            micro.check(rows, 0.25)
+
+    def test_unknown_case(self):
+        """A pattern matching no case is an error."""
+        with self.assertRaisesMessage(CommandError, "No case matches"):
+            self.run_cases(only=["nothing.*"])
+
+
+class StaticExportTest(TestCase):
+    """The public pages export to static files, the changed ones only."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create two subjects and a course in each."""
+        owner = User.objects.create(username="owner")
+        music = Subject.objects.create(title="Music", slug="music")
+        dance = Subject.objects.create(title="Dance", slug="dance")
+        cls.tabla = Course.objects.create(
+            owner=owner, subject=music, title="Tabla", slug="tabla"
+        )
+        Course.objects.create(
+            owner=owner, subject=dance, title="Kathak", slug="kathak"
+        )
+
+    def setUp(self):
+        """Export into a temporary directory."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.output = directory.name
+
+    def export(self, **options):
+        """Export in this process and return the counts."""
+        return staticsite.export(self.output, "http://testserver", **options)
+
+    def test_export(self):
+        """Pages are written once, and again only when their data changes."""
+        counts = self.export()
+        assert counts["pages"] == counts["rendered"] == counts["written"] == 5
+        assert counts["failed"] == 0
+        page = staticsite.output_file(self.output, "/course/tabla/")
+        assert "Tabla" in page.read_text()
+        assert staticsite.output_file(self.output, "/").exists()
+        assert self.export()["rendered"] == 0
+
+        self.tabla.title = "Tabla Basics"
+        self.tabla.save()
+        counts = self.export()
+        # the course, its subject and the catalog
+        assert counts["rendered"] == counts["written"] == 3
+        assert "Tabla Basics" in page.read_text()
+        assert self.export(force=True)["written"] == 0
+
+        self.tabla.delete()
+        counts = self.export()
+        assert counts["removed"] == 1
+        assert not page.exists()
+
+    @override_settings(STATIC_EXPORT_SITEMAP_SIZE=2)
+    def test_sitemaps(self):
+        """The sitemap index points at sitemaps of a bounded size."""
+        assert self.export()["sitemaps"] == 3
+        index = Path(self.output, "sitemap.xml").read_text()
+        assert index.count("<sitemap>") == 3
+        assert "http://testserver/sitemap-3.xml" in index
+        urls = re.findall(
+            r"<loc>(.*?)</loc>", Path(self.output, "sitemap-1.xml").read_text()
+        )
+        assert urls == [
+            "http://testserver/",
+            "http://testserver/course/subject/music/",
+        ]
+        Course.objects.filter(slug="kathak").delete()
+        assert self.export()["sitemaps"] == 2
+        assert not Path(self.output, "sitemap-3.xml").exists()
+
+
+@skipUnless(
+    multiprocessing.get_start_method() == "fork",
+    "spawned workers cannot see the in-memory test database",
+)
+class StaticExportWorkersTest(TransactionTestCase):
+    """Worker processes render the same pages as the exporting one.
+
+    A ``TransactionTestCase``: the workers only see committed rows.
+    """
+
+    def setUp(self):
+        """Create a course and export into a temporary directory."""
+        owner = User.objects.create(username="owner")
+        music = Subject.objects.create(title="Music", slug="music")
+        Course.objects.create(
+            owner=owner, subject=music, title="Tabla", slug="tabla"
+        )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.output = directory.name
+
+    def test_pool(self):
+        """Pages rendered by a pool of two workers match in-process ones."""
+        with mock.patch.object(
+            staticsite.multiprocessing, "Pool", wraps=multiprocessing.Pool
+        ) as pool:
+            counts = staticsite.export(
+                self.output, "http://testserver", workers=2
+            )
+        assert pool.call_args.args[0] == 2
+        assert counts["pages"] == counts["written"] == 3
+        assert counts["failed"] == 0
+        pooled = {
+            path: staticsite.output_file(self.output, path).read_bytes()
+            for path in ("/", "/course/subject/music/", "/course/tabla/")
+        }
+        assert b"Tabla" in pooled["/course/tabla/"]
+        manifest = json.loads(Path(self.output, "manifest.json").read_text())
+        with tempfile.TemporaryDirectory() as inline:
+            staticsite.export(inline, "http://testserver", workers=1)
+            for path, html in pooled.items():
+                assert staticsite.output_file(inline, path).read_bytes() == html
+                sha = hashlib.sha256(html).hexdigest()
+                assert manifest["pages"][path]["sha256"] == sha
+
+
+class SharedCacheCheckTest(SimpleTestCase):
+    """Deployments must share the default cache between processes."""
+
+    def test_local_memory_refused(self):
+        """The local-memory cache is a deployment error."""
+        errors = checks.run_checks(
+            tags=[checks.Tags.caches], include_deployment_checks=True
+        )
+        assert "courses.E001" in {error.id for error in errors}
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.redis.RedisCache",
+                "LOCATION": "redis://localhost:6379/0",
+            }
+        }
+    )
+    def test_shared_accepted(self):
+        """Redis or memcached pass."""
+        assert not shared_cache_check(None)
+
+
+class ObjectCacheTest(TestCase):
+    """Cached lookups skip the database until the object changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a course with two modules."""
+        cls.owner = User.objects.create(username="owner")
+        subject = Subject.objects.create(title="Music", slug="music")
+        cls.course = Course.objects.create(
+            owner=cls.owner, subject=subject, title="Tabla", slug="tabla"
+        )
+        cls.first = Module.objects.create(course=cls.course, title="Basics")
+        cls.second = Module.objects.create(course=cls.course, title="Kaidas")
+
+    def setUp(self):
+        """Start from empty shared and local tiers."""
+        cache.clear()
+        for model in (Subject, Course, Module):
+            model.cached.local.clear()
+
+    def test_hits(self):
+        """Repeat lookups by pk or slug make no query."""
+        with self.assertNumQueries(1):
+            Course.cached.get(pk=self.course.pk)
+        with self.assertNumQueries(0):
+            assert Course.cached.get(pk=self.course.pk).title == "Tabla"
+        with self.assertNumQueries(1):
+            Course.cached.get_by_slug("tabla")
+        with self.assertNumQueries(0):
+            assert Course.cached.get(slug="tabla").pk == self.course.pk
+
+    @override_settings(OBJECT_CACHE_LOCAL_TTL=0)
+    def test_shared_hits(self):
+        """Expired local copies revalidate against the shared tier only."""
+        Course.cached.get(pk=self.course.pk)
+        with self.assertNumQueries(0):
+            Course.cached.get(pk=self.course.pk)
+
+    def test_save_invalidates(self):
+        """Saved objects are read again."""
+        Course.cached.get(pk=self.course.pk)
+        self.course.title = "Tabla Basics"
+        self.course.save()
+        assert Course.cached.get(pk=self.course.pk).title == "Tabla Basics"
+
+    def test_touch_invalidates(self):
+        """Bulk touches drop the cached courses."""
+        before = Course.cached.get(pk=self.course.pk).updated
+        Course.objects.filter(modules=self.first).touch()
+        assert Course.cached.get(pk=self.course.pk).updated > before
+
+    def test_reorder_invalidates(self):
+        """Reordered modules show their new position."""
+        self.client.force_login(self.owner)
+        url = f"/course/module/{self.first.pk}/"
+        assert b"Module 1: Basics" in self.client.get(url).content
+        response = self.client.post(
+            "/course/module/order/",
+            json.dumps({self.first.pk: 1, self.second.pk: 0}),
+            content_type="application/json",
+        )
+        assert response.status_code == 200
+        assert b"Module 2: Basics" in self.client.get(url).content
+
+
+class PageCacheTest(TestCase):
+    """Anonymous catalog and course pages are replayed until purged."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a course and a student."""
+        cls.owner = User.objects.create(username="owner")
+        cls.subject = Subject.objects.create(title="Music", slug="music")
+        cls.course = Course.objects.create(
+            owner=cls.owner, subject=cls.subject, title="Tabla", slug="tabla"
+        )
+        cls.student = User.objects.create(username="student")
+
+    def setUp(self):
+        """Start from an empty cache."""
+        cache.clear()
+        for model in (Subject, Course, Module):
+            model.cached.local.clear()
+
+    def test_hit_headers(self):
+        """Hits make no query and send the headers of the miss."""
+        miss = self.client.get("/course/tabla/")
+        with self.assertNumQueries(0):
+            hit = self.client.get("/course/tabla/")
+        assert hit.content == miss.content
+        for response in (miss, hit):
+            assert "public" in response["Cache-Control"]
+            assert "Cookie" in response["Vary"]
+            assert f"course-{self.course.pk}" in response["Surrogate-Key"]
+        # replayed without the middleware that would add it
+        entry = {"versions": {"catalog": 1}, "content": b"", "headers": {}}
+        assert "Cookie" in pagecache.PageCacheMixin().replay(entry)["Vary"]
+
+    def test_anonymous_only(self):
+        """Signed-in visitors get private pages, never stored."""
+        self.client.force_login(self.student)
+        response = self.client.get("/course/tabla/")
+        assert "private" in response["Cache-Control"]
+        assert b"Enroll Now" in response.content
+        self.client.logout()
+        response = self.client.get("/course/tabla/")
+        assert b"Enroll Now" not in response.content
+
+    def test_csrf_pages_skipped(self):
+        """Pages embedding a CSRF token or setting cookies are not stored."""
+        request = RequestFactory().get("/")
+        assert pagecache.is_cacheable(request, HttpResponse())
+        request.META["CSRF_COOKIE_NEEDS_UPDATE"] = True
+        assert not pagecache.is_cacheable(request, HttpResponse())
+        response = HttpResponse()
+        response.set_cookie("name", "value")
+        assert not pagecache.is_cacheable(RequestFactory().get("/"), response)
+
+    def test_purge(self):
+        """Saving a course, its subject or its modules purges its pages."""
+        self.client.get("/")
+        self.client.get("/course/tabla/")
+        self.course.title = "Tabla Basics"
+        self.course.save()
+        assert b"Tabla Basics" in self.client.get("/").content
+        self.subject.title = "Percussion"
+        self.subject.save()
+        assert (
+            b"Subject: Percussion" in self.client.get("/course/tabla/").content
+        )
+        Module.objects.create(course=self.course, title="Basics")
+        assert (
+            b"Modules Numbers: 1" in self.client.get("/course/tabla/").content
+        )
+
+    def test_purge_related(self):
+        """Renaming a recommended course purges the pages linking to it."""
+        other = Course.objects.create(
+            owner=self.owner, subject=self.subject, title="Sitar", slug="sitar"
+        )
+        CourseRecommendation.objects.create(
+            course=self.course, recommended=other, rank=0, score=1
+        )
+        assert b"/course/sitar/" in self.client.get("/course/tabla/").content
+        other.title = "Sitar Basics"
+        other.slug = "sitar-basics"
+        other.save()
+        page = self.client.get("/course/tabla/").content
+        assert b"/course/sitar-basics/" in page
+        assert b"/course/sitar/" not in page
+
+    def test_purge_prerequisites(self):
+        """Renaming a prerequisite purges the pages listing it."""
+        basics = Course.objects.create(
+            owner=self.owner, subject=self.subject, title="Bols", slug="bols"
+        )
+        Prerequisite.objects.create(course=self.course, required=basics)
+        assert b"/course/bols/" in self.client.get("/course/tabla/").content
+        basics.slug = "bols-basics"
+        basics.save()
+        page = self.client.get("/course/tabla/").content
+        assert b"/course/bols-basics/" in page
+        assert b"/course/bols/" not in page
+
+
+class CloneTest(TestCase):
+    """Courses are copied with a query count independent of their size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a course with two modules of texts and videos."""
+        cls.owner = User.objects.create(username="owner")
+        cls.subject = Subject.objects.create(title="Music", slug="music")
+        cls.course = cls.create_course("tabla", texts=1)
+
+    @classmethod
+    def create_course(cls, slug, texts):
+        """Create a course with two modules of ``texts`` texts and a video."""
+        course = Course.objects.create(
+            owner=cls.owner, subject=cls.subject, title=slug, slug=slug
+        )
+        for module_title in ("Basics", "Kaidas"):
+            module = Module.objects.create(course=course, title=module_title)
+            for number in range(texts):
+                item = Text.objects.create(
+                    owner=cls.owner,
+                    title=f"{module_title} {number}",
+                    content=f"{slug} {module_title} {number}",
+                )
+                Content.objects.create(module=module, item=item)
+            item = Video.objects.create(
+                owner=cls.owner,
+                title=f"{module_title} video",
+                url="https://example.com/video",
+            )
+            Content.objects.create(module=module, item=item)
+        return course
+
+    def outline(self, course):
+        """Return ``[(module title, order, [(item title, order)])]``."""
+        return [
+            (
+                module.title,
+                module.order,
+                [
+                    (content.item.title, content.order)
+                    for content in module.contents.all()
+                ],
+            )
+            for module in course.modules.all()
+        ]
+
+    def test_remapping(self):
+        """The copy's contents point at new items in new modules."""
+        student = User.objects.create(username="student")
+        self.course.students.add(student)
+        clone = clone_course(self.course, owner=student)
+        assert clone.slug == "tabla-2"
+        assert self.outline(clone) == self.outline(self.course)
+        assert not clone.students.exists()
+        old = Content.objects.filter(module__course=self.course)
+        new = Content.objects.filter(module__course=clone)
+        assert not {c.pk for c in old} & {c.pk for c in new}
+        assert not {(c.content_type_id, c.object_id) for c in old} & {
+            (c.content_type_id, c.object_id) for c in new
+        }
+        assert {content.item.owner for content in new} == {student}
+        item = new.get(module__order=1, order=0).item
+        assert item.content == "tabla Kaidas 0"
+
+    def test_query_count(self):
+        """A larger course takes as many queries to copy."""
+        larger = self.create_course("bayan", texts=5)
+        with CaptureQueriesContext(connection) as small:
+            clone_course(self.course)
+        with self.assertNumQueries(len(small)):
+            clone_course(larger)
+
+    def test_row_by_row(self):
+        """Backends not returning bulk-created keys insert row by row."""
+        with mock.patch.object(
+            type(connection.features),
+            "can_return_rows_from_bulk_insert",
+            new_callable=mock.PropertyMock,
+            return_value=False,
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                clone = clone_course(self.course)
+            larger = self.create_course("bayan", texts=5)
+            # four more texts in each module, and their contents
+            with self.assertNumQueries(len(queries) + 2 * 4 * 2):
+                clone_course(larger)
+        assert self.outline(clone) == self.outline(self.course)
+        old = Content.objects.filter(module__course=self.course)
+        new = Content.objects.filter(module__course=clone)
+        assert not {(c.content_type_id, c.object_id) for c in old} & {
+            (c.content_type_id, c.object_id) for c in new
+        }
+        # no signal was sent for the copied contents
+        assert not CourseUpdate.objects.filter(course=clone).exists()
+
+
+class DeletionTest(TestCase):
+    """Courses go with their items, in a bounded number of queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create an owner and a subject."""
+        cls.owner = User.objects.create(username="owner")
+        cls.subject = Subject.objects.create(title="Music", slug="music")
+
+    def setUp(self):
+        """Keep media files in a temporary directory."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(MEDIA_ROOT=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def create_course(self, slug, texts, modules=2, videos=0):
+        """Create a course of ``modules`` modules.
+
+        Each module has ``texts`` texts, ``videos`` videos and a file.
+        """
+        course = Course.objects.create(
+            owner=self.owner, subject=self.subject, title=slug, slug=slug
+        )
+        for module_number in range(modules):
+            module = Module.objects.create(
+                course=course, title=f"Module {module_number}"
+            )
+            for number in range(texts):
+                item = Text.objects.create(
+                    owner=self.owner, title=f"{number}", content="dha"
+                )
+                Content.objects.create(module=module, item=item)
+            for number in range(videos):
+                item = Video.objects.create(
+                    owner=self.owner,
+                    title=f"{number}",
+                    url="https://example.com/video",
+                )
+                Content.objects.create(module=module, item=item)
+            item = File(owner=self.owner, title="Notes")
+            item.file.save(f"{slug}.txt", ContentFile(b"na tin"))
+            Content.objects.create(module=module, item=item)
+        return course
+
+    def delete_queries(self, course):
+        """Delete ``course`` and its items, return the number of queries."""
+        with (
+            CaptureQueriesContext(connection) as queries,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            delete_course(course)
+        return len(queries)
+
+    def test_query_count(self):
+        """Larger courses take as many queries to delete."""
+        shapes = [
+            {"modules": 1, "texts": 1},
+            {"modules": 4, "texts": 1},
+            {"modules": 2, "texts": 5},
+            {"modules": 5, "texts": 3},
+        ]
+        for videos in (0, 2):
+            counts = []
+            for number, shape in enumerate(shapes):
+                with self.subTest(videos=videos, **shape):
+                    course = self.create_course(
+                        f"c{videos}-{number}", videos=videos, **shape
+                    )
+                    counts.append(self.delete_queries(course))
+            assert len(set(counts)) == 1, (videos, counts)
+            assert not Content.objects.exists()
+        assert not Text.objects.exists()
+        assert not Video.objects.exists()
+        assert not File.objects.exists()
+        assert delete_course(self.create_course("bayan", texts=5)) == 12
+
+    def test_items_after_commit(self):
+        """Items are deleted once the course deletion commits."""
+        course = self.create_course("tabla", texts=2)
+        with self.captureOnCommitCallbacks() as callbacks:
+            delete_course(course)
+        assert not Course.objects.exists()
+        assert Text.objects.count() == 4
+        assert len(callbacks) == 1
+        callbacks[0]()
+        assert not Text.objects.exists()
+
+    @override_settings(
+        DELETION_BACKGROUND_THRESHOLD=2, BACKGROUND_TASKS_EAGER=True
+    )
+    def test_background(self):
+        """Larger courses hand their items to the background queue."""
+        course = self.create_course("tabla", texts=2)
+        with mock.patch("courses.deletion.enqueue") as enqueue:
+            delete_course(course)
+        enqueue.assert_called_once()
+        func, refs = enqueue.call_args.args
+        assert func is delete_items
+        assert len(refs) == 6
+        course = self.create_course("bayan", texts=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            delete_course(course)
+        assert Text.objects.count() == 4
+
+    def test_gc_content(self):
+        """Orphaned items and unreferenced files are collected."""
+        course = self.create_course("tabla", texts=1)
+        orphan = Text.objects.create(owner=self.owner, title="Lost")
+        loose = File(owner=self.owner, title="Loose")
+        loose.file.save("loose.txt", ContentFile(b"ge"))
+        storage = loose.file.storage
+        File.objects.filter(pk=loose.pk).delete()
+        Text.objects.update(
+            created=timezone.now() - datetime.timedelta(hours=2)
+        )
+        past = (timezone.now() - datetime.timedelta(hours=2)).timestamp()
+        os.utime(storage.path(loose.file.name), (past, past))
+        output = io.StringIO()
+        call_command("gc_content", stdout=output)
+        assert "Deleted 1 orphaned text items." in output.getvalue()
+        assert not Text.objects.filter(pk=orphan.pk).exists()
+        assert not storage.exists(loose.file.name)
+        assert Content.objects.filter(module__course=course).count() == 4
+        assert storage.exists("files/tabla.txt")
+
+
+@skipUnless(connection.vendor == "sqlite", "the profile is SQLite's")
+class SQLiteProfileTest(TestCase):
+    """The production profile configures connections and routes reads."""
+
+    def test_pragmas(self):
+        """New connections get the pragmas, read aliases are query-only."""
+        with override_settings(
+            SQLITE_PRAGMAS={"cache_size": -4096, "busy_timeout": 1234},
+            DATABASE_READ_ALIASES=["read_test"],
+        ):
+            copy = connection.copy("read_test")
+            self.addCleanup(copy.close)
+            with copy.cursor() as cursor:
+                cursor.execute("PRAGMA cache_size")
+                assert cursor.fetchone()[0] == -4096
+                cursor.execute("PRAGMA busy_timeout")
+                assert cursor.fetchone()[0] == 1234
+                cursor.execute("PRAGMA query_only")
+                assert cursor.fetchone()[0] == 1
+
+    @override_settings(DATABASE_READ_ALIASES=["replica"])
+    def test_routing(self):
+        """Safe requests read from the read alias, writes stay on default."""
+        router = ReadOnlyRouter()
+        routed = []
+
+        def view(request):  # pylint: disable=unused-argument
+            routed.append(
+                (router.db_for_read(Course), router.db_for_write(Course))
+            )
+            return HttpResponse()
+
+        middleware = ReadOnlyRoutingMiddleware(view)
+        middleware(RequestFactory().get("/"))
+        middleware(RequestFactory().post("/"))
+        assert routed == [("replica", "default"), (None, "default")]
+        assert router.db_for_read(Course) is None
+
+
+@override_settings(VIDEO_EMBED_RESOLVER="courses.embeds.LocalResolver")
+class ModuleRendererTest(TestCase):
+    """Modules render in one pass, with each template resolved once."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a module of three texts and two videos."""
+        owner = User.objects.create(username="owner")
+        subject = Subject.objects.create(title="Music", slug="music")
+        course = Course.objects.create(
+            owner=owner, subject=subject, title="Tabla", slug="tabla"
+        )
+        cls.module = Module.objects.create(course=course, title="Basics")
+        for number in range(3):
+            item = Text.objects.create(
+                owner=owner, title=f"Text {number}", content=f"dha {number}"
+            )
+            Content.objects.create(module=cls.module, item=item)
+        for number in range(2):
+            item = Video.objects.create(
+                owner=owner,
+                title=f"Video {number}",
+                url=f"https://www.youtube.com/watch?v=video{number}",
+            )
+            Content.objects.create(module=cls.module, item=item)
+
+    def test_templates_resolved_once(self):
+        """Each item type's template is looked up once per renderer."""
+        renderer = ModuleRenderer()
+        with mock.patch.object(
+            renderer.engine, "get_template", wraps=renderer.engine.get_template
+        ) as get_template:
+            rendered = renderer.render_module(self.module)
+        assert get_template.call_count == 2
+        assert [row.html for row in rendered] == [
+            render_to_string(
+                f"courses/content/{row.item._meta.model_name}.html",  # pylint: disable=protected-access
+                {"item": row.item},
+            )
+            for row in rendered
+        ]
+
+    def test_query_count(self):
+        """One query for the contents and one per item type."""
+        ContentType.objects.get_for_models(Text, Video)
+        with self.assertNumQueries(3):
+            rendered = ModuleRenderer().render_module(self.module)
+        assert len(rendered) == 5
+
+
+@override_settings(VIDEO_EMBED_RESOLVER="courses.embeds.LocalResolver")
+class StreamingTest(TestCase):
+    """The ``?stream=1`` renditions match the buffered ones."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a course of two modules and an enrolled student."""
+        owner = User.objects.create(username="owner")
+        cls.student = User.objects.create_user("student", password="secret")
+        subject = Subject.objects.create(title="Music", slug="music")
+        cls.course = Course.objects.create(
+            owner=owner, subject=subject, title="Tabla", slug="tabla"
+        )
+        Course.objects.create(
+            owner=owner, subject=subject, title="Sitar", slug="sitar"
+        )
+        cls.course.students.add(cls.student)
+        for module_index in range(2):
+            module = Module.objects.create(
+                course=cls.course, title=f"Module {module_index}"
+            )
+            for number in range(3):
+                item = Text.objects.create(
+                    owner=owner, title=f"Text {number}", content="dha"
+                )
+                Content.objects.create(module=module, item=item)
+            item = Video.objects.create(
+                owner=owner,
+                title="Video",
+                url="https://www.youtube.com/watch?v=video",
+            )
+            Content.objects.create(module=module, item=item)
+        credentials = base64.b64encode(b"student:secret").decode()
+        cls.auth = {"HTTP_AUTHORIZATION": f"Basic {credentials}"}
+        cls.contents = f"/api/courses/{cls.course.pk}/contents/"
+
+    def test_contents(self):
+        """The streamed contents are the buffered JSON document."""
+        expected = self.client.get(self.contents, **self.auth).json()
+        response = self.client.get(f"{self.contents}?stream=1", **self.auth)
+        assert response.streaming
+        streamed = b"".join(response.streaming_content)
+        assert json.loads(streamed) == expected
+        assert len(expected["modules"]) == 2
+        assert len(expected["modules"][0]["contents"]) == 4
+
+    def test_selection(self):
+        """``fields`` and ``expand`` prune the stream like the buffer."""
+        for query in (
+            "fields=id,title",
+            "expand=",
+            "expand=modules",
+            "fields=modules.title",
+            "fields=title,modules.contents.order&expand=modules.contents",
+            "fields=modules.contents.item",
+        ):
+            expected = self.client.get(
+                f"{self.contents}?{query}", **self.auth
+            ).json()
+            response = self.client.get(
+                f"{self.contents}?stream=1&{query}", **self.auth
+            )
+            streamed = b"".join(response.streaming_content)
+            assert json.loads(streamed) == expected, query
+
+    def test_unselected_relations(self):
+        """Relations left out are not queried."""
+        for selection, queries in [
+            ({"fields": parse_paths("id,title")}, 0),
+            ({"expand": parse_paths("modules")}, 1),
+            ({"fields": parse_paths("modules.contents.order")}, 1 + 2),
+        ]:
+            with self.assertNumQueries(queries):
+                list(streaming.iter_course_contents(self.course, **selection))
+
+    def test_gzip(self):
+        """Gzipped streams decompress to the same document."""
+        expected = self.client.get(self.contents, **self.auth).json()
+        response = self.client.get(
+            f"{self.contents}?stream=1",
+            HTTP_ACCEPT_ENCODING="gzip, deflate",
+            **self.auth,
+        )
+        assert response["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in response["Vary"]
+        streamed = gzip.decompress(b"".join(response.streaming_content))
+        assert json.loads(streamed) == expected
+
+    def test_ndjson(self):
+        """The NDJSON list has one line per course of the buffered list."""
+        expected = self.client.get("/api/courses/").json()
+        response = self.client.get("/api/courses/?stream=1")
+        assert response["Content-Type"] == "application/x-ndjson"
+        lines = b"".join(response.streaming_content).splitlines()
+        assert [json.loads(line) for line in lines] == expected
+
+    def test_header_first(self):
+        """The course header leaves before any content is read."""
+        pieces = streaming.iter_course_contents(self.course)
+        with self.assertNumQueries(0):
+            header = next(pieces)
+        assert header.startswith(b'{"id":')
+        assert header.endswith(b',"modules":[')
+
+    def test_query_count(self):
+        """Queries grow with the modules and chunks, not with the items."""
+
+        def count(chunk_size):
+            with CaptureQueriesContext(connection) as queries:
+                list(streaming.iter_course_contents(self.course, chunk_size))
+            return len(queries)
+
+        # the modules, then per module its contents and one query per type
+        assert count(100) == 1 + 2 * 3
+        # chunks of two: two texts, then a text and a video
+        assert count(2) == 1 + 2 * (1 + 1 + 2)
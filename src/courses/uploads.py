@@ -0,0 +1,308 @@
+"""Resumable uploads of large files, modelled on the tus protocol.
+
+A lecture file is sent in chunks of at most
+``settings.RESUMABLE_UPLOAD_CHUNK_SIZE`` bytes, so a dropped connection only
+costs the chunk in flight. Each chunk is streamed to the end of a partial
+file on disk in small blocks: memory use is bounded by the block size and
+earlier chunks are never read again. The last chunk turns the partial file
+into a ``File`` item of the module, atomically.
+
+Protocol (all requests need an instructor session and, as for any unsafe
+request, the ``X-CSRFToken`` header; responses carry
+``Tus-Resumable: 1.0.0``):
+
+``POST /course/module/<module_id>/uploads/``
+    Creates an upload. Headers: ``Upload-Length`` (the total size in bytes)
+    and ``Upload-Metadata``, comma-separated ``key base64(value)`` pairs
+    where ``filename`` is required and ``title`` defaults to the file name.
+    Answers ``201 Created`` with the upload URL in ``Location``.
+
+``HEAD <upload URL>``
+    Answers ``200`` with ``Upload-Offset`` and ``Upload-Length``: resume by
+    sending the bytes from ``Upload-Offset`` on.
+
+``PATCH <upload URL>``
+    Appends a chunk. Headers: ``Content-Type:
+    application/offset+octet-stream``, ``Content-Length``, ``Upload-Offset``
+    (must equal the current offset) and optionally ``Upload-Checksum:
+    <sha1|sha256|md5> base64(digest)`` of the chunk. Answers ``204`` with the
+    new ``Upload-Offset``; the chunk completing the file also creates the
+    item, and ``Location`` then points at the module's content list.
+    Errors: ``409`` wrong offset, ``413`` chunk too large or past
+    ``Upload-Length``, ``415`` wrong content type, ``423`` another chunk is
+    being written, ``460`` checksum mismatch (the chunk is discarded).
+
+``DELETE <upload URL>``
+    Aborts the upload and removes the partial file.
+
+Uploads left idle for ``settings.RESUMABLE_UPLOAD_EXPIRY`` seconds are removed
+by ``manage.py sweep_uploads``.
+"""
+
+import base64
+import binascii
+import datetime
+import hashlib
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File as DjangoFile
+from django.db import transaction
+from django.utils import timezone
+
+from courses.models import Content, File, Upload
+
+TUS_VERSION = "1.0.0"
+
+OCTET_STREAM = "application/offset+octet-stream"
+
+BLOCK_SIZE = 64 * 1024
+
+CHECKSUM_ALGORITHMS = {
+    "sha1": hashlib.sha1,
+    "sha256": hashlib.sha256,
+    "md5": hashlib.md5,
+}
+
+
+class UploadError(Exception):
+    """A request that breaks the protocol.
+
+    Attributes:
+        status (int): The HTTP status answering the request.
+    """
+
+    def __init__(self, status, message):
+        """Create the error answered with ``status``."""
+        super().__init__(message)
+        self.status = status
+
+
+class _PartialFile(DjangoFile):
+    """A completed partial file, moved (not copied) into the storage."""
+
+    def temporary_file_path(self):
+        """Let ``FileSystemStorage`` move the file into place."""
+        return self.name
+
+
+def part_path(upload):
+    """Return the path of the partial file of ``upload``."""
+    return Path(settings.RESUMABLE_UPLOAD_DIR) / f"{upload.pk}.part"
+
+
+def parse_metadata(header):
+    """Parse an ``Upload-Metadata`` header.
+
+    Args:
+        header (str): Comma-separated ``key base64(value)`` pairs.
+
+    Returns:
+        dict: The decoded values.
+
+    Raises:
+        UploadError: The header is malformed.
+    """
+    metadata = {}
+    for pair in filter(None, (part.strip() for part in header.split(","))):
+        key, _, value = pair.partition(" ")
+        try:
+            metadata[key] = base64.b64decode(value, validate=True).decode()
+        except (binascii.Error, UnicodeDecodeError) as error:
+            raise UploadError(
+                400, f"Invalid metadata value for {key}."
+            ) from error
+    return metadata
+
+
+def parse_checksum(header):
+    """Parse an ``Upload-Checksum`` header.
+
+    Args:
+        header (str | None): ``<algorithm> base64(digest)``.
+
+    Returns:
+        tuple | None: The hash constructor and the expected digest.
+
+    Raises:
+        UploadError: The algorithm is unsupported or the digest malformed.
+    """
+    if not header:
+        return None
+    algorithm, _, digest = header.partition(" ")
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise UploadError(400, f"Unsupported checksum algorithm {algorithm}.")
+    try:
+        return CHECKSUM_ALGORITHMS[algorithm], base64.b64decode(
+            digest, validate=True
+        )
+    except binascii.Error as error:
+        raise UploadError(400, "Invalid checksum.") from error
+
+
+def create_upload(owner, module, length, metadata):
+    """Start an upload of ``length`` bytes into ``module``.
+
+    Args:
+        owner (User): The instructor uploading.
+        module (Module): The module receiving the ``File`` item.
+        length (int): The total size, in bytes.
+        metadata (dict): ``filename`` and, optionally, ``title``.
+
+    Returns:
+        Upload: The new upload.
+
+    Raises:
+        UploadError: The size or the file name is invalid.
+    """
+    if not 0 < length <= settings.RESUMABLE_UPLOAD_MAX_SIZE:
+        raise UploadError(413, "Upload-Length is out of bounds.")
+    filename = os.path.basename(metadata.get("filename", ""))
+    if not filename:
+        raise UploadError(400, "Upload-Metadata needs a filename.")
+    upload = Upload.objects.create(
+        owner=owner,
+        module=module,
+        title=metadata.get("title") or filename,
+        filename=filename,
+        length=length,
+    )
+    path = part_path(upload)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+    return upload
+
+
+@contextmanager
+def _locked(path):
+    # fcntl is POSIX-only, msvcrt Windows-only
+    try:
+        # pylint: disable-next=import-outside-toplevel
+        import fcntl
+    except ImportError:
+        fcntl = None
+    with open(path, "r+b") as part:
+        try:
+            if fcntl:
+                fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                # pylint: disable-next=import-outside-toplevel
+                import msvcrt
+
+                # the first byte stands for the file, whatever its size
+                part.seek(0)
+                msvcrt.locking(part.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError as error:
+            raise UploadError(423, "Another chunk is being written.") from error
+        try:
+            yield part
+        finally:
+            if fcntl:
+                fcntl.flock(part, fcntl.LOCK_UN)
+            else:
+                part.seek(0)
+                msvcrt.locking(part.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def append_chunk(upload, offset, stream, length, checksum=None):
+    """Append one chunk to ``upload``, finalizing it when complete.
+
+    Args:
+        upload (Upload): The upload.
+        offset (int): The ``Upload-Offset`` sent by the client.
+        stream (file-like): The request body.
+        length (int): The chunk size, from ``Content-Length``.
+        checksum (tuple, optional): The result of ``parse_checksum()``.
+
+    Returns:
+        File | None: The created item once the upload is complete.
+
+    Raises:
+        UploadError: The chunk breaks the protocol.
+    """
+    if length > settings.RESUMABLE_UPLOAD_CHUNK_SIZE:
+        raise UploadError(413, "Chunk too large.")
+    if offset + length > upload.length:
+        raise UploadError(413, "Chunk goes past Upload-Length.")
+    with _locked(part_path(upload)) as part:
+        upload.refresh_from_db(fields=["offset"])
+        if offset != upload.offset:
+            raise UploadError(409, f"Upload-Offset should be {upload.offset}.")
+        digest = checksum[0]() if checksum else None
+        part.seek(offset)
+        remaining = length
+        while remaining:
+            block = stream.read(min(BLOCK_SIZE, remaining))
+            if not block:
+                break
+            part.write(block)
+            if digest is not None:
+                digest.update(block)
+            remaining -= len(block)
+        if remaining or (digest is not None and digest.digest() != checksum[1]):
+            part.truncate(offset)
+            if remaining:
+                raise UploadError(400, "The chunk ended early.")
+            raise UploadError(460, "Checksum mismatch.")
+        part.flush()
+        os.fsync(part.fileno())
+        upload.offset = offset + length
+        upload.save(update_fields=["offset", "updated"])
+    if upload.offset == upload.length:
+        return finalize(upload)
+    return None
+
+
+@transaction.atomic
+def finalize(upload):
+    """Turn the completed upload into a ``File`` item of its module.
+
+    Args:
+        upload (Upload): A complete upload.
+
+    Returns:
+        File: The new item.
+    """
+    item = File(owner=upload.owner, title=upload.title)
+    path = part_path(upload)
+    with open(path, "rb") as part:
+        item.file.save(upload.filename, _PartialFile(part, name=str(path)))
+    Content.objects.create(module=upload.module, item=item)
+    upload.delete()
+    return item
+
+
+def abort(upload):
+    """Delete ``upload`` and its partial file."""
+    part_path(upload).unlink(missing_ok=True)
+    upload.delete()
+
+
+def sweep(now=None):
+    """Remove the uploads idle for longer than the expiry, and stray parts.
+
+    Args:
+        now (datetime, optional): The current time.
+
+    Returns:
+        int: The number of removed uploads and partial files.
+    """
+    now = now or timezone.now()
+    cutoff = now - datetime.timedelta(seconds=settings.RESUMABLE_UPLOAD_EXPIRY)
+    removed = 0
+    for upload in Upload.objects.filter(updated__lt=cutoff).iterator():
+        abort(upload)
+        removed += 1
+    directory = Path(settings.RESUMABLE_UPLOAD_DIR)
+    if directory.is_dir():
+        live = {str(pk) for pk in Upload.objects.values_list("pk", flat=True)}
+        for path in directory.glob("*.part"):
+            modified = datetime.datetime.fromtimestamp(
+                path.stat().st_mtime, tz=datetime.timezone.utc
+            )
+            if path.stem not in live and modified < cutoff:
+                path.unlink(missing_ok=True)
+                removed += 1
+    return removed
@@ -18,6 +18,11 @@ urlpatterns = [
     path(
         "<pk>/delete/", views.CourseDeleteView.as_view(), name="course_delete"
     ),
+    path(
+        "<pk>/duplicate/",
+        views.CourseDuplicateView.as_view(),
+        name="course_duplicate",
+    ),
     path(
         "<pk>/module/",
         views.CourseModuleUpdateView.as_view(),
@@ -43,10 +48,24 @@ urlpatterns = [
         views.ModuleContentListView.as_view(),
         name="module_content_list",
     ),
+    path(
+        "module/<int:module_id>/uploads/",
+        views.UploadCreateView.as_view(),
+        name="upload_create",
+    ),
+    path(
+        "uploads/<uuid:upload_id>/", views.UploadView.as_view(), name="upload"
+    ),
     path("module/order/", views.ModuleOrderView.as_view(), name="module_order"),
     path(
         "content/order/", views.ContentOrderView.as_view(), name="content_order"
     ),
+    path("profiles/", views.ProfileListView.as_view(), name="profile_list"),
+    path(
+        "profiles/<str:name>",
+        views.ProfileDownloadView.as_view(),
+        name="profile_download",
+    ),
     path(
         "subject/<slug:subject>/",
         views.CourseListView.as_view(),
@@ -1,23 +1,36 @@
 """Course view module."""
 
 # from django.core.cache import cache   # the cache is stopped
-from braces.views import CsrfExemptMixin, JsonRequestResponseMixin
+from braces.views import (
+    CsrfExemptMixin,
+    JsonRequestResponseMixin,
+    StaffuserRequiredMixin,
+)
 from django.apps import apps
 from django.contrib.auth.mixins import (
     LoginRequiredMixin,
     PermissionRequiredMixin,
 )
-from django.db.models import Count
 from django.forms.models import modelform_factory
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import get_object_or_404, redirect
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.views.generic.base import TemplateResponseMixin, View
-from django.views.generic.detail import DetailView
+from django.views.generic.detail import DetailView, SingleObjectMixin
 from django.views.generic.edit import CreateView, DeleteView, UpdateView
 from django.views.generic.list import ListView
 
+from courses import profiling, uploads
+from courses.cloning import clone_course
+from courses.deletion import delete_contents, delete_course, delete_modules
 from courses.forms import ModuleFormSet
-from courses.models import Content, Course, Module, Subject
+from courses.models import Content, Course, Module, Subject, Upload
+from courses.pagecache import (
+    PageCacheMixin,
+    catalog_key,
+    course_key,
+    subject_key,
+)
 from students.forms import CourseEnrollForm
 
 
@@ -116,11 +129,52 @@ class CourseDeleteView(OwnerCourseMixin, DeleteView):
     Attributes:
         template_name (str): The template to use for confirming the course deletion.
         permission_required (str): The permission required to delete a course.
+
+    Methods:
+        form_valid(form): Deletes the course with its modules, contents and items.
     """
 
     template_name = "courses/manage/course/delete.html"
     permission_required = "courses.delete_course"
 
+    def form_valid(self, form):
+        """Deletes the course with its modules, contents and items.
+
+        Args:
+            form (Form): The confirmation form.
+
+        Returns:
+            HttpResponse: The response object redirecting to the course list.
+        """
+        delete_course(self.object)
+        return redirect(self.get_success_url())
+
+
+class CourseDuplicateView(OwnerCourseMixin, SingleObjectMixin, View):
+    """View to duplicate a course for a new run.
+
+    Attributes:
+        permission_required (str): The permission required to add a course.
+
+    Methods:
+        post(request, pk): Copies the course and redirects to the copy's edit form.
+    """
+
+    permission_required = "courses.add_course"
+
+    def post(self, request, pk):  # pylint: disable=unused-argument
+        """Copies the course and redirects to the copy's edit form.
+
+        Args:
+            request (HttpRequest): The request object.
+            pk (int): The primary key of the course.
+
+        Returns:
+            HttpResponse: The response object redirecting to the copy's edit form.
+        """
+        clone = clone_course(self.get_object(), owner=request.user)
+        return redirect("course_edit", clone.pk)
+
 
 # ---------------Module View----------------
 class CourseModuleUpdateView(TemplateResponseMixin, View):
@@ -161,7 +215,9 @@ class CourseModuleUpdateView(TemplateResponseMixin, View):
         Returns:
             HttpResponse: The response object.
         """
-        self.course = get_object_or_404(Course, id=pk, owner=request.user)
+        self.course = get_object_or_404(Course.cached, pk=pk)
+        if self.course.owner_id != request.user.id:
+            raise Http404
         return super().dispatch(request, pk)
 
     def get(self, request, *args, **kwargs):  # pylint: disable=unused-argument
@@ -193,7 +249,9 @@ class CourseModuleUpdateView(TemplateResponseMixin, View):
         """
         formset = self.get_formset(data=request.POST)
         if formset.is_valid():
-            formset.save()
+            for module in formset.save(commit=False):
+                module.save()
+            delete_modules(formset.deleted_objects)
             return redirect("manage_course_list")
         return self.render_to_response(
             {"course": self.course, "formset": formset}
@@ -222,9 +280,10 @@ class ModuleContentListView(TemplateResponseMixin, View):
         Returns:
             HttpResponse: The response object with the content list.
         """
-        module = get_object_or_404(
-            Module, id=module_id, course__owner=request.user
-        )
+        module = get_object_or_404(Module.cached, pk=module_id)
+        module.course = Course.cached.get(pk=module.course_id)
+        if module.course.owner_id != request.user.id:
+            raise Http404
         return self.render_to_response({"module": module})
 
 
@@ -361,13 +420,190 @@ class ContentDeleteView(View):
         Returns:
             HttpResponse: The response object redirecting to the content list.
         """
-        content = get_object_or_404(
-            Content, id=id, module__course__owner=request.user
+        contents = Content.objects.filter(
+            id=id, module__course__owner=request.user
+        )
+        module_id = get_object_or_404(contents.values_list("module", flat=True))
+        delete_contents(contents)
+        return redirect("module_content_list", module_id)
+
+
+# -----------resumable uploads------------
+class UploadMixin(LoginRequiredMixin):
+    """Mixin answering the resumable upload protocol of ``courses.uploads``.
+
+    Methods:
+        tus_response(status=204, **headers): Builds a protocol response.
+        dispatch(request, *args, **kwargs): Answers protocol errors.
+    """
+
+    raise_exception = True
+
+    def tus_response(self, status=204, **headers):
+        """Builds a protocol response.
+
+        Args:
+            status (int): The HTTP status.
+            **headers: Response headers, with ``_`` for ``-``.
+
+        Returns:
+            HttpResponse: The response.
+        """
+        response = HttpResponse(status=status)
+        response["Tus-Resumable"] = uploads.TUS_VERSION
+        response["Cache-Control"] = "no-store"
+        for name, value in headers.items():
+            response[name.replace("_", "-")] = value
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        """Answers protocol errors with their status.
+
+        Args:
+            request (HttpRequest): The request object.
+            *args: Variable length argument list.
+            **kwargs: Arbitrary keyword arguments.
+
+        Returns:
+            HttpResponse: The response object.
+        """
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except uploads.UploadError as error:
+            response = self.tus_response(error.status)
+            response.content = str(error)
+            return response
+
+
+class UploadCreateView(UploadMixin, View):
+    """View to start a resumable upload into a module.
+
+    Methods:
+        post(request, module_id): Creates the upload.
+    """
+
+    def post(self, request, module_id):
+        """Creates the upload.
+
+        Args:
+            request (HttpRequest): The request object.
+            module_id (int): The ID of the module receiving the file.
+
+        Returns:
+            HttpResponse: ``201`` with the upload URL in ``Location``.
+        """
+        module = get_object_or_404(
+            Module, id=module_id, course__owner=request.user
+        )
+        try:
+            length = int(request.headers["Upload-Length"])
+        except (KeyError, ValueError) as error:
+            raise uploads.UploadError(400, "Invalid Upload-Length.") from error
+        upload = uploads.create_upload(
+            request.user,
+            module,
+            length,
+            uploads.parse_metadata(request.headers.get("Upload-Metadata", "")),
+        )
+        return self.tus_response(
+            201,
+            Location=reverse("upload", args=[upload.pk]),
+            Upload_Offset=0,
+        )
+
+
+class UploadView(UploadMixin, View):
+    """View to resume, continue or abort a resumable upload.
+
+    Attributes:
+        upload (Upload): The upload.
+
+    Methods:
+        dispatch(request, upload_id): Sets the upload.
+        head(request, upload_id): Reports the upload offset.
+        patch(request, upload_id): Appends a chunk.
+        delete(request, upload_id): Aborts the upload.
+    """
+
+    upload = None
+
+    def dispatch(self, request, upload_id):
+        """Sets the upload.
+
+        Args:
+            request (HttpRequest): The request object.
+            upload_id (UUID): The ID of the upload.
+
+        Returns:
+            HttpResponse: The response object.
+        """
+        if request.user.is_authenticated:
+            self.upload = get_object_or_404(
+                Upload, id=upload_id, owner=request.user
+            )
+        return super().dispatch(request, upload_id)
+
+    def head(self, request, upload_id):  # pylint: disable=unused-argument
+        """Reports the upload offset.
+
+        Args:
+            request (HttpRequest): The request object.
+            upload_id (UUID): The ID of the upload.
+
+        Returns:
+            HttpResponse: ``200`` with ``Upload-Offset`` and ``Upload-Length``.
+        """
+        return self.tus_response(
+            200,
+            Upload_Offset=self.upload.offset,
+            Upload_Length=self.upload.length,
+        )
+
+    def patch(self, request, upload_id):  # pylint: disable=unused-argument
+        """Appends a chunk.
+
+        Args:
+            request (HttpRequest): The request object.
+            upload_id (UUID): The ID of the upload.
+
+        Returns:
+            HttpResponse: ``204`` with the new ``Upload-Offset``.
+        """
+        if request.content_type != uploads.OCTET_STREAM:
+            raise uploads.UploadError(415, f"Send {uploads.OCTET_STREAM}.")
+        try:
+            offset = int(request.headers["Upload-Offset"])
+            length = int(request.headers["Content-Length"])
+        except (KeyError, ValueError) as error:
+            raise uploads.UploadError(
+                400, "Invalid Upload-Offset or Content-Length."
+            ) from error
+        item = uploads.append_chunk(
+            self.upload,
+            offset,
+            request,
+            length,
+            uploads.parse_checksum(request.headers.get("Upload-Checksum")),
         )
-        module = content.module
-        content.item.delete()
-        content.delete()
-        return redirect("module_content_list", module.id)
+        headers = {"Upload_Offset": self.upload.offset}
+        if item is not None:
+            headers["Location"] = reverse(
+                "module_content_list", args=[self.upload.module_id]
+            )
+        return self.tus_response(**headers)
+
+    def delete(self, request, upload_id):  # pylint: disable=unused-argument
+        """Aborts the upload.
+
+        Args:
+            request (HttpRequest): The request object.
+            upload_id (UUID): The ID of the upload.
+
+        Returns:
+            HttpResponse: ``204``.
+        """
+        uploads.abort(self.upload)
+        return self.tus_response()
 
 
 # -----------handling the ordering of modules------------
@@ -391,6 +627,11 @@ class ModuleOrderView(CsrfExemptMixin, JsonRequestResponseMixin, View):
             Module.objects.filter(id=id_key, course__owner=request.user).update(
                 order=order
             )
+        # bulk updates send no post_save
+        Module.cached.invalidate(self.request_json)
+        Course.objects.filter(
+            modules__in=list(self.request_json), owner=request.user
+        ).touch()
         return self.render_json_response({"saved": "ok"})
 
 
@@ -415,11 +656,14 @@ class ContentOrderView(CsrfExemptMixin, JsonRequestResponseMixin, View):
             Content.objects.filter(
                 id=id_key, module__course__owner=request.user
             ).update(order=order)
+        Course.objects.filter(
+            modules__contents__in=list(self.request_json), owner=request.user
+        ).touch()
         return self.render_json_response({"saved": "ok"})
 
 
 # ---------------Course catalog--------------------
-class CourseListView(TemplateResponseMixin, View):
+class CourseListView(PageCacheMixin, TemplateResponseMixin, View):
     """View to display the list of courses.
 
     Attributes:
@@ -427,12 +671,29 @@ class CourseListView(TemplateResponseMixin, View):
         template_name (str): The template to use for rendering the course list.
 
     Methods:
+        get_surrogate_keys(context): Tags the page with the catalog and subject keys.
         get(request, subject=None): Renders the course list based on the subject.
+
+    A subject lists its own courses and those of its descendants.
     """
 
     model = Course
     template_name = "courses/course/list.html"
 
+    def get_surrogate_keys(self, context):
+        """Tags the page with the catalog and subject keys.
+
+        Args:
+            context (dict): The template context of the page.
+
+        Returns:
+            list: The surrogate keys.
+        """
+        keys = [catalog_key()]
+        if context["subject"]:
+            keys.append(subject_key(context["subject"].pk))
+        return keys
+
     def get(self, request, subject=None):  # pylint: disable=unused-argument
         """Renders the course list based on the subject.
 
@@ -443,19 +704,19 @@ class CourseListView(TemplateResponseMixin, View):
         Returns:
             HttpResponse: The response object with the course list.
         """
-        # subjects = cache.get('all_subjects')
-        # if not subjects:
-        subjects = Subject.objects.annotate(total_courses=Count("courses"))
-        # cache.set('all_subjects', subjects)
+        # the whole tree, depth first, with its stored course totals
+        subjects = Subject.objects.order_by("path")
 
-        all_courses = Course.objects.annotate(total_modules=Count("modules"))
+        all_courses = Course.objects.with_module_count().select_related(
+            "owner", "subject"
+        )
 
         if subject:
             subject = get_object_or_404(Subject, slug=subject)
             # key = f'subject_{subject.id}_courses'
             # courses = cache.get(key)
             # if not courses:
-            courses = all_courses.filter(subject=subject)
+            courses = all_courses.in_subject(subject)
         # cache.set(key, courses)
         else:
             # courses = cache.get('all_courses')
@@ -468,7 +729,7 @@ class CourseListView(TemplateResponseMixin, View):
         )
 
 
-class CourseDetailView(DetailView):
+class CourseDetailView(PageCacheMixin, DetailView):
     """View to display the details of a course.
 
     Attributes:
@@ -476,14 +737,53 @@ class CourseDetailView(DetailView):
         template_name (str): The template to use for rendering the course details.
 
     Methods:
+        get_object(queryset=None): Returns the course from the object cache.
+        get_surrogate_keys(context): Tags the page with the keys of its course, subject and links.
         get_context_data(**kwargs): Adds the enrollment form to the context data.
     """
 
     model = Course
     template_name = "courses/course/detail.html"
 
+    def get_object(self, queryset=None):  # pylint: disable=unused-argument
+        """Returns the course from the object cache.
+
+        Args:
+            queryset (QuerySet, optional): Unused, the lookup is by slug.
+
+        Returns:
+            Course: The course.
+        """
+        return get_object_or_404(Course.cached, slug=self.kwargs["slug"])
+
+    def get_surrogate_keys(self, context):
+        """Tags the page with the keys of its course, subject and links.
+
+        The prerequisites and related courses are listed by title and slug,
+        so renaming or deleting one of them purges the page too.
+
+        Args:
+            context (dict): The template context of the page.
+
+        Returns:
+            list: The surrogate keys.
+        """
+        course = context["object"]
+        # already evaluated by the template
+        linked = [*context["prerequisites"], *context["related_courses"]]
+        return [
+            course_key(course.pk),
+            subject_key(course.subject_id),
+            *(course_key(other.pk) for other in linked),
+        ]
+
     def get_context_data(self, **kwargs):
-        """Adds the enrollment form to the context data.
+        """Adds the enrollment form, the prerequisites and the related courses.
+
+        Only signed-in visitors see the form, anonymous ones are invited to
+        register instead; the form is replaced by the prerequisites they have
+        not completed yet. The related courses are the precomputed "students
+        also took" recommendations.
 
         Args:
             **kwargs: Additional keyword arguments.
@@ -492,7 +792,89 @@ class CourseDetailView(DetailView):
             dict: The context data for the template.
         """
         context = super().get_context_data(**kwargs)
-        context["enroll_form"] = CourseEnrollForm(
-            initial={"course": self.object}
-        )
+        courses = Course.objects.only("title", "slug")
+        context["prerequisites"] = courses.prerequisites_of(self.object)
+        if self.request.user.is_authenticated:
+            context["enroll_form"] = CourseEnrollForm(
+                initial={"course": self.object}
+            )
+            context["missing_prerequisites"] = list(
+                courses.missing_prerequisites(self.object, self.request.user)
+            )
+        context["related_courses"] = Course.objects.recommended_for(
+            self.object
+        ).only("title", "slug")
         return context
+
+
+# ---------------Profiles--------------------
+class ProfileListView(StaffuserRequiredMixin, TemplateResponseMixin, View):
+    """View to list the request profiles of ``courses.profiling``.
+
+    Attributes:
+        template_name (str): The template to use for rendering the list.
+        raise_exception (bool): Answer 403 to users who are not staff.
+
+    Methods:
+        get(request): Renders the stored profiles, newest first.
+    """
+
+    template_name = "courses/profiles/list.html"
+    raise_exception = True
+
+    def get(self, request):
+        """Renders the stored profiles, newest first.
+
+        ``?url_name=`` keeps the profiles of one URL name.
+
+        Args:
+            request (HttpRequest): The request object.
+
+        Returns:
+            HttpResponse: The rendered list.
+        """
+        profiles = profiling.list_profiles()
+        url_name = request.GET.get("url_name")
+        if url_name:
+            profiles = [p for p in profiles if p["url_name"] == url_name]
+        return self.render_to_response(
+            {"profiles": profiles, "url_name": url_name}
+        )
+
+
+class ProfileDownloadView(StaffuserRequiredMixin, View):
+    """View to download a stored request profile.
+
+    Attributes:
+        raise_exception (bool): Answer 403 to users who are not staff.
+
+    Methods:
+        get(request, name): Sends the profile file.
+    """
+
+    raise_exception = True
+
+    def get(self, request, name):
+        """Sends the profile file.
+
+        Args:
+            request (HttpRequest): The request object.
+            name (str): The file name, as listed.
+
+        Returns:
+            FileResponse: The profile.
+
+        Raises:
+            Http404: No stored profile has this name.
+        """
+        path = profiling.profile_path(name)
+        if path is None:
+            raise Http404
+        try:
+            return FileResponse(
+                path.open("rb"),
+                as_attachment=True,
+                content_type="text/plain",
+            )
+        except FileNotFoundError as error:
+            raise Http404 from error
@@ -0,0 +1,14 @@
+"""Admin view config."""
+
+from django.contrib import admin
+
+from notifications.models import CourseUpdate
+
+
+@admin.register(CourseUpdate)
+class CourseUpdateAdmin(admin.ModelAdmin):
+    """Admin of the course updates."""
+
+    list_display = ["course", "items", "created"]
+    list_filter = ["created"]
+    raw_id_fields = ["course"]
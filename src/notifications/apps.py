@@ -0,0 +1,27 @@
+"""App config module."""
+
+from django.apps import AppConfig
+
+
+class NotificationsConfig(AppConfig):
+    """Configuration for the notifications app.
+
+    Attributes:
+        name (str): The name of the app.
+    """
+
+    name = "notifications"
+
+    def ready(self):
+        """Notify the students when content is added to their courses."""
+        # pylint: disable=import-outside-toplevel
+        from django.db.models.signals import post_save
+
+        from courses.models import Content
+        from notifications import fanout
+
+        post_save.connect(
+            fanout.content_added,
+            sender=Content,
+            dispatch_uid="notifications.content_added",
+        )
@@ -0,0 +1,149 @@
+"""Delivery of the course updates to the enrolled students.
+
+Adding content to a course costs the request one or two queries: the items
+added within ``settings.NOTIFICATIONS_COALESCE_WINDOW`` seconds of the first
+one are counted on the same ``CourseUpdate``, and only a new update is fanned
+out. ``fan_out()`` runs in the background and walks the students of the course
+``settings.NOTIFICATIONS_CHUNK_SIZE`` at a time, one ``INSERT`` per chunk, so
+a course of 50,000 students costs 50 statements rather than 50,000.
+
+A student's unread count is kept in the cache for
+``settings.NOTIFICATIONS_UNREAD_TIMEOUT`` seconds; fan-outs and reads drop
+the cached counts they change. The fan-out runs in whichever process picked
+it up, so its deletions only reach the other workers' badges through a
+shared default cache (see ``courses.checks``).
+"""
+
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from courses.models import Course
+from courses.tasks import enqueue
+from notifications.models import CourseUpdate, Notification
+
+Enrollment = Course.students.through
+
+
+def unread_key(user_id):
+    """Return the cache key of a user's unread count."""
+    return f"notifications:unread:{user_id}"
+
+
+def unread_count(user):
+    """Return the number of unread notifications of ``user``.
+
+    Args:
+        user (User): The user.
+
+    Returns:
+        int: The count, from the cache when possible.
+    """
+    return cache.get_or_set(
+        unread_key(user.pk),
+        lambda: Notification.objects.filter(user=user, read=False).count(),
+        settings.NOTIFICATIONS_UNREAD_TIMEOUT,
+    )
+
+
+def mark_read(user):
+    """Mark every notification of ``user`` as read.
+
+    Returns:
+        int: The number of notifications marked.
+    """
+    count = Notification.objects.filter(user=user, read=False).update(read=True)
+    cache.delete(unread_key(user.pk))
+    return count
+
+
+def notify_course(course_id):
+    """Announce an item added to a course.
+
+    Args:
+        course_id (int): The course.
+
+    Returns:
+        CourseUpdate: The update counting the item.
+    """
+    now = timezone.now()
+    since = now - datetime.timedelta(
+        seconds=settings.NOTIFICATIONS_COALESCE_WINDOW
+    )
+    with transaction.atomic():
+        # concurrent adds wait for each other on the course row, so only
+        # the first one of a burst creates an update
+        list(
+            Course.objects.select_for_update()
+            .filter(pk=course_id)
+            .values_list("pk", flat=True)
+        )
+        update = (
+            CourseUpdate.objects.filter(course_id=course_id, created__gte=since)
+            .order_by("-created")
+            .first()
+        )
+        if update is not None:
+            # the students already have it, counting the item is enough
+            CourseUpdate.objects.filter(pk=update.pk).update(
+                items=F("items") + 1, updated=now
+            )
+            return update
+        update = CourseUpdate.objects.create(
+            course_id=course_id, created=now, updated=now
+        )
+    enqueue(fan_out, update.pk)
+    return update
+
+
+def fan_out(update_id, chunk_size=None):
+    """Notify the students of the course of an update, chunk by chunk.
+
+    Students are walked in primary key order, each chunk is one ``INSERT``
+    of its own, and students already notified are skipped, so a fan-out
+    interrupted half-way can simply be run again.
+
+    Args:
+        update_id (int): The update.
+        chunk_size (int, optional): Students per chunk, defaults to
+            ``settings.NOTIFICATIONS_CHUNK_SIZE``.
+
+    Returns:
+        int: The number of students notified, 0 when the update went with
+        its course before the fan-out ran.
+    """
+    chunk_size = chunk_size or settings.NOTIFICATIONS_CHUNK_SIZE
+    update = CourseUpdate.objects.filter(pk=update_id).first()
+    if update is None:
+        return 0
+    students = Enrollment.objects.filter(course_id=update.course_id)
+    last = 0
+    total = 0
+    while True:
+        user_ids = list(
+            students.filter(user_id__gt=last)
+            .order_by("user_id")
+            .values_list("user_id", flat=True)[:chunk_size]
+        )
+        if not user_ids:
+            return total
+        Notification.objects.bulk_create(
+            [
+                Notification(user_id=user_id, update=update)
+                for user_id in user_ids
+            ],
+            ignore_conflicts=True,
+        )
+        cache.delete_many([unread_key(user_id) for user_id in user_ids])
+        last = user_ids[-1]
+        total += len(user_ids)
+
+
+def content_added(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """Announce content added to a module."""
+    if created:
+        notify_course(instance.module.course_id)
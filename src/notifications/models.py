@@ -0,0 +1,74 @@
+"""Notifications model module."""
+
+from django.contrib.auth.models import User
+from django.db import models
+from django.utils import timezone
+
+from courses.models import Course
+
+
+class CourseUpdate(models.Model):
+    """New content in a course, announced to its students.
+
+    The items added in a burst share one update, see
+    ``notifications.fanout``; ``items`` counts them.
+    """
+
+    course = models.ForeignKey(
+        Course, related_name="updates", on_delete=models.CASCADE
+    )
+    items = models.PositiveIntegerField(default=1)
+    created = models.DateTimeField(default=timezone.now)
+    updated = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        """Model options."""
+
+        indexes = [
+            models.Index(
+                fields=["course", "-created"], name="update_course_created_idx"
+            ),
+        ]
+
+    def __str__(self):
+        """Return the course and the number of items."""
+        return f"{self.items} new items in {self.course_id}"
+
+
+class Notification(models.Model):
+    """A course update, as delivered to one student."""
+
+    # the unique constraint's index starts with the user
+    user = models.ForeignKey(
+        User,
+        related_name="notifications",
+        db_index=False,
+        on_delete=models.CASCADE,
+    )
+    update = models.ForeignKey(
+        CourseUpdate, related_name="notifications", on_delete=models.CASCADE
+    )
+    read = models.BooleanField(default=False)
+
+    class Meta:
+        """Model options."""
+
+        ordering = ["-pk"]
+        constraints = [
+            # a retried fan-out skips the students already notified
+            models.UniqueConstraint(
+                fields=["user", "update"], name="notification_user_update_uniq"
+            ),
+        ]
+        indexes = [
+            # unread counts walk the unread notifications only
+            models.Index(
+                fields=["user"],
+                condition=models.Q(read=False),
+                name="notification_unread_idx",
+            ),
+        ]
+
+    def __str__(self):
+        """Return the recipient and the update."""
+        return f"{self.update} for {self.user_id}"
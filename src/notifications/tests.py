@@ -0,0 +1,111 @@
+"""Unit test case module."""
+
+import datetime
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+
+from courses.models import Course, Module, Subject
+from notifications.fanout import (
+    fan_out,
+    mark_read,
+    notify_course,
+    unread_count,
+)
+from notifications.models import CourseUpdate, Notification
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, NOTIFICATIONS_CHUNK_SIZE=2)
+class NotificationTest(TestCase):
+    """Content added to a course notifies its students, in bursts."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a course with a module and five students."""
+        cls.owner = User.objects.create(username="owner")
+        subject = Subject.objects.create(title="Music", slug="music")
+        cls.course = Course.objects.create(
+            owner=cls.owner, subject=subject, title="Tabla", slug="tabla"
+        )
+        cls.module = Module.objects.create(course=cls.course, title="Basics")
+        cls.students = [
+            User.objects.create(username=f"student{number}")
+            for number in range(5)
+        ]
+        cls.course.students.add(*cls.students)
+
+    def add_text(self, title):
+        """Add a text to the module through the instructor's view."""
+        self.client.force_login(self.owner)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f"/course/module/{self.module.pk}/content/text/create/",
+                {"title": title, "content": "dha"},
+            )
+        assert response.status_code == 302
+
+    def test_burst(self):
+        """Items added in a burst make one notification per student."""
+        for number in range(3):
+            self.add_text(f"Lesson {number}")
+        update = CourseUpdate.objects.get()
+        assert update.items == 3
+        assert Notification.objects.filter(update=update).count() == 5
+        # one query for the update, two per chunk and the empty last one
+        with self.assertNumQueries(1 + 2 * 3 + 1):
+            assert fan_out(update.pk) == 5
+        assert Notification.objects.count() == 5
+
+    def test_burst_lock(self):
+        """Adds lock the course row before looking for an update."""
+        select_for_update = QuerySet.select_for_update
+        with mock.patch.object(
+            QuerySet,
+            "select_for_update",
+            autospec=True,
+            side_effect=select_for_update,
+        ) as lock:
+            notify_course(self.course.pk)
+        assert lock.call_args.args[0].model is Course
+
+    def test_window(self):
+        """Items added after the window make a new notification."""
+        self.add_text("Lesson 1")
+        CourseUpdate.objects.update(
+            created=CourseUpdate.objects.get().created
+            - datetime.timedelta(minutes=5)
+        )
+        self.add_text("Lesson 2")
+        assert CourseUpdate.objects.count() == 2
+        assert Notification.objects.filter(user=self.students[0]).count() == 2
+
+    def test_unread_badge(self):
+        """The student's course list shows the cached unread count."""
+        student = self.students[0]
+        self.add_text("Lesson 1")
+        assert unread_count(student) == 1
+        with self.assertNumQueries(0):
+            assert unread_count(student) == 1
+        self.client.force_login(student)
+        response = self.client.get("/students/courses/")
+        assert response.context["unread_notifications"] == 1
+        response = self.client.get("/notifications/")
+        assert b"1 new item in" in response.content
+        assert mark_read(student) == 1
+        assert unread_count(student) == 0
+
+    @skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN is SQLite's")
+    def test_unread_index(self):
+        """Unread counts search the partial index of unread notifications."""
+        unread = Notification.objects.filter(user=self.students[0], read=False)
+        assert "notification_unread_idx" in unread.explain()
+
+    def test_course_deleted(self):
+        """Fan-outs of an update deleted with its course do nothing."""
+        self.add_text("Lesson 1")
+        update = CourseUpdate.objects.get()
+        self.course.delete()
+        assert fan_out(update.pk) == 0
@@ -0,0 +1,14 @@
+"""URL configuration for the notifications app."""
+
+from django.urls import path
+
+from notifications import views
+
+app_name = "notifications"
+
+urlpatterns = [
+    path("", views.NotificationListView.as_view(), name="notification_list"),
+    path(
+        "read/", views.NotificationReadView.as_view(), name="notification_read"
+    ),
+]
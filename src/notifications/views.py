@@ -0,0 +1,50 @@
+"""View module."""
+
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.shortcuts import redirect
+from django.views import View
+from django.views.generic.list import ListView
+
+from notifications.fanout import mark_read
+from notifications.models import Notification
+
+
+class NotificationListView(LoginRequiredMixin, ListView):
+    """View to list the notifications of the user, newest first.
+
+    Attributes:
+        template_name (str): The template to render the list.
+        paginate_by (int): The notifications per page.
+
+    Methods:
+        get_queryset(): Returns the notifications of the user.
+    """
+
+    template_name = "notifications/list.html"
+    paginate_by = 50
+
+    def get_queryset(self):
+        """Returns the notifications of the user with their courses.
+
+        Returns:
+            QuerySet: The notifications.
+        """
+        return Notification.objects.filter(
+            user=self.request.user
+        ).select_related("update__course")
+
+
+class NotificationReadView(LoginRequiredMixin, View):
+    """View to mark every notification of the user as read."""
+
+    def post(self, request):
+        """Marks the notifications as read.
+
+        Args:
+            request (HttpRequest): The request object.
+
+        Returns:
+            HttpResponse: A redirect to the list.
+        """
+        mark_read(request.user)
+        return redirect("notifications:notification_list")
@@ -39,8 +39,12 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "rest_framework",
     "courses",
     "students",
+    "analytics",
+    "chat",
+    "notifications",
 ]
 
 MIDDLEWARE = [
@@ -51,6 +55,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "courses.middleware.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "root.urls"
@@ -59,8 +64,18 @@ TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
-        "APP_DIRS": True,
         "OPTIONS": {
+            # Compiled templates are kept per process; in development the
+            # autoreloader resets the cache whenever a template changes.
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                ),
+            ],
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
@@ -95,6 +110,95 @@ DATABASES = {
     }
 }
 
+# SQLite production profile, enabled with KALAKAR_SQLITE_PRODUCTION=1.
+# courses.db.configure_sqlite_connection applies SQLITE_PRAGMAS to every new
+# connection; connections are reused across requests, and the reads of safe
+# requests are served by the query_only "replica" alias of the same file.
+SQLITE_PRODUCTION = os.environ.get("KALAKAR_SQLITE_PRODUCTION") == "1"
+
+SQLITE_PRAGMAS = {}
+
+DATABASE_READ_ALIASES = []
+
+if SQLITE_PRODUCTION:
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,  # negative values are KiB
+        "temp_store": "MEMORY",
+    }
+    DATABASES["default"].update(
+        {
+            "CONN_MAX_AGE": 600,
+            "CONN_HEALTH_CHECKS": True,
+            # take the write lock up front instead of failing on upgrade
+            "OPTIONS": {"transaction_mode": "IMMEDIATE"},
+        }
+    )
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "OPTIONS": {},
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_READ_ALIASES = ["replica"]
+    DATABASE_ROUTERS = ["courses.db.ReadOnlyRouter"]
+    MIDDLEWARE.insert(1, "courses.middleware.ReadOnlyRoutingMiddleware")
+
+# The object cache, the page cache, the cached sessions and users and the
+# unread notification counts are shared by every worker process, and their
+# invalidations only reach the other workers through a shared cache. Set
+# KALAKAR_CACHE_URL to a Redis (redis://host:6379/0) or memcached
+# (memcached://host:11211) server in production; the local-memory default is
+# per process, for development and tests only, and manage.py check --deploy
+# rejects it (see courses.checks).
+CACHE_URL = os.environ.get("KALAKAR_CACHE_URL", "")
+
+if CACHE_URL.startswith(("redis://", "rediss://")):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+elif CACHE_URL.startswith("memcached://"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.memcached.PyMemcacheCache",
+            "LOCATION": CACHE_URL.removeprefix("memcached://"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Full-page cache of the public pages for anonymous visitors, see
+# courses.pagecache. Pages are purged by surrogate key on writes, so the
+# timeout only bounds what upstream caches keep.
+PAGE_CACHE_TIMEOUT = 300
+
+# Object cache of courses.objectcache.CachedManager: objects live for
+# OBJECT_CACHE_TIMEOUT seconds in the shared cache, and each process trusts
+# its own copies for OBJECT_CACHE_LOCAL_TTL seconds before revalidating them.
+OBJECT_CACHE_TIMEOUT = 60 * 60
+OBJECT_CACHE_LOCAL_TTL = 5
+OBJECT_CACHE_LOCAL_SIZE = 1024
+
+# Sessions, users and permission sets are read from the shared cache, see
+# students.auth for the invalidation rules; AUTH_CACHE_TIMEOUT bounds how
+# long a missed invalidation could keep a user signed in. Sessions remember
+# the backend that authenticated them: those opened with ModelBackend before
+# CachedModelBackend replaced it are signed out once, on deployment.
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
+AUTHENTICATION_BACKENDS = ["students.auth.CachedModelBackend"]
+
+AUTH_CACHE_TIMEOUT = 5 * 60
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -131,6 +235,94 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Uploaded content (File and Image items)
+MEDIA_URL = "media/"
+MEDIA_ROOT = BASE_DIR / "media"
+
+# Resumable uploads, see courses.uploads. Partial files live outside
+# MEDIA_ROOT until complete; idle uploads expire after a day.
+RESUMABLE_UPLOAD_DIR = BASE_DIR / "uploads"
+RESUMABLE_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+RESUMABLE_UPLOAD_MAX_SIZE = 10 * 1024 * 1024 * 1024
+RESUMABLE_UPLOAD_EXPIRY = 24 * 60 * 60
+
+# Offline course packages, see courses.export. One ZIP per course, replaced
+# when the course changes.
+EXPORT_CACHE_DIR = BASE_DIR / "exports"
+
+# Resolves Video URLs into players when they are saved, see courses.embeds.
+# courses.embeds.LocalResolver works offline.
+VIDEO_EMBED_RESOLVER = "courses.embeds.OEmbedResolver"
+
+# courses.deletion removes the items of larger courses in the background,
+# see courses.tasks. Eager tasks run right after the commit, in-process.
+DELETION_BACKGROUND_THRESHOLD = 500
+BACKGROUND_TASKS_EAGER = False
+
+# Events of analytics.events are folded into daily rollups at most every
+# ANALYTICS_ROLLUP_INTERVAL seconds, see analytics.rollups. Events younger
+# than ANALYTICS_ROLLUP_DELAY seconds wait, in case an older one is still
+# being committed.
+ANALYTICS_ROLLUP_INTERVAL = 60
+ANALYTICS_ROLLUP_DELAY = 5
+ANALYTICS_ROLLUP_BATCH_SIZE = 5000
+
+# On-demand request profiles, see courses.profiling. Requests are profiled
+# when they carry a token of manage.py profiling_token, when a staff user
+# adds ?_profile=1, or at random with PROFILING_SAMPLE_RATE (0 disables).
+PROFILING_DIR = BASE_DIR / "profiles"
+PROFILING_SAMPLE_RATE = 0.0
+PROFILING_MODE = "sampling"
+PROFILING_INTERVAL = 0.005
+PROFILING_MAX_FILES = 200
+PROFILING_TOKEN_MAX_AGE = 60 * 60
+
+# "Students also took" recommendations, see courses.recommendations. Courses
+# whose enrollments changed are refreshed in the background at most every
+# RECOMMENDATIONS_REFRESH_INTERVAL seconds.
+RECOMMENDATIONS_TOP_K = 5
+RECOMMENDATIONS_REFRESH_INTERVAL = 300
+RECOMMENDATIONS_BATCH_SIZE = 500
+
+# Course chat rooms, see chat.hub. Subscribers more than CHAT_QUEUE_SIZE
+# messages behind are dropped and reconnect; messages are saved in batches
+# of CHAT_PERSIST_BATCH or every CHAT_PERSIST_INTERVAL seconds. Streams need
+# an ASGI server; under WSGI browsers poll every CHAT_RETRY milliseconds.
+CHAT_BACKEND = "chat.hub.LocalHub"
+CHAT_HISTORY_SIZE = 50
+CHAT_QUEUE_SIZE = 100
+CHAT_PERSIST_BATCH = 200
+CHAT_PERSIST_INTERVAL = 1.0
+CHAT_KEEPALIVE = 20
+CHAT_RETRY = 2000
+
+# Students are notified of the content added to their courses, see
+# notifications.fanout. Items added within NOTIFICATIONS_COALESCE_WINDOW
+# seconds make one notification, delivered in the background in chunks of
+# NOTIFICATIONS_CHUNK_SIZE students.
+NOTIFICATIONS_COALESCE_WINDOW = 60
+NOTIFICATIONS_CHUNK_SIZE = 1000
+NOTIFICATIONS_UNREAD_TIMEOUT = 300
+
+# Static export of the public catalog and course pages, see
+# courses.staticsite. manage.py export_static renders the changed pages with
+# STATIC_EXPORT_WORKERS processes; sitemaps list STATIC_EXPORT_SITEMAP_SIZE
+# URLs at most, the limit of the sitemap protocol.
+STATIC_EXPORT_DIR = BASE_DIR / "public"
+STATIC_EXPORT_BASE_URL = "http://localhost:8000"
+STATIC_EXPORT_WORKERS = os.cpu_count() or 1
+STATIC_EXPORT_SITEMAP_SIZE = 50000
+
+# The student course page fetches item bodies when they are opened, see
+# students.views. Browsers reuse a fragment for STUDENT_FRAGMENT_MAX_AGE
+# seconds, then revalidate it against its ETag.
+STUDENT_FRAGMENT_MAX_AGE = 60
+
+# Build the URL resolver, the templates and the ContentType cache when the
+# WSGI/ASGI application is loaded rather than on the first requests, see
+# courses.startup. Turned on with KALAKAR_WARM_UP=1.
+WORKER_WARM_UP = os.environ.get("KALAKAR_WARM_UP") == "1"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -28,6 +28,14 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     path("", CourseListView.as_view(), name="course_list"),
     path("students/", include("students.urls")),
+    path("analytics/", include("analytics.urls")),
+    path("chat/", include("chat.urls")),
+    path("notifications/", include("notifications.urls")),
+    path(
+        "api/analytics/",
+        include("analytics.api.urls", namespace="analytics_api"),
+    ),
+    path("api/", include("courses.api.urls", namespace="api")),
 ]
 
 
@@ -11,3 +11,37 @@ class StudentsConfig(AppConfig):
     """
 
     name = "students"
+
+    def ready(self):
+        """Register the checks and connect the hooks of ``students.auth``."""
+        # pylint: disable=import-outside-toplevel
+        from django.contrib.auth import get_user_model
+        from django.contrib.auth import signals as auth_signals
+        from django.contrib.auth.models import Group, Permission
+        from django.core import checks
+        from django.db.models.signals import (
+            m2m_changed,
+            post_delete,
+            post_save,
+        )
+
+        from students import auth
+        from students.checks import shared_auth_cache_check
+
+        checks.register(
+            shared_auth_cache_check, checks.Tags.caches, deploy=True
+        )
+        user_model = get_user_model()
+        for signal in (post_save, post_delete):
+            signal.connect(auth.user_changed, sender=user_model)
+            for model in (Group, Permission):
+                signal.connect(auth.permissions_changed, sender=model)
+        for through in (
+            user_model.groups.through,
+            user_model.user_permissions.through,
+        ):
+            m2m_changed.connect(auth.memberships_changed, sender=through)
+        m2m_changed.connect(
+            auth.permissions_changed, sender=Group.permissions.through
+        )
+        auth_signals.user_logged_out.connect(auth.user_logged_out)
@@ -0,0 +1,117 @@
+"""Cached resolution of the authenticated user and their permissions.
+
+With the ``cached_db`` session engine the session itself is read from the
+cache; ``CachedModelBackend`` does the same for the two other per-request
+lookups of ``AuthenticationMiddleware`` and ``PermissionRequiredMixin``:
+
+* ``get_user()`` reads the user from ``auth:user:<pk>``;
+* ``get_all_permissions()`` reads the permission set from
+  ``auth:perms:<pk>:<version>``.
+
+The signal receivers below drop a user's entries when the user is saved
+(password changes and logins included), deleted or logged out, or when their
+groups or permissions change. Changes to a group or a permission may concern
+any user, so they bump the global ``version`` instead, which retires every
+cached permission set at once.
+
+Each process must see the others' invalidations, so the default cache has
+to be shared between them (Redis or memcached); ``students.checks`` refuses
+a local-memory one in production.
+"""
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+USER_KEY = "auth:user:{pk}"
+
+PERMS_KEY = "auth:perms:{pk}:{version}"
+
+VERSION_KEY = "auth:perms:version"
+
+
+def _perms_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+class CachedModelBackend(ModelBackend):
+    """``ModelBackend`` with cached user and permission lookups."""
+
+    def get_user(self, user_id):
+        """Return the active user ``user_id``, from the cache if possible."""
+        key = USER_KEY.format(pk=user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, settings.AUTH_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
+
+    def get_all_permissions(self, user_obj, obj=None):
+        """Return the user's permission names, from the cache if possible."""
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if not hasattr(user_obj, "_perm_cache"):
+            key = PERMS_KEY.format(pk=user_obj.pk, version=_perms_version())
+            perms = cache.get(key)
+            if perms is None:
+                perms = super().get_all_permissions(user_obj)
+                cache.set(key, perms, settings.AUTH_CACHE_TIMEOUT)
+            user_obj._perm_cache = perms  # pylint: disable=protected-access
+        return user_obj._perm_cache  # pylint: disable=protected-access
+
+
+def forget_user(user):
+    """Drop the cached user and permission set of ``user``."""
+    cache.delete_many(
+        [
+            USER_KEY.format(pk=user.pk),
+            PERMS_KEY.format(pk=user.pk, version=_perms_version()),
+        ]
+    )
+
+
+def forget_all_permissions():
+    """Retire the cached permission sets of every user."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 1, None)
+
+
+def user_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Forget a saved or deleted user."""
+    forget_user(instance)
+
+
+def user_logged_out(sender, request, user, **kwargs):  # pylint: disable=unused-argument
+    """Forget the user who logged out."""
+    if user is not None:
+        forget_user(user)
+
+
+def memberships_changed(sender, instance, reverse, pk_set, **kwargs):  # pylint: disable=unused-argument
+    """Forget the users whose groups or direct permissions changed."""
+    if not reverse:
+        forget_user(instance)
+    elif pk_set:
+        # changed from the group's or permission's side, pk_set holds users
+        cache.delete_many(
+            [USER_KEY.format(pk=pk) for pk in pk_set]
+            + [
+                PERMS_KEY.format(pk=pk, version=_perms_version())
+                for pk in pk_set
+            ]
+        )
+    else:
+        forget_all_permissions()
+
+
+def permissions_changed(sender, **kwargs):  # pylint: disable=unused-argument
+    """Retire every permission set after a group or permission change."""
+    forget_all_permissions()
@@ -0,0 +1,39 @@
+"""System checks of the cached authentication.
+
+``students.auth.CachedModelBackend`` and the ``cached_db`` session engine
+forget users through the default cache; with a cache local to each process,
+a password change, deactivation or revoked permission handled by one worker
+is not seen by the others until ``settings.AUTH_CACHE_TIMEOUT`` runs out.
+"""
+
+from django.conf import settings
+from django.core import checks
+
+from courses.checks import is_local_cache
+
+CACHED_BACKEND = "students.auth.CachedModelBackend"
+
+CACHED_SESSIONS = "django.contrib.sessions.backends.cached_db"
+
+
+def shared_auth_cache_check(app_configs, **kwargs):  # pylint: disable=unused-argument
+    """Refuse cached authentication on a per-process cache in production.
+
+    Returns:
+        list: The ``students.E001`` error, if any.
+    """
+    cached = (
+        CACHED_BACKEND in settings.AUTHENTICATION_BACKENDS
+        or settings.SESSION_ENGINE == CACHED_SESSIONS
+    )
+    if not cached or not is_local_cache():
+        return []
+    return [
+        checks.Error(
+            "Users and sessions are cached in a cache local to each "
+            "process: deactivated users and changed passwords stay valid "
+            "in the other workers.",
+            hint="Set KALAKAR_CACHE_URL to a Redis or memcached server.",
+            id="students.E001",
+        )
+    ]
@@ -1,2 +1,203 @@
 """Unit test case module."""
-# Create your tests here.
+
+import re
+
+from django.contrib.auth.models import User
+from django.core import checks
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from courses.models import Content, Course, Module, Subject, Text
+from students.auth import CachedModelBackend
+from students.checks import shared_auth_cache_check
+
+
+class ContentFragmentTest(TestCase):
+    """The course page lists item titles, bodies are fetched when opened."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a course with a long text and an enrolled student."""
+        owner = User.objects.create(username="owner")
+        cls.student = User.objects.create(username="student")
+        subject = Subject.objects.create(title="Music", slug="music")
+        cls.course = Course.objects.create(
+            owner=owner, subject=subject, title="Tabla", slug="tabla"
+        )
+        cls.course.students.add(cls.student)
+        cls.module = Module.objects.create(course=cls.course, title="Basics")
+        cls.text = Text.objects.create(
+            owner=owner, title="Bols", content="dha dhin " * 1000
+        )
+        cls.content = Content.objects.create(module=cls.module, item=cls.text)
+        cls.page = f"/students/courses/{cls.course.pk}/{cls.module.pk}"
+        cls.fragment = (
+            f"/students/courses/{cls.course.pk}"
+            f"/contents/{cls.content.pk}/fragment/"
+        )
+
+    def setUp(self):
+        """Log the student in."""
+        self.client.force_login(self.student)
+
+    def test_page_lists_titles(self):
+        """The page has the titles and fallback links, not the bodies."""
+        response = self.client.get(self.page)
+        assert b"Bols" in response.content
+        assert b"dha dhin" not in response.content
+        assert f"?content={self.content.pk}".encode() in response.content
+        assert self.fragment.encode() in response.content
+
+    def test_fallback(self):
+        """Without scripts, ``?content=`` renders that item in the page."""
+        response = self.client.get(f"{self.page}?content={self.content.pk}")
+        assert b"dha dhin" in response.content
+
+    def test_item_fragment(self):
+        """Item fragments are private, and revalidate with a 304."""
+        response = self.client.get(self.fragment)
+        assert response.status_code == 200
+        assert b"dha dhin" in response.content
+        assert b"<html" not in response.content
+        assert "private" in response["Cache-Control"]
+        etag = response["ETag"]
+        cached = self.client.get(self.fragment, HTTP_IF_NONE_MATCH=etag)
+        assert cached.status_code == 304
+        self.text.content = "ta tete"
+        self.text.save()
+        changed = self.client.get(self.fragment, HTTP_IF_NONE_MATCH=etag)
+        assert changed.status_code == 200
+        assert b"ta tete" in changed.content
+
+    def test_module_fragment(self):
+        """Module fragments list the titles of their items."""
+        response = self.client.get(
+            f"/students/courses/{self.course.pk}"
+            f"/modules/{self.module.pk}/fragment/"
+        )
+        assert b"Bols" in response.content
+        assert b"dha dhin" not in response.content
+        assert b"<html" not in response.content
+
+    def test_module_fragment_completion(self):
+        """Module fragments carry the completion state of the course."""
+        other = Module.objects.create(course=self.course, title="Kaidas")
+        url = f"/students/courses/{self.course.pk}/modules/{{}}/fragment/"
+        response = self.client.get(url.format(self.module.pk))
+        assert b"1 left" in response.content
+        assert b"Mark as completed" not in response.content
+        response = self.client.get(url.format(other.pk))
+        assert b'class="completion-update"' in response.content
+        assert b"Mark as completed" in response.content
+        etag = response["ETag"]
+        self.client.post(f"/students/courses/{self.course.pk}/complete/")
+        response = self.client.get(
+            url.format(other.pk), HTTP_IF_NONE_MATCH=etag
+        )
+        assert response.status_code == 200
+        assert b"Completed" in response.content
+
+    def test_enrolled_only(self):
+        """Students not enrolled in the course get a 404."""
+        self.client.force_login(User.objects.create(username="visitor"))
+        assert self.client.get(self.fragment).status_code == 404
+
+
+class CachedAuthTest(TestCase):
+    """Signed-in requests read the user from the cache until it changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a student."""
+        cls.student = User.objects.create_user("student", password="secret")
+
+    def setUp(self):
+        """Start from an empty cache and log the student in."""
+        cache.clear()
+        self.client.force_login(self.student)
+
+    def auth_queries(self, path="/"):
+        """Request ``path`` and return the session and user queries."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        assert response.status_code == 200
+        return [
+            query["sql"]
+            for query in queries
+            if re.search(r'FROM "(auth_\w+|django_session)"', query["sql"])
+        ]
+
+    def cached_user(self):
+        """Return the user the backend resolves for the student."""
+        return CachedModelBackend().get_user(self.student.pk)
+
+    def test_warm_cache(self):
+        """A warm cache answers the session and user lookups."""
+        assert self.auth_queries()
+        assert self.auth_queries() == []
+        assert not self.cached_user().has_perm("courses.add_course")
+        with self.assertNumQueries(0):
+            # a fresh copy, without the per-instance permission cache
+            user = self.cached_user()
+            assert user == self.student
+            assert not user.has_perm("courses.add_course")
+
+    def test_save_invalidates(self):
+        """Saved users are read again."""
+        self.cached_user()
+        self.student.first_name = "Ravi"
+        self.student.save()
+        assert self.cached_user().first_name == "Ravi"
+
+    def test_deactivation_invalidates(self):
+        """Deactivated users are signed out."""
+        self.auth_queries()
+        self.student.is_active = False
+        self.student.save()
+        assert self.cached_user() is None
+        response = self.client.get("/students/courses/")
+        assert response.status_code == 302
+
+    def test_password_change_invalidates(self):
+        """Changing the password signs the other sessions out."""
+        self.auth_queries()
+        user = User.objects.get(pk=self.student.pk)
+        user.set_password("changed")
+        user.save()
+        assert self.cached_user().password == user.password
+        response = self.client.get("/students/courses/")
+        assert response.status_code == 302
+
+
+class SharedAuthCacheCheckTest(SimpleTestCase):
+    """Cached authentication needs a cache shared between processes."""
+
+    def test_local_memory_refused(self):
+        """The local-memory cache is a deployment error."""
+        errors = checks.run_checks(
+            tags=[checks.Tags.caches], include_deployment_checks=True
+        )
+        assert "students.E001" in {error.id for error in errors}
+
+    @override_settings(
+        AUTHENTICATION_BACKENDS=["django.contrib.auth.backends.ModelBackend"],
+        SESSION_ENGINE="django.contrib.sessions.backends.db",
+    )
+    def test_uncached_auth(self):
+        """Without the cached backend and sessions the cache is free."""
+        assert not shared_auth_cache_check(None)
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.memcached."
+                "PyMemcacheCache",
+                "LOCATION": "localhost:11211",
+            }
+        }
+    )
+    def test_shared_accepted(self):
+        """Redis or memcached pass."""
+        assert not shared_auth_cache_check(None)
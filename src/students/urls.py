@@ -30,6 +30,26 @@ urlpatterns = [
         views.StudentCourseDetailView.as_view(),
         name="student_course_detail",
     ),
+    path(
+        "courses/<int:pk>/download/",
+        views.StudentCourseDownloadView.as_view(),
+        name="student_course_download",
+    ),
+    path(
+        "courses/<int:pk>/complete/",
+        views.StudentCourseCompleteView.as_view(),
+        name="student_course_complete",
+    ),
+    path(
+        "courses/<int:pk>/modules/<int:module_id>/fragment/",
+        views.StudentModuleFragmentView.as_view(),
+        name="student_module_fragment",
+    ),
+    path(
+        "courses/<int:pk>/contents/<int:content_id>/fragment/",
+        views.StudentContentFragmentView.as_view(),
+        name="student_content_fragment",
+    ),
     path(
         "courses/<pk>/<module_id>",
         views.StudentCourseDetailView.as_view(),
@@ -1,14 +1,27 @@
 """View module."""
 
+import hashlib
+
+from django.conf import settings
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.template.loader import render_to_string
 from django.urls import reverse_lazy
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views import View
 from django.views.generic.detail import DetailView
 from django.views.generic.edit import CreateView, FormView
 from django.views.generic.list import ListView
 
-from courses.models import Course
+from analytics.events import record_view, unviewed_modules
+from courses.export import download_response
+from courses.models import Content, Course, CourseCompletion, Module
+from courses.rendering import ModuleRenderer
+from notifications.fanout import unread_count
 from students.forms import CourseEnrollForm
 
 
@@ -62,6 +75,9 @@ class StudentEnrollCourseView(LoginRequiredMixin, FormView):
     def form_valid(self, form):
         """Enrolls the student in the selected course.
 
+        Students who have not completed every prerequisite are sent back to
+        the course page, which lists them.
+
         Args:
             form (Form): The form containing course enrollment data.
 
@@ -69,7 +85,10 @@ class StudentEnrollCourseView(LoginRequiredMixin, FormView):
             HttpResponse: The HTTP response after processing the form.
         """
         self.course = form.cleaned_data["course"]
-        self.course.students.add(self.request.user)
+        user = self.request.user
+        if Course.objects.missing_prerequisites(self.course, user).exists():
+            return redirect("course_detail", self.course.slug)
+        self.course.students.add(user)
         return super().form_valid(form)
 
     def get_success_url(self):
@@ -90,6 +109,7 @@ class StudentCourseListView(LoginRequiredMixin, ListView):
 
     Methods:
         get_queryset(): Returns the queryset of courses the student is enrolled in.
+        get_context_data(**kwargs): Adds the unread notification count.
     """
 
     model = Course
@@ -104,6 +124,40 @@ class StudentCourseListView(LoginRequiredMixin, ListView):
         qs = super().get_queryset()
         return qs.filter(students__in=[self.request.user])
 
+    def get_context_data(self, **kwargs):
+        """Adds the unread notification count, read from the cache.
+
+        Args:
+            **kwargs: Additional keyword arguments.
+
+        Returns:
+            dict: The context data for the template.
+        """
+        context = super().get_context_data(**kwargs)
+        context["unread_notifications"] = unread_count(self.request.user)
+        return context
+
+
+def completion_context(course, user):
+    """Return the completion state of ``course`` for ``user``.
+
+    Args:
+        course (Course): The course.
+        user (User): The student.
+
+    Returns:
+        dict: ``completed``, and the number of ``modules_left`` to view
+        while the course is not completed.
+    """
+    context = {
+        "completed": CourseCompletion.objects.filter(
+            user=user, course=course
+        ).exists()
+    }
+    if not context["completed"]:
+        context["modules_left"] = unviewed_modules(course, user).count()
+    return context
+
 
 class StudentCourseDetailView(DetailView):
     """View to display the details of a course a student is enrolled in.
@@ -113,25 +167,42 @@ class StudentCourseDetailView(DetailView):
         template_name (str): The template to render the course details.
 
     Methods:
-        get_queryset(): Returns the queryset of courses the student is enrolled in.
+        get_object(queryset=None): Returns the course if the student is enrolled in it.
         get_context_data(**kwargs): Adds additional context data for the template.
     """
 
     model = Course
     template_name = "students/student/detail.html"
 
-    def get_queryset(self):
-        """Returns the queryset of courses the student is enrolled in.
+    def get_object(self, queryset=None):  # pylint: disable=unused-argument
+        """Returns the course if the student is enrolled in it.
+
+        The course comes from the object cache, only the enrollment is
+        checked against the database.
+
+        Args:
+            queryset (QuerySet, optional): Unused, the lookup is by pk.
 
         Returns:
-            QuerySet: The queryset of courses.
+            Course: The course.
+
+        Raises:
+            Http404: The course does not exist or the student is not enrolled.
         """
-        qs = super().get_queryset()
-        return qs.filter(students__in=[self.request.user])
+        course = get_object_or_404(Course.cached, pk=self.kwargs["pk"])
+        if not course.students.filter(id=self.request.user.id).exists():
+            raise Http404
+        return course
 
     def get_context_data(self, **kwargs):
         """Adds additional context data for the template.
 
+        The items of the selected module are listed in ``contents`` by
+        title; the page fetches their bodies from
+        ``StudentContentFragmentView`` when they are opened. Browsers
+        without scripts follow ``?content=<id>``, which renders that item in
+        the page. The view of the module is recorded.
+
         Args:
             **kwargs: Additional keyword arguments.
 
@@ -139,7 +210,7 @@ class StudentCourseDetailView(DetailView):
             dict: The context data for the template.
         """
         context = super().get_context_data(**kwargs)
-        course = self.get_object()
+        course = self.object
 
         if "module_id" in self.kwargs:
             context["module"] = course.modules.get(id=self.kwargs["module_id"])
@@ -147,4 +218,194 @@ class StudentCourseDetailView(DetailView):
             if course.modules.all():
                 context["module"] = course.modules.all()[0]
 
+        if "module" in context:
+            expanded = self.request.GET.get("content", "")
+            context["contents"] = ModuleRenderer().render_outline(
+                context["module"],
+                expanded=int(expanded) if expanded.isdigit() else None,
+            )
+            record_view(course, context["module"], self.request.user)
+        context.update(completion_context(course, self.request.user))
         return context
+
+
+class StudentCourseCompleteView(LoginRequiredMixin, View):
+    """View to mark a course the student is enrolled in as completed.
+
+    Completed courses unlock the courses requiring them, so a course is only
+    completed once the student viewed each of its modules, according to the
+    view events of ``analytics.events``. A course without modules cannot be.
+
+    Methods:
+        post(request, pk): Records the completion.
+    """
+
+    def post(self, request, pk):
+        """Records the completion, if every module was viewed.
+
+        Args:
+            request (HttpRequest): The request object.
+            pk (int): The ID of the course.
+
+        Returns:
+            HttpResponse: A redirect to the course.
+        """
+        course = get_object_or_404(
+            Course.objects.filter(students=request.user), pk=pk
+        )
+        if (
+            course.modules.exists()
+            and not unviewed_modules(course, request.user).exists()
+        ):
+            CourseCompletion.objects.get_or_create(
+                user=request.user, course=course
+            )
+        return redirect("student_course_detail", course.pk)
+
+
+class StudentCourseDownloadView(LoginRequiredMixin, View):
+    """View to download a course the student is enrolled in, for offline study.
+
+    Methods:
+        get(request, pk): Sends the ZIP package of the course.
+    """
+
+    def get(self, request, pk):
+        """Sends the ZIP package of the course.
+
+        The course is read from the database rather than the object cache:
+        its ``updated`` stamp keys the cached package.
+
+        Args:
+            request (HttpRequest): The request object.
+            pk (int): The ID of the course.
+
+        Returns:
+            HttpResponse: The package, streamed while it is first built.
+        """
+        course = get_object_or_404(
+            Course.objects.filter(students=request.user), pk=pk
+        )
+        return download_response(course)
+
+
+def fragment_response(request, etag, render, last_modified=None):
+    """Answer a fragment request, with a 304 when the browser has it.
+
+    Fragments are private to the student and cached by the browser for
+    ``settings.STUDENT_FRAGMENT_MAX_AGE`` seconds, then revalidated.
+
+    Args:
+        request (HttpRequest): The request object.
+        etag (str): The unquoted entity tag of the fragment.
+        render (Callable[[], str]): Renders the fragment, on a miss only.
+        last_modified (datetime, optional): The last change of the fragment.
+
+    Returns:
+        HttpResponse: The fragment or a 304.
+    """
+    etag = quote_etag(etag)
+    timestamp = last_modified and int(last_modified.timestamp())
+    response = get_conditional_response(
+        request, etag=etag, last_modified=timestamp
+    )
+    if response is None:
+        response = HttpResponse(render())
+    response["ETag"] = etag
+    if timestamp:
+        response["Last-Modified"] = http_date(timestamp)
+    patch_cache_control(
+        response, private=True, max_age=settings.STUDENT_FRAGMENT_MAX_AGE
+    )
+    return response
+
+
+class StudentModuleFragmentView(LoginRequiredMixin, View):
+    """View to send the item list of a module, without the page around it.
+
+    The course page swaps modules with it. Viewing the module may leave no
+    module to view, so the fragment also carries the completion state of
+    the course, which the page moves into its side-bar.
+
+    Methods:
+        get(request, pk, module_id): Sends the item titles of the module.
+    """
+
+    def get(self, request, pk, module_id):
+        """Sends the item titles of the module.
+
+        Args:
+            request (HttpRequest): The request object.
+            pk (int): The ID of the course.
+            module_id (int): The ID of the module.
+
+        Returns:
+            HttpResponse: The fragment.
+
+        Raises:
+            Http404: The module is not in a course the student is enrolled in.
+        """
+        module = get_object_or_404(
+            Module.objects.select_related("course").filter(
+                course_id=pk, course__students=request.user
+            ),
+            pk=module_id,
+        )
+        contents = ModuleRenderer().render_outline(module)
+        record_view(module.course, module, request.user)
+        completion = completion_context(module.course, request.user)
+        source = [module.title, completion]
+        source.extend((row.content.pk, row.item.updated) for row in contents)
+        return fragment_response(
+            request,
+            hashlib.sha256(repr(source).encode()).hexdigest(),
+            lambda: render_to_string(
+                "students/student/module_fragment.html",
+                {
+                    "object": module.course,
+                    "module": module,
+                    "contents": contents,
+                    **completion,
+                },
+                request,
+            ),
+        )
+
+
+class StudentContentFragmentView(LoginRequiredMixin, View):
+    """View to send the rendered body of one item of a course.
+
+    Methods:
+        get(request, pk, content_id): Sends the item.
+    """
+
+    def get(self, request, pk, content_id):
+        """Sends the item.
+
+        Args:
+            request (HttpRequest): The request object.
+            pk (int): The ID of the course.
+            content_id (int): The ID of the content.
+
+        Returns:
+            HttpResponse: The fragment, or a 304 while the item is unchanged.
+
+        Raises:
+            Http404: The content is not in a course the student is enrolled
+                in, or its item is gone.
+        """
+        content = get_object_or_404(
+            Content.objects.filter(
+                module__course_id=pk, module__course__students=request.user
+            ),
+            pk=content_id,
+        )
+        item = content.item
+        if item is None:
+            raise Http404
+        return fragment_response(
+            request,
+            f"{content.pk}-{item.pk}-{item.updated.timestamp()}",
+            lambda: ModuleRenderer().render_item(item),
+            last_modified=item.updated,
+        )